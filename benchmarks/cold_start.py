@@ -0,0 +1,112 @@
+"""
+Measure the cold-start cost of each Lambda handler
+
+Every run starts a fresh Python interpreter, imports the handler module the
+way the Lambda runtime does (layer and function directory on sys.path) and
+then creates the AWS clients the handler uses, without making any network
+calls. The median import and init times per Lambda are reported; with
+--max-import-ms / --max-init-ms the script exits non-zero when a median goes
+over budget, so a CI step can catch cold-start regressions.
+
+Usage:
+    python benchmarks/cold_start.py --runs 7
+    python benchmarks/cold_start.py --max-import-ms 250 --max-init-ms 150 --json
+"""
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+LAYER_PATH = ROOT / 'lambda' / 'common' / 'python'
+
+# Handler module and the AWS services it creates clients for
+LAMBDAS = {
+    'leave_application': ['dynamodb'],
+    'leave_approval': ['dynamodb'],
+    'leave_notification': ['dynamodb', 'sns'],
+    'leave_aggregation': ['dynamodb'],
+    'router': ['dynamodb', 'sns'],
+}
+
+# Runs in the child interpreter: time the import, then the client creation
+CHILD = """
+import importlib, json, sys, time
+start = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+from lms_common.dynamo import client
+for service in sys.argv[2:]:
+    client(service)
+initialized = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'init_ms': (initialized - imported) * 1000
+}))
+"""
+
+def measure(name, services):
+    """
+    Import and init time of one Lambda in a fresh interpreter
+
+    Args:
+        name (str): Handler module, also the name of its directory under lambda/
+        services (list): AWS services whose clients the handler creates
+
+    Returns:
+        dict: import_ms and init_ms
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([str(LAYER_PATH), str(ROOT / 'lambda' / name)])
+    env.setdefault('AWS_REGION', 'us-west-2')
+    env.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+    env.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, name] + services,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Lambda handler import and init time")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters per Lambda (default: %(default)s)")
+    parser.add_argument('--max-import-ms', type=float, help="Fail when a median import time is above this")
+    parser.add_argument('--max-init-ms', type=float, help="Fail when a median init time is above this")
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for name, services in LAMBDAS.items():
+        runs = [measure(name, services) for _ in range(args.runs)]
+        results[name] = {
+            'import_ms': round(statistics.median(run['import_ms'] for run in runs), 1),
+            'init_ms': round(statistics.median(run['init_ms'] for run in runs), 1)
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'Lambda':<22}{'import (ms)':>14}{'init (ms)':>12}")
+        for name, result in results.items():
+            print(f"{name:<22}{result['import_ms']:>14}{result['init_ms']:>12}")
+
+    over_budget = []
+    for name, result in results.items():
+        if args.max_import_ms is not None and result['import_ms'] > args.max_import_ms:
+            over_budget.append(f"{name} import {result['import_ms']} ms > {args.max_import_ms} ms")
+        if args.max_init_ms is not None and result['init_ms'] > args.max_init_ms:
+            over_budget.append(f"{name} init {result['init_ms']} ms > {args.max_init_ms} ms")
+    for message in over_budget:
+        print(f"Over budget: {message}", file=sys.stderr)
+    return 1 if over_budget else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Compare the old and new paths from DynamoDB wire format to a JSON response
+
+The old path deserialized numbers to Decimal (as boto3's TypeDeserializer
+does) and encoded responses with a JSONEncoder subclass whose default()
+runs once per Decimal. The new path converts numbers to int/float while
+deserializing, so json.dumps needs no callback. Both paths are timed on a
+list of generated leave requests, the shape get_leave_status returns.
+
+Usage:
+    python benchmarks/serialization.py --items 10000 --repeat 20
+"""
+import argparse
+import json
+import pathlib
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / 'lambda' / 'common' / 'python'))
+from lms_common.dynamo import deserialize_item
+
+class DecimalEncoder(json.JSONEncoder):
+    """The encoder the handlers used before"""
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        return super(DecimalEncoder, self).default(obj)
+
+def _legacy_value(attribute):
+    (kind, value), = attribute.items()
+    if kind == 'N':
+        return Decimal(value)
+    if kind == 'M':
+        return {key: _legacy_value(item) for key, item in value.items()}
+    if kind == 'L':
+        return [_legacy_value(item) for item in value]
+    return value
+
+def legacy_deserialize_item(item):
+    """Deserialize with Decimal numbers, as the resource layer did"""
+    return {name: _legacy_value(value) for name, value in item.items()}
+
+def wire_leaves(count):
+    """
+    Leave requests in DynamoDB wire format
+
+    Args:
+        count (int): Number of leave requests
+
+    Returns:
+        list: Items as returned by a low-level Query
+    """
+    statuses = ['PENDING', 'APPROVED', 'REJECTED', 'CANCELLED']
+    return [
+        {
+            'id': {'N': str(10001 + i)},
+            'type': {'S': 'LEAVE_REQUEST'},
+            'employeeId': {'N': str(1001 + i % 500)},
+            'employeeName': {'S': 'John Doe'},
+            'startDate': {'S': '2025-03-15'},
+            'endDate': {'S': '2025-03-20'},
+            'leaveType': {'S': 'Annual'},
+            'duration': {'N': str(1 + i % 10)},
+            'status': {'S': statuses[i % 4]},
+            'appliedAt': {'S': '2025-03-01T09:30:00+00:00'}
+        }
+        for i in range(count)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Time leave-list deserialization and JSON encoding")
+    parser.add_argument('--items', type=int, default=10000, help="Leave requests in the list (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=20, help="Timed repetitions, best one reported (default: %(default)s)")
+    args = parser.parse_args()
+
+    wire = wire_leaves(args.items)
+    legacy_items = [legacy_deserialize_item(item) for item in wire]
+    items = [deserialize_item(item) for item in wire]
+    assert json.loads(json.dumps({'leaves': legacy_items}, cls=DecimalEncoder)) == json.loads(json.dumps({'leaves': items}))
+
+    cases = {
+        'encode, Decimal + DecimalEncoder': lambda: json.dumps({'leaves': legacy_items}, cls=DecimalEncoder),
+        'encode, int + json.dumps': lambda: json.dumps({'leaves': items}),
+        'end to end, old path': lambda: json.dumps({'leaves': [legacy_deserialize_item(item) for item in wire]}, cls=DecimalEncoder),
+        'end to end, new path': lambda: json.dumps({'leaves': [deserialize_item(item) for item in wire]}),
+    }
+
+    print(f"{args.items} leave requests, best of {args.repeat}")
+    for name, case in cases.items():
+        best = min(timeit.repeat(case, number=1, repeat=args.repeat))
+        print(f"{name:<36}{best * 1000:>10.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+Helpers shared by the Leave Management System Lambda functions.
+
+Packaged as a Lambda layer (lambda/common) and also imported by the
+utility scripts in utils/.
+"""
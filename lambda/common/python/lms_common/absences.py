@@ -0,0 +1,191 @@
+import re
+import zlib
+from datetime import date, timedelta
+from lms_common.pagination import Paginator
+
+# ABSENCE items live in their own ID range, one partition per department
+ABSENCE_ID_BASE = 1 << 40
+
+# Per-employee attributes of an ABSENCE item: a number set of the days of the
+# month the employee is out, and the employee's name for display
+DAYS_PREFIX = 'days_'
+NAME_PREFIX = 'name_'
+_DAYS_ATTRIBUTE = re.compile(re.escape(DAYS_PREFIX) + r'(\d+)$')
+
+def absence_id(department):
+    """
+    Partition key of a department's ABSENCE items
+
+    Args:
+        department (str): Department name
+
+    Returns:
+        int: Item ID
+    """
+    return ABSENCE_ID_BASE + zlib.crc32(department.encode('utf-8'))
+
+def absence_type(department, month):
+    """
+    Sort key of a department's ABSENCE item for one month
+
+    The department name is part of the key, so two departments whose IDs
+    collide still never share an item.
+
+    Args:
+        department (str): Department name
+        month (str): Month as YYYY-MM
+
+    Returns:
+        str: ABSENCE#<department>#<YYYY-MM>
+    """
+    return f"ABSENCE#{department}#{month}"
+
+def days_by_month(start_date, end_date):
+    """
+    Days of a date range grouped by month
+
+    Args:
+        start_date (str): First day (YYYY-MM-DD)
+        end_date (str): Last day (YYYY-MM-DD)
+
+    Returns:
+        dict: YYYY-MM to the set of days of the month in the range, in month order
+    """
+    months = {}
+    day = date.fromisoformat(start_date)
+    last = date.fromisoformat(end_date)
+    while day <= last:
+        months.setdefault(day.strftime('%Y-%m'), set()).add(day.day)
+        day += timedelta(days=1)
+    return months
+
+def absence_updates(table_name, department, absences, remove=False):
+    """
+    Transaction items adding or removing leaves in a department's calendar
+
+    One update per month covers every employee in `absences`. Adding and
+    removing days are set operations, so applying an update twice has the
+    same effect as applying it once.
+
+    Args:
+        table_name (str): Name of the table
+        department (str): Department of the employees
+        absences (list): (employee ID, employee name, start date, end date) tuples
+        remove (bool): Remove the days, as when an approved leave is cancelled
+
+    Returns:
+        list: TransactItems entries, one per month touched
+    """
+    months = {}
+    for employee_id, employee_name, start_date, end_date in absences:
+        for month, days in days_by_month(start_date, end_date).items():
+            employees = months.setdefault(month, {})
+            name, known_days = employees.get(employee_id, (employee_name, set()))
+            employees[employee_id] = (name, known_days | days)
+
+    items = []
+    for month, employees in months.items():
+        names = {}
+        values = {}
+        sets = []
+        changes = []
+        for i, (employee_id, (employee_name, days)) in enumerate(employees.items()):
+            names[f'#d{i}'] = f"{DAYS_PREFIX}{employee_id}"
+            values[f':d{i}'] = days
+            changes.append(f"#d{i} :d{i}")
+            names[f'#n{i}'] = f"{NAME_PREFIX}{employee_id}"
+            values[f':n{i}'] = employee_name or 'Unknown'
+            sets.append(f"#n{i} = :n{i}")
+
+        if remove:
+            # Names stay behind; an employee without days is not listed
+            names = {key: value for key, value in names.items() if key.startswith('#d')}
+            values = {key: value for key, value in values.items() if key.startswith(':d')}
+            expression = "DELETE " + ", ".join(changes)
+        else:
+            # The department is in the key only; a `department` attribute would
+            # put the item in the sparse DepartmentEmployeeIndex of employees
+            names['#month'] = 'month'
+            values[':month'] = month
+            sets = ["#month = :month"] + sets
+            expression = "SET " + ", ".join(sets) + " ADD " + ", ".join(changes)
+        items.append({
+            'Update': {
+                'TableName': table_name,
+                'Key': {
+                    'id': absence_id(department),
+                    'type': absence_type(department, month)
+                },
+                'UpdateExpression': expression,
+                'ExpressionAttributeNames': names,
+                'ExpressionAttributeValues': values
+            }
+        })
+    return items
+
+def write_absence_updates(table, items):
+    """
+    Apply absence updates one by one, outside a transaction
+
+    Args:
+        table: DynamoDB Table holding the ABSENCE items
+        items (list): Entries returned by absence_updates
+    """
+    for item in items:
+        update = {key: value for key, value in item['Update'].items() if key != 'TableName'}
+        table.update_item(**update)
+
+def team_absences(table, department, start_date, end_date, exclude_employee_id=None, context=None):
+    """
+    Employees of a department who are out on any day of a date range
+
+    Reads the department's ABSENCE items for the months of the range with a
+    single key-range query.
+
+    Args:
+        table: DynamoDB Table holding the ABSENCE items
+        department (str): Department name
+        start_date (str): First day (YYYY-MM-DD)
+        end_date (str): Last day (YYYY-MM-DD)
+        exclude_employee_id (int, optional): Employee left out of the result
+        context (LambdaContext, optional): Bounds the query by the Lambda's remaining time
+
+    Returns:
+        list: One dict per employee with employeeId, employeeName and the
+            sorted dates they are out, ordered by first date out
+    """
+    employees = {}
+    for item in Paginator(
+        table.query,
+        context=context,
+        KeyConditionExpression="id = :id AND #type BETWEEN :first AND :last",
+        ExpressionAttributeNames={
+            '#type': 'type'
+        },
+        ExpressionAttributeValues={
+            ':id': absence_id(department),
+            ':first': absence_type(department, start_date[:7]),
+            ':last': absence_type(department, end_date[:7])
+        }
+    ):
+        month = item['type'][-7:]
+        for attribute, days in item.items():
+            match = _DAYS_ATTRIBUTE.match(attribute)
+            if match is None:
+                continue
+            employee_id = int(match.group(1))
+            if employee_id == exclude_employee_id:
+                continue
+            dates = [f"{month}-{day:02d}" for day in days]
+            dates = [day for day in dates if start_date <= day <= end_date]
+            if dates:
+                entry = employees.setdefault(employee_id, {
+                    'employeeId': employee_id,
+                    'employeeName': item.get(f"{NAME_PREFIX}{employee_id}", 'Unknown'),
+                    'dates': []
+                })
+                entry['dates'].extend(dates)
+
+    for entry in employees.values():
+        entry['dates'].sort()
+    return sorted(employees.values(), key=lambda entry: (entry['dates'][0], entry['employeeId']))
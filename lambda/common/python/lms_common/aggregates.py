@@ -0,0 +1,229 @@
+import time
+from collections import Counter
+from lms_common.absences import absence_id
+from lms_common.business_days import deducted_days
+from lms_common.dynamo import deserialize_item
+from lms_common.idempotency import TTL_ATTRIBUTE
+
+# Sort key prefixes of the aggregate items. EMPLOYEE_STATS items live under the
+# employee's ID, DEPARTMENT_STATS items in the department's partition (the one
+# that also holds its ABSENCE items); both are kept per year of startDate
+EMPLOYEE_STATS_PREFIX = 'EMPLOYEE_STATS#'
+DEPARTMENT_STATS_PREFIX = 'DEPARTMENT_STATS#'
+
+# Department a LEAVE_REQUEST counts for, stored when it is applied for, and the
+# department of a DEPARTMENT_STATS item. Neither is called `department`, which
+# keys the sparse DepartmentEmployeeIndex meant for EMPLOYEE items only
+LEAVE_DEPARTMENT_ATTRIBUTE = 'leaveDepartment'
+STATS_DEPARTMENT_ATTRIBUTE = 'statsDepartment'
+
+# Aggregate attributes: leave requests per status and approved days per leave
+# type, each a top-level number so stream deltas can be applied with ADD
+COUNT_PREFIX = 'count_'
+DAYS_PREFIX = 'days_'
+
+# Sort key of the per-leave item holding the last stream sequence number applied
+CURSOR_TYPE = 'AGGREGATE_CURSOR'
+
+# Stream records are kept for 24 hours; a cursor outlives any redelivery
+DEFAULT_CURSOR_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Stream sequence numbers are decimal strings of up to 40 digits, more than a
+# DynamoDB number holds; cursors store them zero-padded to this width, so
+# comparing the strings orders them like the numbers
+SEQUENCE_WIDTH = 40
+
+def employee_stats_key(employee_id, year):
+    """Key of an employee's aggregate item for one year"""
+    return {'id': employee_id, 'type': f"{EMPLOYEE_STATS_PREFIX}{year}"}
+
+def department_stats_key(department, year):
+    """Key of a department's aggregate item for one year"""
+    return {'id': absence_id(department), 'type': f"{DEPARTMENT_STATS_PREFIX}{department}#{year}"}
+
+def leave_contribution(leave_request):
+    """
+    What one leave request adds to the aggregates
+
+    Args:
+        leave_request (dict): LEAVE_REQUEST item, or None
+
+    Returns:
+        dict: Year to Counter of aggregate attributes; empty for None
+    """
+    if not leave_request or not leave_request.get('startDate') or not leave_request.get('status'):
+        return {}
+    contribution = Counter({f"{COUNT_PREFIX}{leave_request['status']}": 1})
+    if leave_request['status'] == 'APPROVED':
+        contribution[f"{DAYS_PREFIX}{leave_request.get('leaveType', 'Unknown')}"] += deducted_days(leave_request)
+    return {int(leave_request['startDate'][:4]): contribution}
+
+def stats_deltas(old_image, new_image):
+    """
+    Change of the aggregates when a leave request goes from one image to another
+
+    Args:
+        old_image (dict): LEAVE_REQUEST before the change, or None for an insert
+        new_image (dict): LEAVE_REQUEST after the change, or None for a removal
+
+    Returns:
+        dict: Year to dict of non-zero attribute deltas; empty when a change,
+            such as marking a notification as sent, leaves the aggregates alone
+    """
+    deltas = {}
+    old = leave_contribution(old_image)
+    new = leave_contribution(new_image)
+    for year in set(old) | set(new):
+        delta = Counter(new.get(year, {}))
+        delta.subtract(old.get(year, {}))
+        delta = {name: value for name, value in delta.items() if value}
+        if delta:
+            deltas[year] = delta
+    return deltas
+
+def department_deltas(old_image, new_image, old_department, new_department):
+    """
+    Change of the department aggregates when a leave request goes from one image to another
+
+    Each image counts for its own department, so when the two differ the old
+    image is taken out of the old department and the new image added to the
+    new one.
+
+    Args:
+        old_image (dict): LEAVE_REQUEST before the change, or None for an insert
+        new_image (dict): LEAVE_REQUEST after the change, or None for a removal
+        old_department (str): Department of the old image, or None if unknown
+        new_department (str): Department of the new image, or None if unknown
+
+    Returns:
+        dict: Department to the stats_deltas() for it; departments without
+            changes are left out
+    """
+    if old_department == new_department:
+        changes = {new_department: stats_deltas(old_image, new_image)}
+    else:
+        changes = {
+            old_department: stats_deltas(old_image, None),
+            new_department: stats_deltas(None, new_image)
+        }
+    return {department: deltas for department, deltas in changes.items() if department and deltas}
+
+def stats_update(table_name, key, delta, attributes):
+    """
+    Transaction item adding deltas to an aggregate item
+
+    Args:
+        table_name (str): Name of the table
+        key (dict): Key of the aggregate item
+        delta (dict): Aggregate attribute to the amount added (may be negative)
+        attributes (dict): Descriptive attributes set on the item, e.g. its year
+
+    Returns:
+        dict: TransactItems entry
+    """
+    names = {}
+    values = {}
+    sets = []
+    adds = []
+    for i, (name, value) in enumerate(attributes.items()):
+        names[f'#s{i}'] = name
+        values[f':s{i}'] = value
+        sets.append(f"#s{i} = :s{i}")
+    for i, (name, value) in enumerate(delta.items()):
+        names[f'#a{i}'] = name
+        values[f':a{i}'] = value
+        adds.append(f"#a{i} :a{i}")
+    return {
+        'Update': {
+            'TableName': table_name,
+            'Key': key,
+            'UpdateExpression': "SET " + ", ".join(sets) + " ADD " + ", ".join(adds),
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': values
+        }
+    }
+
+def cursor_put(table_name, leave_id, sequence_number, ttl_seconds=DEFAULT_CURSOR_TTL_SECONDS):
+    """
+    Transaction item advancing a leave's stream cursor
+
+    The put only succeeds for a sequence number past the last one applied for
+    the leave. All records of a leave come from the same stream shard in
+    order, so a redelivered or already applied record fails the condition
+    and its deltas are not added twice. The sequence number is stored as a
+    zero-padded string, see SEQUENCE_WIDTH.
+
+    Args:
+        table_name (str): Name of the table
+        leave_id (int): ID of the leave request
+        sequence_number (str): Stream sequence number of the record
+        ttl_seconds (int): Seconds until TTL removes the cursor
+
+    Returns:
+        dict: TransactItems entry
+    """
+    sequence = str(sequence_number).zfill(SEQUENCE_WIDTH)
+    return {
+        'Put': {
+            'TableName': table_name,
+            'Item': {
+                'id': leave_id,
+                'type': CURSOR_TYPE,
+                'sequence': sequence,
+                TTL_ATTRIBUTE: int(time.time()) + ttl_seconds
+            },
+            'ConditionExpression': "attribute_not_exists(#sequence) OR #sequence < :sequence",
+            'ExpressionAttributeNames': {
+                '#sequence': 'sequence'
+            },
+            'ExpressionAttributeValues': {
+                ':sequence': sequence
+            }
+        }
+    }
+
+def leave_changes(event):
+    """
+    Leave request changes in a DynamoDB stream batch
+
+    Args:
+        event (dict): DynamoDB stream event with old and new images
+
+    Returns:
+        list: (sequence number, old image, new image) triples in stream order;
+            an image is None when the item did not exist on that side
+    """
+    changes = []
+    for record in event.get('Records', []):
+        stream = record.get('dynamodb', {})
+        keys = stream.get('Keys', {})
+        if keys.get('type', {}).get('S') != 'LEAVE_REQUEST':
+            continue
+        old_image = deserialize_item(stream['OldImage']) if 'OldImage' in stream else None
+        new_image = deserialize_item(stream['NewImage']) if 'NewImage' in stream else None
+        changes.append((stream['SequenceNumber'], old_image, new_image))
+    return changes
+
+def summarize(item):
+    """
+    Readable form of an aggregate item
+
+    Args:
+        item (dict): EMPLOYEE_STATS or DEPARTMENT_STATS item, or None
+
+    Returns:
+        dict: statusCounts and daysUsed (per leave type), without zero entries
+    """
+    status_counts = {}
+    days_used = {}
+    for name, value in (item or {}).items():
+        if name.startswith(COUNT_PREFIX) and value:
+            status_counts[name[len(COUNT_PREFIX):]] = value
+        elif name.startswith(DAYS_PREFIX) and value:
+            days_used[name[len(DAYS_PREFIX):]] = value
+    return {
+        'statusCounts': status_counts,
+        'totalRequests': sum(status_counts.values()),
+        'daysUsed': days_used,
+        'totalDaysUsed': sum(days_used.values())
+    }
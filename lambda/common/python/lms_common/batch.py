@@ -0,0 +1,63 @@
+import random
+import time
+
+# BatchGetItem accepts at most 100 keys per request
+MAX_BATCH_GET_KEYS = 100
+
+# Attempts at draining UnprocessedKeys before giving up
+MAX_BATCH_ATTEMPTS = 8
+
+def _backoff(attempt):
+    """Sleep with capped exponential backoff and full jitter"""
+    time.sleep(random.uniform(0, min(1.0, 0.05 * (2 ** attempt))))
+
+def batch_get_items(dynamodb, table_name, keys, projection=None, attribute_names=None, consistent_read=False):
+    """
+    Fetch many items by key, retrying UnprocessedKeys until all are read
+
+    Args:
+        dynamodb: DynamoDB service resource
+        table_name (str): Name of the table
+        keys (list): Item keys; duplicates are read once
+        projection (str, optional): ProjectionExpression; must include the key attributes
+        attribute_names (dict, optional): ExpressionAttributeNames for the projection
+        consistent_read (bool): Use strongly consistent reads
+
+    Returns:
+        list: Items that exist, in no particular order
+    """
+    unique_keys = []
+    seen = set()
+    for key in keys:
+        marker = tuple(sorted(key.items()))
+        if marker not in seen:
+            seen.add(marker)
+            unique_keys.append(key)
+
+    request_options = {}
+    if projection:
+        request_options['ProjectionExpression'] = projection
+    if attribute_names:
+        request_options['ExpressionAttributeNames'] = attribute_names
+    if consistent_read:
+        request_options['ConsistentRead'] = True
+
+    items = []
+    for start in range(0, len(unique_keys), MAX_BATCH_GET_KEYS):
+        request_items = {
+            table_name: dict(request_options, Keys=unique_keys[start:start + MAX_BATCH_GET_KEYS])
+        }
+
+        attempt = 0
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            items.extend(response.get('Responses', {}).get(table_name, []))
+
+            request_items = response.get('UnprocessedKeys') or {}
+            if request_items:
+                attempt += 1
+                if attempt >= MAX_BATCH_ATTEMPTS:
+                    raise RuntimeError(f"BatchGetItem left keys unprocessed after {attempt} attempts")
+                _backoff(attempt)
+
+    return items
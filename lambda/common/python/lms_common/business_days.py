@@ -0,0 +1,159 @@
+import threading
+from datetime import date
+from lms_common.batch import batch_get_items
+
+# Holiday calendars are stored one item per region and year: the year is the
+# item ID, the type is HOLIDAYS#<REGION>, and `dates` lists the holidays as
+# YYYY-MM-DD strings
+HOLIDAYS_TYPE_PREFIX = 'HOLIDAYS#'
+
+DEFAULT_REGION = 'US'
+
+# Years read with a region's first lookup, around the current year; other
+# years are read when a leave first touches them
+YEARS_BEFORE = 1
+YEARS_AFTER = 2
+
+def holidays_type(region):
+    """Sort key of a region's holiday calendar items"""
+    return f"{HOLIDAYS_TYPE_PREFIX}{region.upper()}"
+
+def _as_date(value):
+    """Date of a YYYY-MM-DD string; dates are returned as they are"""
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+def working_day_mask(year, holidays=()):
+    """
+    Bitmap of a year's working days
+
+    Bit n stands for day n + 1 of the year and is set when that day is a
+    weekday other than one of the holidays.
+
+    Args:
+        year (int): Calendar year
+        holidays (iterable): Holidays (YYYY-MM-DD); dates of other years are ignored
+
+    Returns:
+        int: Working-day bitmap
+    """
+    first = date(year, 1, 1)
+    days = (date(year + 1, 1, 1) - first).days
+
+    # One week's pattern starting on the year's first weekday, repeated over the year
+    week = sum(1 << n for n in range(7) if (first.weekday() + n) % 7 < 5)
+    weeks = days // 7 + 1
+    mask = week * (((1 << (7 * weeks)) - 1) // 0b1111111)
+    mask &= (1 << days) - 1
+
+    for holiday in holidays:
+        day = _as_date(holiday)
+        if day.year == year:
+            mask &= ~(1 << (day.timetuple().tm_yday - 1))
+    return mask
+
+def deducted_days(leave_request):
+    """
+    Days charged to the balance for a leave request
+
+    Leaves written before working days were counted only carry `duration`,
+    which is what was deducted for them.
+
+    Args:
+        leave_request (dict): LEAVE_REQUEST item
+
+    Returns:
+        int: Days to deduct or restore
+    """
+    return leave_request.get('deductedDays', leave_request.get('duration', 1))
+
+class HolidayCalendar:
+    """
+    Working-day counter backed by the table's HOLIDAYS#<REGION> items
+
+    A region's calendars are read once per container with a single
+    BatchGetItem and kept as one working-day bitmap per year, so counting
+    the working days of a leave is a shift, a mask and a popcount per year
+    it spans, with no I/O after the first lookup.
+    """
+
+    def __init__(self, dynamodb, table_name, default_region=DEFAULT_REGION, today=date.today):
+        """
+        Args:
+            dynamodb: DynamoDB service resource
+            table_name (str): Name of the table holding the HOLIDAYS items
+            default_region (str): Region of employees without a `region` attribute
+            today (callable): Source of the current date, which centres the years read first
+        """
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+        self.default_region = default_region
+        self.today = today
+        self._masks = {}
+        self._lock = threading.Lock()
+
+    def region_of(self, employee):
+        """
+        Holiday region of an employee
+
+        Args:
+            employee (dict): EMPLOYEE item, or None
+
+        Returns:
+            str: The employee's `region`, or the default region
+        """
+        return ((employee or {}).get('region') or self.default_region).upper()
+
+    def _load(self, region, years):
+        """Read the calendars of the given years and store their bitmaps; call with the lock held"""
+        keys = [{'id': year, 'type': holidays_type(region)} for year in years]
+        holidays = {item['id']: item.get('dates', []) for item in batch_get_items(self.dynamodb, self.table_name, keys)}
+        for year in years:
+            # Years without an item still count weekends, and are not read again
+            self._masks[(region, year)] = working_day_mask(year, holidays.get(year, ()))
+
+    def masks(self, region, years):
+        """
+        Working-day bitmaps of a region, reading any year not seen yet
+
+        Args:
+            region (str): Holiday region
+            years (iterable): Calendar years
+
+        Returns:
+            dict: Year to working-day bitmap
+        """
+        region = region.upper()
+        with self._lock:
+            missing = [year for year in years if (region, year) not in self._masks]
+            if missing:
+                if not any(key[0] == region for key in self._masks):
+                    current = self.today().year
+                    missing = sorted(set(missing) | set(range(current - YEARS_BEFORE, current + YEARS_AFTER + 1)))
+                self._load(region, missing)
+            return {year: self._masks[(region, year)] for year in years}
+
+    def business_days(self, start_date, end_date, region=None):
+        """
+        Working days from start_date to end_date, both included
+
+        Args:
+            start_date (str or date): First day (YYYY-MM-DD)
+            end_date (str or date): Last day (YYYY-MM-DD)
+            region (str, optional): Holiday region; the default region if omitted
+
+        Returns:
+            int: Weekdays in the range that are not holidays; 0 if the range is empty
+        """
+        start = _as_date(start_date)
+        end = _as_date(end_date)
+        if end < start:
+            return 0
+
+        masks = self.masks(region or self.default_region, range(start.year, end.year + 1))
+        count = 0
+        for year, mask in masks.items():
+            first = start.timetuple().tm_yday - 1 if year == start.year else 0
+            last = end.timetuple().tm_yday - 1 if year == end.year else 365
+            window = (mask >> first) & ((1 << (last - first + 1)) - 1)
+            count += bin(window).count('1')
+        return count
@@ -0,0 +1,98 @@
+import threading
+from collections import OrderedDict
+from lms_common.batch import batch_get_items
+
+# Leave IDs whose employee is remembered per container
+DEFAULT_MAX_LEAVES = 4096
+
+class LeaveReader:
+    """
+    Reads a LEAVE_REQUEST together with its EMPLOYEE in as few round trips as possible
+
+    When the employee is known up front, either passed by the caller or
+    remembered from an earlier read of the same leave, and is not in the
+    employee cache, both items come back from one BatchGetItem. Items the
+    caller has already loaded are passed in and never read again.
+    """
+
+    def __init__(self, dynamodb, table, employee_cache, max_leaves=DEFAULT_MAX_LEAVES):
+        """
+        Args:
+            dynamodb: DynamoDB service object used for BatchGetItem
+            table: DynamoDB Table holding the items
+            employee_cache (EmployeeCache): Cache the EMPLOYEE items go through
+            max_leaves (int): Size bound of the leave-to-employee map
+        """
+        self.dynamodb = dynamodb
+        self.table = table
+        self.employee_cache = employee_cache
+        self.max_leaves = max_leaves
+        self._employee_ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, leave_id, employee_id):
+        """
+        Record which employee a leave request belongs to
+
+        Args:
+            leave_id (int): ID of the leave request
+            employee_id (int): ID of its employee
+        """
+        with self._lock:
+            self._employee_ids[leave_id] = employee_id
+            self._employee_ids.move_to_end(leave_id)
+            while len(self._employee_ids) > self.max_leaves:
+                self._employee_ids.popitem(last=False)
+
+    def employee_id(self, leave_id):
+        """
+        Returns:
+            int: Remembered employee of the leave request, or None
+        """
+        with self._lock:
+            return self._employee_ids.get(leave_id)
+
+    def read(self, leave_id, employee_id=None, leave_request=None):
+        """
+        Leave request and its employee
+
+        Args:
+            leave_id (int): ID of the leave request
+            employee_id (int, optional): Employee the leave request is expected to belong to
+            leave_request (dict, optional): Leave request already loaded by the caller
+
+        Returns:
+            tuple: (leave request, employee); the leave request is None if it
+                does not exist and the employee is None if it does not exist
+        """
+        employee = None
+        batched_employee_id = None
+        if leave_request is None:
+            if employee_id is None:
+                employee_id = self.employee_id(leave_id)
+            if employee_id is not None:
+                employee = self.employee_cache.peek(employee_id)
+
+            leave_key = {'id': leave_id, 'type': 'LEAVE_REQUEST'}
+            if employee_id is None or employee is not None:
+                leave_request = self.table.get_item(Key=leave_key).get('Item')
+            else:
+                # Neither item is at hand; fetch both in one request
+                batched_employee_id = employee_id
+                for item in batch_get_items(self.dynamodb, self.table.name, [leave_key, {'id': employee_id, 'type': 'EMPLOYEE'}]):
+                    if item['type'] == 'LEAVE_REQUEST':
+                        leave_request = item
+                    else:
+                        employee = self.employee_cache.put(item)
+
+            if leave_request is None:
+                return None, None
+
+        owner_id = leave_request['employeeId']
+        self.remember(leave_id, owner_id)
+        if employee is not None and employee['id'] == owner_id:
+            return leave_request, employee
+        if owner_id == batched_employee_id:
+            # The batch already showed that the employee does not exist
+            return leave_request, None
+        return leave_request, self.employee_cache.get(owner_id)
@@ -0,0 +1,220 @@
+import inspect
+import json
+import os
+import re
+from datetime import date
+from lms_common.params import parse_list, parse_int_list
+
+# The agent's function definitions; the layer ships a link to
+# bedrock_agent_schemas.json at the repository root
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bedrock_agent_schemas.json')
+
+# Parameters whose description mentions this format are checked as dates
+DATE_FORMAT = 'YYYY-MM-DD'
+_DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+class InvalidValue(ValueError):
+    """Raised by a coercer when a value does not fit the parameter's type"""
+
+def _integer(value):
+    if isinstance(value, bool):
+        raise InvalidValue("must be an integer")
+    if isinstance(value, int):
+        return value
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise InvalidValue("must be an integer") from None
+
+def _number(value):
+    if isinstance(value, bool):
+        raise InvalidValue("must be a number")
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        raise InvalidValue("must be a number") from None
+
+def _boolean(value):
+    text = str(value).strip().lower()
+    if text in ('true', 'yes', '1'):
+        return True
+    if text in ('false', 'no', '0'):
+        return False
+    raise InvalidValue("must be true or false")
+
+def _string(value):
+    return str(value).strip()
+
+def _date(value):
+    text = str(value).strip()
+    if _DATE_PATTERN.fullmatch(text):
+        try:
+            date.fromisoformat(text)
+            return text
+        except ValueError:
+            pass
+    raise InvalidValue(f"must be a date in {DATE_FORMAT} format")
+
+def _id_list(value):
+    try:
+        return parse_int_list(value)
+    except ValueError:
+        raise InvalidValue("must be a list of integer IDs, e.g. [1001, 1002]") from None
+
+def _string_list(value):
+    try:
+        return parse_list(value)
+    except ValueError:
+        raise InvalidValue("must be a list, e.g. [\"a\", \"b\"]") from None
+
+_COERCERS = {
+    'integer': _integer,
+    'number': _number,
+    'boolean': _boolean,
+    'string': _string
+}
+
+def coercer(name, definition):
+    """
+    Function converting a raw value of one parameter, chosen from its schema
+
+    The function schema only types arrays as "array", so arrays named
+    `*_ids` are read as lists of integer IDs and other arrays as lists of
+    strings. Strings documented as YYYY-MM-DD must be calendar dates.
+
+    Args:
+        name (str): Parameter name
+        definition (dict): Parameter definition from the schema
+
+    Returns:
+        callable: Raw value to Python value; raises InvalidValue
+    """
+    kind = definition.get('type', 'string')
+    if kind == 'array':
+        return _id_list if name.endswith('_ids') else _string_list
+    if kind == 'string' and DATE_FORMAT in definition.get('description', ''):
+        return _date
+    if kind not in _COERCERS:
+        raise ValueError(f"Parameter {name} has unsupported type {kind}")
+    return _COERCERS[kind]
+
+class Action:
+    """
+    One agent function: its parameter validators and the Python function it calls
+
+    Validators are built once from the schema, when the handler module is
+    imported. Schema parameters are passed to the function as keyword
+    arguments of the same name; extras such as `context` or `idempotency` are
+    passed only to functions that accept them.
+    """
+
+    def __init__(self, definition, handler):
+        """
+        Args:
+            definition (dict): Function definition from the schema
+            handler (callable): Function implementing it
+        """
+        self.name = definition['name']
+        self.handler = handler
+        self.parameters = [
+            (name, str(parameter.get('required', 'False')).lower() == 'true', coercer(name, parameter))
+            for name, parameter in definition.get('parameters', {}).items()
+        ]
+
+        accepted = set(inspect.signature(handler).parameters)
+        missing = [name for name, _, _ in self.parameters if name not in accepted]
+        if missing:
+            raise TypeError(f"{handler.__name__} does not accept schema parameters {missing}")
+        self.extras = accepted.difference(name for name, _, _ in self.parameters)
+
+    def validate(self, raw):
+        """
+        Check and convert the parameters of a call
+
+        Args:
+            raw (dict): Parameter name to value as sent by the agent
+
+        Returns:
+            tuple: (parameters, None) for a valid call, where missing optional
+                parameters are left out so the function defaults apply, or
+                (None, error result) listing every invalid parameter
+        """
+        parameters = {}
+        problems = []
+        for name, required, coerce in self.parameters:
+            value = raw.get(name)
+            if value is None or (isinstance(value, str) and not value.strip()):
+                if required:
+                    problems.append({'parameter': name, 'problem': "is required"})
+                continue
+            try:
+                parameters[name] = coerce(value)
+            except InvalidValue as e:
+                problems.append({'parameter': name, 'problem': str(e), 'value': str(value)})
+
+        if problems:
+            return None, {
+                'success': False,
+                'message': f"Invalid parameters for {self.name}: " + "; ".join(
+                    f"{problem['parameter']} {problem['problem']}" for problem in problems
+                ),
+                'invalidParameters': problems
+            }
+        return parameters, None
+
+    def __call__(self, parameters, **extras):
+        """
+        Args:
+            parameters (dict): Parameters returned by validate
+            **extras: Values passed on if the function accepts them
+
+        Returns:
+            dict: Result of the function
+        """
+        arguments = dict(parameters)
+        for name, value in extras.items():
+            if name in self.extras:
+                arguments[name] = value
+        return self.handler(**arguments)
+
+def load_schema(path=SCHEMA_PATH):
+    """
+    Returns:
+        dict: Action group name to its list of function definitions
+    """
+    with open(path) as schema_file:
+        return json.load(schema_file)
+
+def action_table(action_group, handlers, schema=None):
+    """
+    Dispatch table for one action group
+
+    Fails at import time when the schema and the handler module disagree, so
+    a function added on one side only never reaches the agent.
+
+    Args:
+        action_group (str): Key of the action group in the schema
+        handlers (dict): Function name to the Python function implementing it
+        schema (dict, optional): Parsed schema; read from SCHEMA_PATH by default
+
+    Returns:
+        dict: Function name to Action
+    """
+    definitions = (schema if schema is not None else load_schema())[action_group]
+    names = {definition['name'] for definition in definitions}
+    if names != set(handlers):
+        raise ValueError(
+            f"Schema functions and handlers of {action_group} differ: "
+            f"{sorted(names.symmetric_difference(handlers))}"
+        )
+    return {definition['name']: Action(definition, handlers[definition['name']]) for definition in definitions}
+
+def unknown_function(function):
+    """
+    Returns:
+        dict: Result for a function that is not in the action group
+    """
+    return {
+        'success': False,
+        'message': f"Unknown function: {function}"
+    }
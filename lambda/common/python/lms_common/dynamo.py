@@ -0,0 +1,269 @@
+import os
+import threading
+from decimal import Decimal
+import botocore.session
+from botocore.config import Config
+
+# Seconds one AWS call may take, retries included; the stack sets it well
+# below each function's timeout so a stuck call fails while the handler can
+# still answer
+CALL_BUDGET_SECONDS = float(os.environ.get('AWS_CALL_BUDGET_SECONDS', '5'))
+MAX_ATTEMPTS = int(os.environ.get('AWS_MAX_ATTEMPTS', '3'))
+
+# Connect and read timeouts of one attempt, so that all attempts together fit the budget
+_ATTEMPT_SECONDS = CALL_BUDGET_SECONDS / MAX_ATTEMPTS
+CONNECT_TIMEOUT = float(os.environ.get('AWS_CONNECT_TIMEOUT', min(1.0, _ATTEMPT_SECONDS / 3)))
+READ_TIMEOUT = float(os.environ.get('AWS_READ_TIMEOUT', _ATTEMPT_SECONDS - CONNECT_TIMEOUT))
+
+# One tuned configuration for every client: kept-alive pooled connections,
+# timeouts derived from the call budget, and adaptive retries that back off
+# on throttling
+CLIENT_CONFIG = Config(
+    connect_timeout=CONNECT_TIMEOUT,
+    read_timeout=READ_TIMEOUT,
+    max_pool_connections=int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '16')),
+    tcp_keepalive=True,
+    retries={
+        'mode': 'adaptive',
+        'max_attempts': MAX_ATTEMPTS
+    }
+)
+
+_session = None
+_clients = {}
+_lock = threading.Lock()
+
+def client(service_name):
+    """
+    Low-level botocore client, created on first use and shared afterwards
+
+    Loading a service model is the expensive part of creating a client, so it
+    happens only when a handler first talks to that service rather than at
+    import time. botocore clients are thread-safe.
+
+    Args:
+        service_name (str): AWS service, e.g. 'dynamodb' or 'sns'
+
+    Returns:
+        BaseClient: The shared client
+    """
+    global _session
+    existing = _clients.get(service_name)
+    if existing is not None:
+        return existing
+    with _lock:
+        if service_name not in _clients:
+            if _session is None:
+                _session = botocore.session.get_session()
+            _clients[service_name] = _session.create_client(
+                service_name,
+                region_name=os.environ.get('AWS_REGION') or os.environ.get('AWS_DEFAULT_REGION'),
+                config=CLIENT_CONFIG
+            )
+        return _clients[service_name]
+
+class LazyClient:
+    """Module-level stand-in for a client that is created on first attribute access"""
+
+    def __init__(self, service_name):
+        self.service_name = service_name
+
+    def __getattr__(self, name):
+        return getattr(client(self.service_name), name)
+
+def serialize(value):
+    """
+    Convert a Python value to a DynamoDB attribute value
+
+    Args:
+        value: str, int, float, Decimal, bool, None, bytes, dict, list, tuple or set
+
+    Returns:
+        dict: Attribute value such as {'N': '5'}
+    """
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, Decimal)):
+        return {'N': str(value)}
+    if isinstance(value, dict):
+        return {'M': {key: serialize(item) for key, item in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'L': [serialize(item) for item in value]}
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, float):
+        return {'N': repr(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {'B': bytes(value)}
+    if isinstance(value, (set, frozenset)):
+        if not value:
+            raise ValueError("DynamoDB does not store empty sets")
+        if all(isinstance(item, str) for item in value):
+            return {'SS': list(value)}
+        if all(isinstance(item, (bytes, bytearray)) for item in value):
+            return {'BS': [bytes(item) for item in value]}
+        return {'NS': [str(item) for item in value]}
+    raise TypeError(f"Unsupported type {type(value).__name__} for a DynamoDB attribute")
+
+def _number(text):
+    """
+    Whole numbers as int, others as float
+
+    Converting once here keeps Decimal out of the items entirely, so results
+    go through json.dumps without a per-value callback and whole numbers stay
+    exact instead of becoming floats.
+    """
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+_DESERIALIZERS = {
+    'S': lambda value: value,
+    'N': _number,
+    'BOOL': lambda value: value,
+    'NULL': lambda value: None,
+    'B': lambda value: value,
+    'M': lambda value: {key: deserialize(item) for key, item in value.items()},
+    'L': lambda value: [deserialize(item) for item in value],
+    'SS': set,
+    'NS': lambda value: {_number(item) for item in value},
+    'BS': set
+}
+
+def deserialize(attribute):
+    """
+    Convert a DynamoDB attribute value to a Python value
+
+    Args:
+        attribute (dict): Attribute value such as {'N': '5'}
+
+    Returns:
+        The Python value
+    """
+    (kind, value), = attribute.items()
+    # Strings and numbers make up almost every attribute; skip the table lookup
+    if kind == 'S':
+        return value
+    if kind == 'N':
+        return _number(value)
+    return _DESERIALIZERS[kind](value)
+
+def serialize_item(item):
+    """Serialize every attribute of an item or key"""
+    return {name: serialize(value) for name, value in item.items()}
+
+def deserialize_item(item):
+    """Deserialize every attribute of an item or key"""
+    return {name: deserialize(value) for name, value in item.items()}
+
+# Request parameters holding an item, a key or expression values
+_SERIALIZED_PARAMETERS = ('Item', 'Key', 'ExpressionAttributeValues', 'ExclusiveStartKey')
+
+def _serialize_request(request):
+    """Copy of a request with its item, key and value parameters serialized"""
+    serialized = dict(request)
+    for name in _SERIALIZED_PARAMETERS:
+        if name in serialized:
+            serialized[name] = serialize_item(serialized[name])
+    return serialized
+
+def _deserialize_response(response):
+    """Deserialize the items, keys and attributes of a response in place"""
+    if 'Item' in response:
+        response['Item'] = deserialize_item(response['Item'])
+    if 'Items' in response:
+        response['Items'] = [deserialize_item(item) for item in response['Items']]
+    if 'Attributes' in response:
+        response['Attributes'] = deserialize_item(response['Attributes'])
+    if 'LastEvaluatedKey' in response:
+        response['LastEvaluatedKey'] = deserialize_item(response['LastEvaluatedKey'])
+    return response
+
+class DynamoDB:
+    """
+    The parts of boto3's DynamoDB service resource this project uses
+
+    Requests take and responses return plain Python values, as with the
+    resource, but go straight through a lazily created low-level client
+    without the resource layer's model loading and per-call event hooks.
+    Condition builders are not supported; expressions are strings.
+    """
+
+    @property
+    def client(self):
+        return client('dynamodb')
+
+    @property
+    def exceptions(self):
+        return self.client.exceptions
+
+    def Table(self, name):
+        """
+        Args:
+            name (str): Name of the table
+
+        Returns:
+            Table: Table bound to this service object
+        """
+        return Table(self, name)
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        request_items = {
+            table_name: dict(request, Keys=[serialize_item(key) for key in request['Keys']])
+            for table_name, request in RequestItems.items()
+        }
+        response = self.client.batch_get_item(RequestItems=request_items, **kwargs)
+        response['Responses'] = {
+            table_name: [deserialize_item(item) for item in items]
+            for table_name, items in response.get('Responses', {}).items()
+        }
+        response['UnprocessedKeys'] = {
+            table_name: dict(request, Keys=[deserialize_item(key) for key in request['Keys']])
+            for table_name, request in response.get('UnprocessedKeys', {}).items()
+        }
+        return response
+
+    def transact_write_items(self, TransactItems, **kwargs):
+        transact_items = [
+            {action: _serialize_request(request) for action, request in item.items()}
+            for item in TransactItems
+        ]
+        return self.client.transact_write_items(TransactItems=transact_items, **kwargs)
+
+class Table:
+    """The parts of boto3's Table resource this project uses"""
+
+    def __init__(self, dynamodb, name):
+        """
+        Args:
+            dynamodb (DynamoDB): Service object whose client is used
+            name (str): Name of the table
+        """
+        self.dynamodb = dynamodb
+        self.name = name
+
+    def _call(self, operation, kwargs):
+        request = _serialize_request(kwargs)
+        request['TableName'] = self.name
+        return _deserialize_response(getattr(self.dynamodb.client, operation)(**request))
+
+    def get_item(self, **kwargs):
+        return self._call('get_item', kwargs)
+
+    def put_item(self, **kwargs):
+        return self._call('put_item', kwargs)
+
+    def update_item(self, **kwargs):
+        return self._call('update_item', kwargs)
+
+    def delete_item(self, **kwargs):
+        return self._call('delete_item', kwargs)
+
+    def query(self, **kwargs):
+        return self._call('query', kwargs)
+
+    def scan(self, **kwargs):
+        return self._call('scan', kwargs)
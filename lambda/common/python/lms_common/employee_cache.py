@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 1024
+
+# Short enough that balances changed by another container are picked up
+# within one agent turn or two
+DEFAULT_TTL_SECONDS = 15
+
+def item_version(item):
+    """Version stamp of an EMPLOYEE item; items written before versioning count as 0"""
+    return int(item.get('version', 0))
+
+def version_condition(item):
+    """
+    Condition pinning an EMPLOYEE update to the version that was read
+
+    Args:
+        item (dict): EMPLOYEE item the update was planned from
+
+    Returns:
+        tuple: (condition expression, expression attribute values)
+    """
+    if 'version' not in item:
+        return "attribute_not_exists(version)", {}
+    return "version = :version", {':version': item['version']}
+
+class EmployeeCache:
+    """
+    Read-through LRU cache of EMPLOYEE items for a warm Lambda container
+
+    Entries expire after `ttl_seconds` and the least recently used entry is
+    dropped once `max_entries` is reached. Every EMPLOYEE item carries a
+    `version` attribute that balance writes increment, so a read that races
+    with a newer write never replaces the newer entry. Writes made by this
+    container go through `apply_balance_change` or `invalidate`; writes made
+    elsewhere are caught by the version conditions on balance updates, after
+    which the caller stores the current item with `put`.
+    """
+
+    def __init__(self, table, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        """
+        Args:
+            table: DynamoDB Table holding the EMPLOYEE items
+            max_entries (int): Size bound of the cache
+            ttl_seconds (float): Seconds an entry is served before it is read again
+            clock (callable): Monotonic time source
+        """
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, employee_id, refresh=False):
+        """
+        EMPLOYEE item, from the cache while it is fresh
+
+        Args:
+            employee_id (int): ID of the employee
+            refresh (bool): Skip the cache and read the item with a consistent read
+
+        Returns:
+            dict: EMPLOYEE item, or None if the employee does not exist
+        """
+        if not refresh:
+            cached = self.peek(employee_id)
+            if cached is not None:
+                return cached
+
+        response = self.table.get_item(
+            Key={
+                'id': employee_id,
+                'type': 'EMPLOYEE'
+            },
+            ConsistentRead=refresh
+        )
+        item = response.get('Item')
+        if item is None:
+            self.invalidate(employee_id)
+            return None
+        return self.put(item, replace=refresh)
+
+    def peek(self, employee_id):
+        """
+        EMPLOYEE item if a fresh one is cached, without reading the table
+
+        Args:
+            employee_id (int): ID of the employee
+
+        Returns:
+            dict: Cached EMPLOYEE item, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(employee_id)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(employee_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, item, replace=False):
+        """
+        Store an EMPLOYEE item unless a newer version is already cached
+
+        Args:
+            item (dict): EMPLOYEE item as read from the table
+            replace (bool): Store the item even if the cached version is newer
+
+        Returns:
+            dict: The cached item for that employee
+        """
+        employee_id = item['id']
+        with self._lock:
+            entry = self._entries.get(employee_id)
+            if entry is not None and not replace and item_version(entry[1]) > item_version(item):
+                return entry[1]
+
+            self._entries[employee_id] = (self.clock() + self.ttl_seconds, item)
+            self._entries.move_to_end(employee_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return item
+
+    def apply_balance_change(self, item, leave_type, delta):
+        """
+        Cache the result of a version-guarded balance update made by this container
+
+        Args:
+            item (dict): EMPLOYEE item the update was conditioned on
+            leave_type (str): Leave type whose balance changed
+            delta (int): Days added (positive) or deducted (negative)
+
+        Returns:
+            dict: Updated EMPLOYEE item
+        """
+        updated = dict(item)
+        updated['leaveBalances'] = dict(item.get('leaveBalances', {}))
+        updated['leaveBalances'][leave_type] = updated['leaveBalances'].get(leave_type, 0) + delta
+        updated['version'] = item_version(item) + 1
+        return self.put(updated, replace=True)
+
+    def invalidate(self, employee_id):
+        """
+        Drop an employee's entry, for example after an unguarded write
+
+        Args:
+            employee_id (int): ID of the employee
+        """
+        with self._lock:
+            self._entries.pop(employee_id, None)
+
+    def stats(self):
+        """
+        Counters for logging
+
+        Returns:
+            dict: hits, misses, evictions and current size
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries)
+            }
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import time
+
+# Results are replayed to retries for this long, which covers the agent's
+# retries of one call; DynamoDB TTL removes them later
+DEFAULT_TTL_SECONDS = 15 * 60
+
+# Attribute the table's TTL is configured on
+TTL_ATTRIBUTE = 'expiresAt'
+
+# A stored result about a leave request that has since reached one of these
+# statuses is not replayed: the call is handled as a new one
+CLOSED_STATUSES = ('CANCELLED', 'REJECTED')
+
+def normalize_parameters(parameters):
+    """
+    Canonical form of an action's parameters
+
+    Args:
+        parameters (dict): Parameter name to raw value
+
+    Returns:
+        list: (name, value) pairs sorted by name, values as trimmed strings,
+            without empty values
+    """
+    normalized = []
+    for name, value in sorted(parameters.items()):
+        if value is None:
+            continue
+        text = str(value).strip()
+        if text:
+            normalized.append((name, text))
+    return normalized
+
+class IdempotencyKey:
+    """
+    Result of one mutating action call, stored so that retries can replay it
+
+    The key hashes the agent session, the function and its normalized
+    parameters. The caller writes `put_item(result)` in the same transaction as
+    its mutation, so the result exists exactly when the mutation happened, and
+    checks `lookup()` before doing any work.
+
+    A result may name the leave request it is about. Once that leave is
+    cancelled or rejected the result is stale: an apply, cancel and apply of
+    the same dates in one session submits a new leave instead of replaying
+    the first one.
+    """
+
+    def __init__(self, table, session_id, function, parameters, ttl_seconds=DEFAULT_TTL_SECONDS):
+        """
+        Args:
+            table: DynamoDB Table holding the records
+            session_id (str): Agent session ID
+            function (str): Name of the action function
+            parameters (dict): Parameters of the call
+            ttl_seconds (int): How long the stored result is replayed
+        """
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.stale_result = None
+        digest = hashlib.sha256(json.dumps(
+            [session_id, function, normalize_parameters(parameters)],
+            separators=(',', ':')
+        ).encode('utf-8')).hexdigest()
+
+        # The numeric partition key spreads records out; the full digest in the
+        # sort key rules out collisions
+        self.key = {
+            'id': int(digest[:15], 16),
+            'type': f"IDEMPOTENCY#{digest}"
+        }
+
+    def lookup(self):
+        """
+        Result stored by an earlier call with the same key
+
+        Returns:
+            dict: Stored result, or None if this is the first call
+        """
+        response = self.table.get_item(Key=self.key, ConsistentRead=True)
+        item = response.get('Item')
+        if item is None or int(item.get(TTL_ATTRIBUTE, 0)) <= int(time.time()):
+            return None
+        if item.get('leaveId') is not None and self._leave_closed(item['leaveId'], item.get('leaveStatus')):
+            # put_item() may then overwrite exactly this record
+            self.stale_result = item['result']
+            return None
+        return json.loads(item['result'])
+
+    def _leave_closed(self, leave_id, recorded_status):
+        """Whether a leave is gone, or was cancelled or rejected after the result was stored"""
+        response = self.table.get_item(
+            Key={
+                'id': leave_id,
+                'type': 'LEAVE_REQUEST'
+            },
+            ConsistentRead=True,
+            ProjectionExpression='#status',
+            ExpressionAttributeNames={
+                '#status': 'status'
+            }
+        )
+        status = response.get('Item', {}).get('status')
+        return status is None or (status != recorded_status and status in CLOSED_STATUSES)
+
+    def replay(self):
+        """
+        Result of a concurrent call with the same key, after its write won
+
+        Returns:
+            dict: Stored result, or a retryable failure if it is not readable yet
+        """
+        result = self.lookup()
+        if result is None:
+            return {
+                'success': False,
+                'retryable': True,
+                'message': "The same request is already being processed. Please retry."
+            }
+        return result
+
+    def put_item(self, result, leave_id=None, leave_status=None):
+        """
+        Transaction item storing a result
+
+        The condition fails when another call with the same key has already
+        stored its result; the caller then returns that one with `replay()`.
+        A stale result found by `lookup()` is overwritten.
+
+        Args:
+            result (dict): Result returned to the agent
+            leave_id (int, optional): Leave request the result is about
+            leave_status (str, optional): Status the call leaves that request in
+
+        Returns:
+            dict: TransactItems entry
+        """
+        now = int(time.time())
+        item = dict(self.key, **{
+            'result': json.dumps(result),
+            TTL_ATTRIBUTE: now + self.ttl_seconds
+        })
+        if leave_id is not None:
+            item['leaveId'] = leave_id
+            item['leaveStatus'] = leave_status
+        condition = "attribute_not_exists(id) OR #expiresAt <= :now"
+        names = {'#expiresAt': TTL_ATTRIBUTE}
+        values = {':now': now}
+        if self.stale_result is not None:
+            condition += " OR #result = :stale"
+            names['#result'] = 'result'
+            values[':stale'] = self.stale_result
+        return {
+            'Put': {
+                'TableName': self.table.name,
+                'Item': item,
+                'ConditionExpression': condition,
+                'ExpressionAttributeNames': names,
+                'ExpressionAttributeValues': values
+            }
+        }
+
+def idempotency_key(table, event, function, parameters, ttl_seconds=DEFAULT_TTL_SECONDS):
+    """
+    Idempotency key for an agent invocation, or None without a session ID
+
+    Args:
+        table: DynamoDB Table holding the records
+        event (dict): Bedrock agent event
+        function (str): Name of the action function
+        parameters (dict): Parameters of the call
+        ttl_seconds (int): How long the stored result is replayed
+
+    Returns:
+        IdempotencyKey: Key for the call, or None
+    """
+    session_id = event.get('sessionId')
+    if not session_id:
+        return None
+    return IdempotencyKey(table, session_id, function, parameters, ttl_seconds)
@@ -0,0 +1,70 @@
+import threading
+
+# Counter item holding the number of leave IDs leased so far
+LEAVE_ID_COUNTER_KEY = {'id': 0, 'type': 'COUNTER#LEAVE_ID'}
+
+# Leave IDs start above every ID written before the counter existed. The old
+# scheme appended up to four timestamp digits to the employee ID, e.g. 10011234
+# for employee 1001, so for employee IDs below a million its IDs stay under
+# 10**10; the seed data numbers its leaves from 10001. utils/backfill_indexes.py
+# moves the counter past any older leave ID that still reaches this range
+LEAVE_ID_BASE = 10 ** 10
+
+DEFAULT_BLOCK_SIZE = 50
+
+class IdAllocator:
+    """
+    Hand out unique IDs from blocks leased off an atomic counter item
+
+    Each lease is one atomic ADD on the counter, reserving `block_size` IDs
+    that are then handed out from memory. A warm Lambda container therefore
+    writes the counter once per block instead of once per ID. IDs left in a
+    block when a container is recycled are simply never used.
+    """
+
+    def __init__(self, table, counter_key, base=0, block_size=DEFAULT_BLOCK_SIZE):
+        """
+        Args:
+            table: DynamoDB Table holding the counter item
+            counter_key (dict): Key of the counter item
+            base (int): Offset added to every ID
+            block_size (int): Number of IDs reserved per lease
+        """
+        self.table = table
+        self.counter_key = counter_key
+        self.base = base
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def _lease(self):
+        """Reserve the next block of IDs from the counter"""
+        response = self.table.update_item(
+            Key=self.counter_key,
+            UpdateExpression="ADD #leased :blockSize",
+            ExpressionAttributeNames={
+                '#leased': 'leased'
+            },
+            ExpressionAttributeValues={
+                ':blockSize': self.block_size
+            },
+            ReturnValues='UPDATED_NEW'
+        )
+        leased = int(response['Attributes']['leased'])
+        self._next = self.base + leased - self.block_size
+        self._end = self.base + leased
+
+    def next_id(self):
+        """
+        Next unused ID, leasing a new block when the current one is exhausted
+
+        Returns:
+            int: Unique ID
+        """
+        with self._lock:
+            if self._next >= self._end:
+                self._lease()
+            value = self._next
+            self._next += 1
+            return value
@@ -0,0 +1,107 @@
+import threading
+import time
+from lms_common.batch import batch_get_items
+
+# LEAVE_TYPE items are numbered from here, one item per leave type
+LEAVE_TYPE_ID_BASE = 5000
+
+# LEAVE_TYPE IDs are handed out one after another. A load reads the IDs up to
+# the last leave type found so far plus this many spare ones, and reads further
+# only while leave types turn up among the spare IDs
+SPARE_LEAVE_TYPE_IDS = 8
+
+DEFAULT_TTL_SECONDS = 300
+
+class LeavePolicy:
+    """
+    Catalog of leave types read from the table's LEAVE_TYPE items
+
+    The catalog is loaded with a BatchGetItem over the LEAVE_TYPE IDs in use
+    plus a few spare ones, so an unchanged catalog costs one request, and it
+    is kept for `ttl_seconds`. A warm container thus reads it once in a while
+    and picks up added or changed leave types without a redeploy.
+    Each LEAVE_TYPE item names its leave type in `leaveType` and holds the
+    yearly allowance in `balance`.
+    """
+
+    def __init__(self, dynamodb, table_name, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        """
+        Args:
+            dynamodb: DynamoDB service resource
+            table_name (str): Name of the table holding the LEAVE_TYPE items
+            ttl_seconds (float): Seconds the catalog is used before it is loaded again
+            clock (callable): Monotonic time source
+        """
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._leave_types = None
+        self._expires = 0
+        self._end = LEAVE_TYPE_ID_BASE  # One past the highest LEAVE_TYPE ID found
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """Read every LEAVE_TYPE item, ordered by ID"""
+        items = []
+        start, end = LEAVE_TYPE_ID_BASE, self._end + SPARE_LEAVE_TYPE_IDS
+        while True:
+            keys = [{'id': leave_type_id, 'type': 'LEAVE_TYPE'} for leave_type_id in range(start, end)]
+            items.extend(batch_get_items(self.dynamodb, self.table_name, keys))
+            last = max((item['id'] for item in items), default=LEAVE_TYPE_ID_BASE - 1)
+            if last + SPARE_LEAVE_TYPE_IDS < end:
+                break
+            # A leave type among the spare IDs; there may be more after it
+            start, end = end, last + 1 + SPARE_LEAVE_TYPE_IDS
+        self._end = last + 1
+        items.sort(key=lambda item: item['id'])
+
+        leave_types = {}
+        for item in items:
+            # Items written before leave types were named cannot be matched to one
+            if item.get('leaveType'):
+                leave_types[item['leaveType']] = item
+        return leave_types
+
+    def leave_types(self, refresh=False):
+        """
+        Leave types by name, loading the catalog when it is missing or expired
+
+        Args:
+            refresh (bool): Load the catalog even if the cached one is fresh
+
+        Returns:
+            dict: Leave type name to LEAVE_TYPE item, in ID order
+        """
+        with self._lock:
+            if refresh or self._leave_types is None or self.clock() >= self._expires:
+                self._leave_types = self._load()
+                self._expires = self.clock() + self.ttl_seconds
+            return self._leave_types
+
+    def names(self):
+        """
+        Returns:
+            list: Names of the leave types in the catalog
+        """
+        return list(self.leave_types())
+
+    def resolve(self, name):
+        """
+        Canonical name of a leave type, matched without regard to case
+
+        Args:
+            name (str): Leave type as given by the user
+
+        Returns:
+            str: Name as stored in the catalog, or None if it is not a leave type
+        """
+        if not name:
+            return None
+        leave_types = self.leave_types()
+        if name in leave_types:
+            return name
+        for known in leave_types:
+            if known.lower() == name.strip().lower():
+                return known
+        return None
@@ -0,0 +1,71 @@
+import time
+from datetime import datetime, timezone
+from lms_common.dynamo import deserialize_item
+from lms_common.idempotency import TTL_ATTRIBUTE
+
+# Sort key prefix of change records; the stream event filter matches on it
+OUTBOX_TYPE_PREFIX = 'OUTBOX#'
+
+# Change records are consumed within seconds; TTL removes them after this
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Leave request attributes copied into a change record, enough to build its
+# notification without reading the table again
+SNAPSHOT_ATTRIBUTES = (
+    'id', 'employeeId', 'employeeName', 'leaveType', 'startDate', 'endDate', 'duration',
+    'deductedDays', 'status', 'appliedAt', 'approvedAt', 'rejectedAt', 'rejectionReason', 'cancelledAt'
+)
+
+def change_record(table_name, leave_request, ttl_seconds=DEFAULT_TTL_SECONDS):
+    """
+    Transaction item recording a leave request's change for the notification stream
+
+    Written in the same transaction as the change itself, so a record exists
+    exactly when the change happened. The record is stored under the leave's
+    ID with a time-ordered `OUTBOX#<status>#<ns>` sort key.
+
+    Args:
+        table_name (str): Name of the table
+        leave_request (dict): Leave request as it is after the change
+        ttl_seconds (int): Seconds until TTL removes the record
+
+    Returns:
+        dict: TransactItems entry
+    """
+    return {
+        'Put': {
+            'TableName': table_name,
+            'Item': {
+                'id': leave_request['id'],
+                'type': f"{OUTBOX_TYPE_PREFIX}{leave_request['status']}#{time.time_ns()}",
+                'leave': {
+                    name: leave_request[name] for name in SNAPSHOT_ATTRIBUTES if leave_request.get(name) is not None
+                },
+                'createdAt': datetime.now(timezone.utc).isoformat(),
+                TTL_ATTRIBUTE: int(time.time()) + ttl_seconds
+            }
+        }
+    }
+
+def change_records(event):
+    """
+    Change records inserted in a DynamoDB stream batch
+
+    Other stream records (updates, removals by TTL, non-outbox items) are
+    skipped, so the handler also works without an event source filter.
+
+    Args:
+        event (dict): DynamoDB stream event, as delivered or as recorded
+
+    Returns:
+        list: (sequence number, change record item) pairs in stream order
+    """
+    records = []
+    for record in event.get('Records', []):
+        if record.get('eventName') != 'INSERT':
+            continue
+        image = record.get('dynamodb', {}).get('NewImage', {})
+        if not image.get('type', {}).get('S', '').startswith(OUTBOX_TYPE_PREFIX):
+            continue
+        records.append((record['dynamodb']['SequenceNumber'], deserialize_item(image)))
+    return records
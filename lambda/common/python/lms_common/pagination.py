@@ -0,0 +1,135 @@
+import time
+
+# Stop requesting pages when less than this much Lambda time is left
+DEFAULT_RESERVE_MS = 1500
+
+class Paginator:
+    """
+    Iterate over the items of a DynamoDB scan or query, one page at a time
+
+    Only the current page is held in memory, so callers that consume the
+    iterator incrementally keep a flat memory profile however large the table
+    grows. Iteration stops early when the item budget is used up or when the
+    time budget runs out; `truncated` tells a partial result from a complete
+    one and `last_evaluated_key` is the key to resume after the last page that
+    was fully consumed.
+
+    Example:
+        for leave in Paginator(table.query, context=context, IndexName=..., KeyConditionExpression=...):
+            ...
+    """
+
+    def __init__(self, operation, max_items=None, context=None, time_budget_ms=None,
+                 reserve_ms=DEFAULT_RESERVE_MS, page_size=None, **kwargs):
+        """
+        Args:
+            operation (callable): Bound table.scan or table.query method
+            max_items (int, optional): Stop after yielding this many items
+            context (LambdaContext, optional): Caps the time budget at the Lambda's remaining time
+            time_budget_ms (int, optional): Stop requesting pages after this many milliseconds
+            reserve_ms (int): Lambda time left untouched for building the response
+            page_size (int, optional): Limit passed to each request
+            **kwargs: Request parameters passed to every call of the operation
+        """
+        self.operation = operation
+        self.max_items = max_items
+        self.context = context
+        self.time_budget_ms = time_budget_ms
+        self.reserve_ms = reserve_ms
+        self.page_size = page_size
+        self.request = dict(kwargs)
+
+        self.truncated = False
+        self.last_evaluated_key = self.request.get('ExclusiveStartKey')
+        self.pages_read = 0
+        self.items_yielded = 0
+
+    def _deadline(self):
+        """Monotonic time (seconds) after which no further page is requested"""
+        budgets = []
+        if self.time_budget_ms is not None:
+            budgets.append(self.time_budget_ms)
+        if self.context is not None:
+            budgets.append(self.context.get_remaining_time_in_millis() - self.reserve_ms)
+        if not budgets:
+            return None
+        return time.monotonic() + min(budgets) / 1000.0
+
+    def _limit(self):
+        """Limit for the next request, or None to read a full page"""
+        # Limit caps the items read before filtering, so it only tracks the
+        # remaining item budget when nothing is filtered out afterwards
+        limits = []
+        if self.page_size is not None:
+            limits.append(self.page_size)
+        if self.max_items is not None and 'FilterExpression' not in self.request:
+            limits.append(self.max_items - self.items_yielded)
+        return min(limits) if limits else None
+
+    def pages(self):
+        """
+        Yield the Items list of each page
+
+        Yields:
+            list: Items of one page, trimmed to the item budget
+        """
+        deadline = self._deadline()
+
+        while True:
+            if self.max_items is not None and self.items_yielded >= self.max_items:
+                return
+            if deadline is not None and self.pages_read > 0 and time.monotonic() >= deadline:
+                self.truncated = True
+                return
+
+            request = dict(self.request)
+            limit = self._limit()
+            if limit is not None:
+                request['Limit'] = limit
+            if self.last_evaluated_key is not None:
+                request['ExclusiveStartKey'] = self.last_evaluated_key
+
+            response = self.operation(**request)
+            self.pages_read += 1
+
+            items = response.get('Items', [])
+            next_key = response.get('LastEvaluatedKey')
+
+            if self.max_items is not None:
+                remaining = self.max_items - self.items_yielded
+                if len(items) > remaining:
+                    # The rest of this page is dropped, so there is no exact resume key
+                    items = items[:remaining]
+                    self.truncated = True
+                    next_key = None
+                elif len(items) == remaining and next_key is not None:
+                    self.truncated = True
+
+            self.items_yielded += len(items)
+            if items:
+                yield items
+
+            if next_key is None:
+                if not self.truncated:
+                    self.last_evaluated_key = None
+                return
+            self.last_evaluated_key = next_key
+
+    def __iter__(self):
+        for page in self.pages():
+            yield from page
+
+def paginate(operation, max_items=None, context=None, **kwargs):
+    """
+    Yield every item of a scan or query, following LastEvaluatedKey
+
+    Args:
+        operation (callable): Bound table.scan or table.query method
+        max_items (int, optional): Stop after yielding this many items
+        context (LambdaContext, optional): Stop before the Lambda runs out of time
+        **kwargs: Request parameters passed to every call of the operation
+
+    Yields:
+        dict: Items in the order DynamoDB returns them
+    """
+    return iter(Paginator(operation, max_items=max_items, context=context, **kwargs))
@@ -0,0 +1,46 @@
+import json
+
+def parse_list(value):
+    """
+    Parse an array parameter sent by the agent into a list of strings
+
+    Bedrock passes array parameters as strings, either JSON ("[1001, 1002]")
+    or comma separated ("1001, 1002").
+
+    Args:
+        value (str or list): Raw parameter value
+
+    Returns:
+        list: Entries in the order given, trimmed, without empty entries
+    """
+    if value is None:
+        return []
+    if isinstance(value, str):
+        text = value.strip()
+        if text.startswith('['):
+            value = json.loads(text)
+        else:
+            value = text.split(',')
+    if not isinstance(value, list):
+        raise ValueError("not a list")
+
+    return [str(entry).strip() for entry in value if str(entry).strip()]
+
+def parse_int_list(value):
+    """
+    Parse an array parameter sent by the agent into a list of integers
+
+    Args:
+        value (str or list): Raw parameter value, as for parse_list
+
+    Returns:
+        list: Integers in the order given, without duplicates
+    """
+    numbers = []
+    seen = set()
+    for entry in parse_list(value):
+        number = int(entry)
+        if number not in seen:
+            seen.add(number)
+            numbers.append(number)
+    return numbers
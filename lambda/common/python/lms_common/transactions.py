@@ -0,0 +1,157 @@
+from botocore.exceptions import ClientError
+from lms_common.dynamo import deserialize_item
+
+# Cancellation reasons caused by contention rather than by a failed condition
+RETRYABLE_REASONS = {'TransactionConflict', 'ThrottlingError', 'ProvisionedThroughputExceeded'}
+
+# Errors raised when another transaction holds one of the items
+RETRYABLE_ERRORS = {'TransactionConflictException', 'TransactionInProgressException'}
+
+class TransactionFailed(Exception):
+    """
+    A TransactWriteItems call was cancelled
+
+    `reasons` holds one entry per transaction item, in request order, each
+    with a `Code` ('None' for items that did not cause the cancellation) and,
+    when ReturnValuesOnConditionCheckFailure was ALL_OLD, the current `Item`.
+    """
+
+    def __init__(self, reasons, retryable=False):
+        super().__init__(f"Transaction cancelled: {[reason.get('Code') for reason in reasons]}")
+        self.reasons = reasons
+        self.retryable = retryable or any(reason.get('Code') in RETRYABLE_REASONS for reason in reasons)
+
+    def failed(self, index):
+        """
+        Cancellation reason of one transaction item
+
+        Args:
+            index (int): Position of the item in TransactItems
+
+        Returns:
+            dict: Reason with Code/Message/Item, or None if that item did not fail
+        """
+        if index >= len(self.reasons):
+            return None
+        reason = self.reasons[index]
+        if reason.get('Code') in (None, 'None'):
+            return None
+        return reason
+
+def _decode_reason(reason):
+    """Deserialize the ALL_OLD item attached to a cancellation reason"""
+    decoded = {key: value for key, value in reason.items() if key != 'Item'}
+    if 'Item' in reason:
+        decoded['Item'] = deserialize_item(reason['Item'])
+    return decoded
+
+def transact_write(client, transact_items):
+    """
+    Run a TransactWriteItems call, turning cancellations into TransactionFailed
+
+    Args:
+        client: DynamoDB service object (lms_common.dynamo.DynamoDB)
+        transact_items (list): TransactItems entries
+
+    Raises:
+        TransactionFailed: When a condition failed or the items were under contention
+    """
+    try:
+        client.transact_write_items(TransactItems=transact_items)
+    except ClientError as e:
+        code = e.response.get('Error', {}).get('Code')
+        if code == 'TransactionCanceledException':
+            reasons = [_decode_reason(reason) for reason in e.response.get('CancellationReasons', [])]
+            raise TransactionFailed(reasons) from e
+        if code in RETRYABLE_ERRORS:
+            raise TransactionFailed([], retryable=True) from e
+        raise
+
+# TransactWriteItems accepts at most 100 actions per call
+MAX_TRANSACTION_ITEMS = 100
+
+class TransactionGroup:
+    """
+    Transaction items that must succeed or fail together
+
+    Groups sharing a `partition` (for example the same employee item) are
+    never placed in the same TransactWriteItems call, since a transaction
+    may not touch one item twice.
+    """
+
+    def __init__(self, key, items, partition=None):
+        """
+        Args:
+            key: Caller's identifier for the group
+            items (list): TransactItems entries
+            partition (optional): Groups with equal partitions go to separate calls
+        """
+        self.key = key
+        self.items = items
+        self.partition = partition
+
+def _chunk_groups(groups, max_items):
+    """Pack groups into as few transactions as the size and partition rules allow"""
+    chunks = []
+    for group in groups:
+        for chunk in chunks:
+            if (sum(len(g.items) for g in chunk) + len(group.items) <= max_items
+                    and (group.partition is None or all(g.partition != group.partition for g in chunk))):
+                chunk.append(group)
+                break
+        else:
+            chunks.append([group])
+    return chunks
+
+def transact_groups(client, groups, max_items=MAX_TRANSACTION_ITEMS):
+    """
+    Apply groups of writes in chunked transactions, isolating failing groups
+
+    Each group is atomic on its own. When a chunk is cancelled, the groups
+    that caused it are reported as failed and the rest of the chunk is
+    retried, so one bad group never blocks the others.
+
+    Args:
+        client: DynamoDB service object (lms_common.dynamo.DynamoDB)
+        groups (list): TransactionGroup objects, each at most max_items long
+        max_items (int): Actions per TransactWriteItems call
+
+    Returns:
+        dict: Group key to None on success, or to a TransactionFailed holding
+            only that group's reasons (retryable for contention)
+    """
+    outcomes = {}
+    pending = _chunk_groups(groups, max_items)
+
+    while pending:
+        chunk = pending.pop(0)
+        try:
+            transact_write(client, [item for group in chunk for item in group.items])
+        except TransactionFailed as e:
+            if not e.reasons:
+                # Contention without per-item reasons: every group may retry
+                for group in chunk:
+                    outcomes[group.key] = TransactionFailed([], retryable=True)
+                continue
+
+            survivors = []
+            offset = 0
+            for group in chunk:
+                reasons = e.reasons[offset:offset + len(group.items)]
+                offset += len(group.items)
+                if any(reason.get('Code') not in (None, 'None') for reason in reasons):
+                    outcomes[group.key] = TransactionFailed(reasons)
+                else:
+                    survivors.append(group)
+
+            if survivors and len(survivors) < len(chunk):
+                pending.insert(0, survivors)
+            else:
+                for group in survivors:
+                    outcomes[group.key] = TransactionFailed([], retryable=True)
+            continue
+
+        for group in chunk:
+            outcomes[group.key] = None
+
+    return outcomes
@@ -0,0 +1,127 @@
+import json
+import os
+import logging
+from lms_common.dynamo import DynamoDB
+from lms_common.transactions import transact_write, TransactionFailed
+from lms_common.employee_cache import EmployeeCache, DEFAULT_MAX_ENTRIES, DEFAULT_TTL_SECONDS
+from lms_common.aggregates import (
+    leave_changes, stats_deltas, department_deltas, stats_update, cursor_put,
+    employee_stats_key, department_stats_key, LEAVE_DEPARTMENT_ATTRIBUTE, STATS_DEPARTMENT_ATTRIBUTE
+)
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Initialize DynamoDB client; the low-level client is created on first use
+dynamodb = DynamoDB()
+table = dynamodb.Table(os.environ.get('TABLE_NAME', 'LeaveManagementTable'))
+
+# EMPLOYEE items cached across invocations of a warm container; only the
+# department of leave requests written before they carried one is read from them
+employee_cache = EmployeeCache(
+    table,
+    max_entries=int(os.environ.get('EMPLOYEE_CACHE_SIZE', DEFAULT_MAX_ENTRIES)),
+    ttl_seconds=float(os.environ.get('EMPLOYEE_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+)
+
+def department_of(leave_request):
+    """
+    Department a leave request counts for
+
+    Args:
+        leave_request (dict): LEAVE_REQUEST image, or None
+
+    Returns:
+        str: The department stored on the leave when it was applied for; for
+            older leaves without one, the employee's current department.
+            None for no image or an unknown department
+    """
+    if leave_request is None:
+        return None
+    if leave_request.get(LEAVE_DEPARTMENT_ATTRIBUTE):
+        return leave_request[LEAVE_DEPARTMENT_ATTRIBUTE]
+    employee = employee_cache.get(leave_request['employeeId'])
+    return (employee or {}).get('department')
+
+def aggregate_items(sequence_number, old_image, new_image):
+    """
+    Transaction items applying one leave request change to the aggregates
+
+    Args:
+        sequence_number (str): Stream sequence number of the change
+        old_image (dict): LEAVE_REQUEST before the change, or None
+        new_image (dict): LEAVE_REQUEST after the change, or None
+
+    Returns:
+        list: TransactItems entries, the leave's cursor first; empty when the
+            change does not touch the aggregates
+    """
+    deltas = stats_deltas(old_image, new_image)
+    # Each image counts for the department it carries
+    changes = department_deltas(old_image, new_image, department_of(old_image), department_of(new_image))
+    if not deltas and not changes:
+        return []
+
+    leave_request = new_image or old_image
+    employee_id = leave_request['employeeId']
+
+    items = [cursor_put(table.name, leave_request['id'], sequence_number)]
+    for year, delta in deltas.items():
+        items.append(stats_update(table.name, employee_stats_key(employee_id, year), delta, {
+            'employeeId': employee_id,
+            'employeeName': leave_request.get('employeeName', 'Unknown'),
+            'year': year
+        }))
+    for department, department_changes in changes.items():
+        for year, delta in department_changes.items():
+            items.append(stats_update(table.name, department_stats_key(department, year), delta, {
+                STATS_DEPARTMENT_ATTRIBUTE: department,
+                'year': year
+            }))
+    return items
+
+def lambda_handler(event, context):
+    """
+    Apply a DynamoDB stream batch of leave request changes to the aggregates
+
+    Each change is applied in its own transaction together with the leave's
+    stream cursor, so a change delivered again is skipped instead of counted
+    twice. Changes are applied in stream order; on the first failure the rest
+    of the batch is reported for retry.
+
+    Args:
+        event (dict): DynamoDB stream event with old and new images
+        context (LambdaContext): Context object from AWS Lambda
+
+    Returns:
+        dict: batchItemFailures with the sequence numbers to retry
+    """
+    changes = leave_changes(event)
+    applied = 0
+    skipped = 0
+    for sequence_number, old_image, new_image in changes:
+        try:
+            items = aggregate_items(sequence_number, old_image, new_image)
+            if not items:
+                continue
+            transact_write(dynamodb, items)
+            applied += 1
+        except TransactionFailed as e:
+            if not e.retryable and e.failed(0) is not None:
+                # The cursor is already at or past this change
+                skipped += 1
+                continue
+            logger.error(f"Error aggregating stream record {sequence_number}: {str(e)}")
+            return {'batchItemFailures': [{'itemIdentifier': sequence_number}]}
+        except Exception as e:
+            logger.error(f"Error aggregating stream record {sequence_number}: {str(e)}")
+            return {'batchItemFailures': [{'itemIdentifier': sequence_number}]}
+
+    logger.info(json.dumps({
+        'changes': len(changes),
+        'applied': applied,
+        'alreadyApplied': skipped,
+        'employeeCache': employee_cache.stats()
+    }))
+    return {'batchItemFailures': []}
@@ -1,22 +1,131 @@
 import json
-import boto3
 import os
 from datetime import datetime
-from boto3.dynamodb.conditions import Key
-from decimal import Decimal
+import logging
+from lms_common.dynamo import DynamoDB
+from lms_common.pagination import Paginator
+from lms_common.transactions import transact_write, TransactionFailed
+from lms_common.ids import IdAllocator, LEAVE_ID_COUNTER_KEY, LEAVE_ID_BASE, DEFAULT_BLOCK_SIZE
+from lms_common.batch import batch_get_items
+from lms_common.dispatch import action_table, unknown_function
+from lms_common.employee_cache import EmployeeCache, version_condition, DEFAULT_MAX_ENTRIES, DEFAULT_TTL_SECONDS
+from lms_common.data_access import LeaveReader
+from lms_common.leave_policy import LeavePolicy, DEFAULT_TTL_SECONDS as DEFAULT_POLICY_TTL_SECONDS
+from lms_common.idempotency import idempotency_key, DEFAULT_TTL_SECONDS as DEFAULT_IDEMPOTENCY_TTL_SECONDS
+from lms_common.outbox import change_record
+from lms_common.absences import absence_updates
+from lms_common.business_days import HolidayCalendar, deducted_days, DEFAULT_REGION as DEFAULT_HOLIDAY_REGION
+from lms_common.aggregates import employee_stats_key, department_stats_key, summarize, LEAVE_DEPARTMENT_ATTRIBUTE
 
-# Custom JSON encoder to handle Decimal objects
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super(DecimalEncoder, self).default(obj)
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
+# Initialize DynamoDB client; the low-level client is created on first use
+dynamodb = DynamoDB()
 table = dynamodb.Table(os.environ.get('TABLE_NAME', 'LeaveManagementTable'))
 
-def apply_leave(employee_id, start_date, end_date, leave_type):
+# Global secondary index keyed on employeeId (partition) and appliedAt (sort)
+EMPLOYEE_LEAVE_INDEX = os.environ.get('EMPLOYEE_LEAVE_INDEX', 'EmployeeLeaveIndex')
+
+# Global secondary index keyed on employeeId (partition) and endDate (sort); an
+# overlap check reads only the leaves ending on or after the new start date
+EMPLOYEE_LEAVE_END_INDEX = os.environ.get('EMPLOYEE_LEAVE_END_INDEX', 'EmployeeLeaveEndIndex')
+
+# Leave IDs are leased from a counter item in blocks and handed out from memory
+leave_ids = IdAllocator(
+    table,
+    LEAVE_ID_COUNTER_KEY,
+    base=LEAVE_ID_BASE,
+    block_size=int(os.environ.get('LEAVE_ID_BLOCK_SIZE', DEFAULT_BLOCK_SIZE))
+)
+
+# Attempts at writing a leave request before giving up on ID collisions
+MAX_ID_ATTEMPTS = 5
+
+# EMPLOYEE items cached across invocations of a warm container
+employee_cache = EmployeeCache(
+    table,
+    max_entries=int(os.environ.get('EMPLOYEE_CACHE_SIZE', DEFAULT_MAX_ENTRIES)),
+    ttl_seconds=float(os.environ.get('EMPLOYEE_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+)
+
+# Leave requests read together with their employee, remembering whose they are
+leave_reader = LeaveReader(dynamodb, table, employee_cache)
+
+# Leave types read from the LEAVE_TYPE items and reloaded every few minutes
+leave_policy = LeavePolicy(
+    dynamodb,
+    table.name,
+    ttl_seconds=float(os.environ.get('LEAVE_POLICY_TTL_SECONDS', DEFAULT_POLICY_TTL_SECONDS))
+)
+
+# Working days of a leave, from the HOLIDAYS#<REGION> items read once per container
+holiday_calendar = HolidayCalendar(
+    dynamodb,
+    table.name,
+    default_region=os.environ.get('HOLIDAY_REGION', DEFAULT_HOLIDAY_REGION)
+)
+
+# Functions whose results are stored so that agent retries replay them
+IDEMPOTENT_FUNCTIONS = {'apply_leave'}
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', DEFAULT_IDEMPOTENCY_TTL_SECONDS))
+
+# Attempts at a balance update when the cached employee turns out to be stale
+MAX_VERSION_ATTEMPTS = 3
+
+# Outbox mode: every state change also writes a change record, from which the
+# notification Lambda sends emails via the table's stream
+NOTIFICATION_OUTBOX = os.environ.get('NOTIFICATION_OUTBOX', 'false').lower() == 'true'
+
+# Sparse index of EMPLOYEE items keyed on department (partition) and id (sort)
+DEPARTMENT_EMPLOYEE_INDEX = os.environ.get('DEPARTMENT_EMPLOYEE_INDEX', 'DepartmentEmployeeIndex')
+
+# Employees returned by one get_leave_balances call; keeps the agent response small
+MAX_BALANCE_ROWS = 200
+
+# Attributes read for the balance table ('name' is a reserved word)
+BALANCE_PROJECTION = 'id, #type, #name, department, leaveBalances'
+BALANCE_ATTRIBUTE_NAMES = {'#type': 'type', '#name': 'name'}
+
+def find_overlapping_leave(employee_id, start_date, end_date, context=None):
+    """
+    First PENDING or APPROVED leave of an employee that overlaps a date range
+    
+    The index query returns only leaves ending on or after start_date; of
+    those, a leave overlaps when it starts on or before end_date. Dates are
+    YYYY-MM-DD strings, which order like the dates themselves.
+    
+    Args:
+        employee_id (int): ID of the employee
+        start_date (str): First day of the range (YYYY-MM-DD)
+        end_date (str): Last day of the range (YYYY-MM-DD)
+        context (LambdaContext, optional): Bounds the lookup by the Lambda's remaining time
+        
+    Returns:
+        dict: Overlapping leave request, or None
+    """
+    for leave in Paginator(
+        table.query,
+        context=context,
+        IndexName=EMPLOYEE_LEAVE_END_INDEX,
+        KeyConditionExpression="employeeId = :employeeId AND endDate >= :startDate",
+        FilterExpression="#status IN (:pending, :approved)",
+        ExpressionAttributeNames={
+            '#status': 'status'
+        },
+        ExpressionAttributeValues={
+            ':employeeId': employee_id,
+            ':startDate': start_date,
+            ':pending': 'PENDING',
+            ':approved': 'APPROVED'
+        }
+    ):
+        if leave.get('startDate', end_date) <= end_date:
+            return leave
+    return None
+
+def apply_leave(employee_id, start_date, end_date, leave_type, idempotency=None, context=None):
     """
     Apply for a leave
     
@@ -25,26 +134,77 @@ def apply_leave(employee_id, start_date, end_date, leave_type):
         start_date (str): Start date of the leave (YYYY-MM-DD)
         end_date (str): End date of the leave (YYYY-MM-DD)
         leave_type (str): Type of leave (e.g., Annual, Sick, Personal)
+        idempotency (IdempotencyKey, optional): Stores the result with the leave request
+        context (LambdaContext, optional): Bounds the overlap lookup by the Lambda's remaining time
         
     Returns:
         dict: Leave request details
     """
     try:
-        # Get the employee record
-        response = table.get_item(
-            Key={
-                'id': employee_id,
-                'type': 'EMPLOYEE'
+        # Validate the leave type against the policy catalog before any employee read;
+        # without a catalog the employee's balances decide as before
+        leave_type_names = leave_policy.names()
+        if leave_type_names:
+            canonical_type = leave_policy.resolve(leave_type)
+            if canonical_type is None:
+                return {
+                    'success': False,
+                    'message': f"Unknown leave type {leave_type}. Valid leave types: {', '.join(leave_type_names)}"
+                }
+            leave_type = canonical_type
+        
+        # Calendar days covered; the working days charged are counted below
+        start_date_obj = datetime.strptime(start_date, "%Y-%m-%d")
+        end_date_obj = datetime.strptime(end_date, "%Y-%m-%d")
+        duration = (end_date_obj - start_date_obj).days + 1  # Include both start and end dates
+        if duration < 1:
+            return {
+                'success': False,
+                'message': f"End date {end_date} is before start date {start_date}"
+            }
+        
+        # Turn down dates the employee has already asked for before reading or
+        # writing anything else, so duplicates never reach approval
+        overlapping = find_overlapping_leave(employee_id, start_date, end_date, context=context)
+        if overlapping is not None:
+            return {
+                'success': False,
+                'message': (
+                    f"The requested dates overlap leave request {overlapping['id']} "
+                    f"({overlapping.get('leaveType', 'Unknown')}, {overlapping.get('startDate')} to {overlapping['endDate']}, "
+                    f"{overlapping['status'].lower()}). Cancel or change that request first."
+                ),
+                'overlappingLeaveId': overlapping['id']
             }
-        )
         
-        if 'Item' not in response:
+        # Get the employee record
+        employee = employee_cache.get(employee_id)
+        
+        if employee is None:
             return {
                 'success': False,
                 'message': f"Employee with ID {employee_id} not found"
             }
         
-        employee = response['Item']
+        # Only working days are charged: weekends and the holidays of the
+        # employee's region are left out
+        days = holiday_calendar.business_days(start_date, end_date, holiday_calendar.region_of(employee))
+        if days < 1:
+            return {
+                'success': False,
+                'message': f"The leave from {start_date} to {end_date} has no working days; it falls on weekends or public holidays only"
+            }
+        
+        # A cached record may be behind another container's writes; never
+        # turn a request down on it without reading the current one
+        balances = employee.get('leaveBalances', {})
+        if leave_type not in balances or balances[leave_type] < days:
+            employee = employee_cache.get(employee_id, refresh=True)
+            if employee is None:
+                return {
+                    'success': False,
+                    'message': f"Employee with ID {employee_id} not found"
+                }
         
         # Check if leave type exists and employee has sufficient balance
         if 'leaveBalances' not in employee or leave_type not in employee['leaveBalances']:
@@ -53,26 +213,16 @@ def apply_leave(employee_id, start_date, end_date, leave_type):
                 'message': f"Leave type {leave_type} not found in employee's leave balances"
             }
         
-        # Calculate duration in days
-        start_date_obj = datetime.strptime(start_date, "%Y-%m-%d")
-        end_date_obj = datetime.strptime(end_date, "%Y-%m-%d")
-        duration = (end_date_obj - start_date_obj).days + 1  # Include both start and end dates
-        
         # Check if employee has sufficient leave balance
         current_balance = employee['leaveBalances'][leave_type]
-        if current_balance < duration:
+        if current_balance < days:
             return {
                 'success': False,
-                'message': f"Insufficient leave balance. Available: {current_balance}, Required: {duration}"
+                'message': f"Insufficient leave balance. Available: {current_balance}, Required: {days}"
             }
         
-        # Generate a unique leave ID
-        timestamp = int(datetime.now().timestamp())
-        leave_id = int(f"{employee_id}{timestamp % 10000}")
-        
         # Create the leave request
         leave_request = {
-            'id': leave_id,
             'type': 'LEAVE_REQUEST',
             'employeeId': employee_id,
             'employeeName': employee.get('name', 'Unknown'),
@@ -80,29 +230,75 @@ def apply_leave(employee_id, start_date, end_date, leave_type):
             'endDate': end_date,
             'leaveType': leave_type,
             'duration': duration,
+            'deductedDays': days,
             'status': 'PENDING',
+            'pendingStatus': 'PENDING',  # Sparse key for the pending queue index
             'appliedAt': datetime.now().isoformat()
         }
-        
-        # Save the leave request to DynamoDB
-        table.put_item(Item=leave_request)
-        
-        return {
-            'success': True,
-            'message': f"Leave request submitted successfully",
-            'leaveId': leave_id,
-            'status': 'PENDING',
-            'duration': duration,
-            'leaveType': leave_type,
-            'availableBalance': current_balance
-        }
+        if employee.get('department'):
+            # The department aggregates count the leave for the department it was applied in
+            leave_request[LEAVE_DEPARTMENT_ATTRIBUTE] = employee['department']
+        
+        # Save the leave request under a freshly allocated ID. The condition
+        # guarantees an existing item is never overwritten; on the rare clash
+        # with an older ID the next one is tried
+        for attempt in range(MAX_ID_ATTEMPTS):
+            leave_id = leave_ids.next_id()
+            leave_request['id'] = leave_id
+            result = {
+                'success': True,
+                'message': f"Leave request submitted successfully",
+                'leaveId': leave_id,
+                'status': 'PENDING',
+                'duration': duration,
+                'deductedDays': days,
+                'leaveType': leave_type,
+                'availableBalance': current_balance
+            }
+            try:
+                if idempotency is None and not NOTIFICATION_OUTBOX:
+                    table.put_item(
+                        Item=leave_request,
+                        ConditionExpression="attribute_not_exists(id)"
+                    )
+                else:
+                    transact_items = [
+                        {
+                            'Put': {
+                                'TableName': table.name,
+                                'Item': leave_request,
+                                'ConditionExpression': "attribute_not_exists(id)"
+                            }
+                        }
+                    ]
+                    if idempotency is not None:
+                        # Store the result with the leave so a retried call replays it
+                        transact_items.append(idempotency.put_item(result, leave_id, 'PENDING'))
+                    if NOTIFICATION_OUTBOX:
+                        transact_items.append(change_record(table.name, leave_request))
+                    transact_write(dynamodb, transact_items)
+                break
+            except dynamodb.exceptions.ConditionalCheckFailedException:
+                if attempt == MAX_ID_ATTEMPTS - 1:
+                    raise
+            except TransactionFailed as e:
+                if idempotency is not None and e.failed(1) is not None:
+                    # A duplicate of this call submitted the leave first
+                    return idempotency.replay()
+                if e.failed(0) is None or attempt == MAX_ID_ATTEMPTS - 1:
+                    raise
+        
+        # A notification or approval of this leave from the same container can
+        # then read the leave and the employee together
+        leave_reader.remember(leave_id, employee_id)
+        return result
     except Exception as e:
         return {
             'success': False,
             'message': f"Error applying for leave: {str(e)}"
         }
 
-def cancel_leave(leave_id=None, employee_id=None, leave_type=None, start_date=None):
+def cancel_leave(leave_id=None, employee_id=None, leave_type=None, start_date=None, context=None):
     """
     Cancel a leave request
     
@@ -111,6 +307,7 @@ def cancel_leave(leave_id=None, employee_id=None, leave_type=None, start_date=No
         employee_id (int, optional): ID of the employee
         leave_type (str, optional): Type of leave
         start_date (str, optional): Start date of the leave (YYYY-MM-DD)
+        context (LambdaContext, optional): Bounds the lookup by the Lambda's remaining time
         
     Returns:
         dict: Updated leave request details
@@ -132,20 +329,23 @@ def cancel_leave(leave_id=None, employee_id=None, leave_type=None, start_date=No
         
         # If leave_id is not provided but employee_id and leave_type are provided
         elif employee_id is not None and leave_type is not None and start_date is not None:
-            # Query leave requests for this employee with the specified leave type and start date
-            scan_response = table.scan(
-                FilterExpression=Key('type').eq('LEAVE_REQUEST') & 
-                                Key('employeeId').eq(employee_id) & 
-                                Key('leaveType').eq(leave_type) & 
-                                Key('startDate').eq(start_date)
-            )
+            # Read this employee's leaves newest first and stop at the most recent match
+            leave_request = next(iter(Paginator(
+                table.query,
+                max_items=1,
+                context=context,
+                IndexName=EMPLOYEE_LEAVE_INDEX,
+                KeyConditionExpression="employeeId = :employeeId",
+                FilterExpression="leaveType = :leaveType AND startDate = :startDate",
+                ExpressionAttributeValues={
+                    ':employeeId': employee_id,
+                    ':leaveType': leave_type,
+                    ':startDate': start_date
+                },
+                ScanIndexForward=False
+            )), None)
             
-            leaves = scan_response.get('Items', [])
-            
-            # Get the most recent leave request if multiple exist
-            if leaves:
-                leaves.sort(key=lambda x: x.get('appliedAt', ''), reverse=True)
-                leave_request = leaves[0]
+            if leave_request is not None:
                 leave_id = leave_request['id']
         
         if leave_request is None:
@@ -164,67 +364,134 @@ def cancel_leave(leave_id=None, employee_id=None, leave_type=None, start_date=No
         # Store the previous status to check if it was approved
         previous_status = leave_request['status']
         
-        # Update the leave request status
-        # Import timezone from datetime to create aware datetime objects
+        # Only flip the status if nobody changed it since it was read, so an
+        # approval racing with this cancellation cannot leave the balance short
         from datetime import timezone  # Used to create timezone-aware datetime objects for accurate timestamp representation
-        table.update_item(
-            Key={
+        cancelled_at = datetime.now(timezone.utc).isoformat()
+        leave_update = {
+            'Key': {
                 'id': leave_id,
                 'type': 'LEAVE_REQUEST'
             },
-            UpdateExpression="SET #status = :status, cancelledAt = :cancelledAt",
-            ExpressionAttributeNames={
+            'UpdateExpression': "SET #status = :cancelled, cancelledAt = :cancelledAt REMOVE pendingStatus",
+            'ConditionExpression': "#status = :previousStatus",
+            'ExpressionAttributeNames': {
                 '#status': 'status'
             },
-            ExpressionAttributeValues={
-                ':status': 'CANCELLED',
-                ':cancelledAt': datetime.now(timezone.utc).isoformat()
+            'ExpressionAttributeValues': {
+                ':cancelled': 'CANCELLED',
+                ':previousStatus': previous_status,
+                ':cancelledAt': cancelled_at
             }
-        )
+        }
         
-        # If the leave was previously approved, restore the leave balance
-        if previous_status == 'APPROVED':
-            employee_id = leave_request['employeeId']
-            leave_type = leave_request['leaveType']
-            duration = leave_request.get('duration', 1)  # Default to 1 day if duration not specified
-            
-            # Get the employee record
-            employee_response = table.get_item(
-                Key={
-                    'id': employee_id,
-                    'type': 'EMPLOYEE'
-                }
-            )
-            
-            if 'Item' in employee_response:
-                employee = employee_response['Item']
+        # In outbox mode the cancellation is recorded for the notification stream
+        outbox_items = []
+        calendar_items = []
+        if NOTIFICATION_OUTBOX:
+            outbox_items.append(change_record(table.name, dict(leave_request, status='CANCELLED', cancelledAt=cancelled_at)))
+        
+        try:
+            if previous_status == 'APPROVED':
+                # Restore the balance in the same transaction with an atomic ADD
+                employee_id = leave_request['employeeId']
+                leave_type = leave_request['leaveType']
+                duration = deducted_days(leave_request)  # The days charged when the leave was approved
                 
-                if 'leaveBalances' in employee and leave_type in employee['leaveBalances']:
-                    current_balance = employee['leaveBalances'][leave_type]
-                    new_balance = current_balance + duration
+                employee = employee_cache.get(employee_id)
+                for attempt in range(MAX_VERSION_ATTEMPTS):
+                    # Free the days in the department's absence calendar
+                    calendar_items = []
+                    if employee is not None and employee.get('department'):
+                        calendar_items = absence_updates(table.name, employee['department'], [
+                            (employee_id, leave_request.get('employeeName'), leave_request['startDate'], leave_request['endDate'])
+                        ], remove=True)
                     
-                    # Update the employee's leave balance
-                    table.update_item(
-                        Key={
-                            'id': employee_id,
-                            'type': 'EMPLOYEE'
-                        },
-                        UpdateExpression="SET leaveBalances.#leaveType = :newBalance",
-                        ExpressionAttributeNames={
-                            '#leaveType': leave_type
-                        },
-                        ExpressionAttributeValues={
-                            ':newBalance': new_balance
-                        }
-                    )
+                    if employee is None or leave_type not in employee.get('leaveBalances', {}):
+                        # The employee or leave type no longer exists, so there is no
+                        # balance to restore; cancel the leave on its own below
+                        break
                     
+                    # Pin the update to the cached version so the new balance is known exactly
+                    version_expression, version_values = version_condition(employee)
+                    try:
+                        transact_write(dynamodb, [
+                            {
+                                'Update': dict(leave_update, TableName=table.name, ReturnValuesOnConditionCheckFailure='ALL_OLD')
+                            },
+                            {
+                                'Update': {
+                                    'TableName': table.name,
+                                    'Key': {
+                                        'id': employee_id,
+                                        'type': 'EMPLOYEE'
+                                    },
+                                    'UpdateExpression': "ADD leaveBalances.#leaveType :duration, version :one",
+                                    'ConditionExpression': f"attribute_exists(leaveBalances.#leaveType) AND {version_expression}",
+                                    'ExpressionAttributeNames': {
+                                        '#leaveType': leave_type
+                                    },
+                                    'ExpressionAttributeValues': dict(version_values, **{
+                                        ':duration': duration,
+                                        ':one': 1
+                                    }),
+                                    'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+                                }
+                            }
+                        ] + outbox_items + calendar_items)
+                    except TransactionFailed as e:
+                        if e.retryable:
+                            employee_cache.invalidate(employee_id)
+                            return {
+                                'success': False,
+                                'retryable': True,
+                                'message': f"Leave request with ID {leave_id} is being updated by another request. Please retry."
+                            }
+                        
+                        leave_failure = e.failed(0)
+                        if leave_failure is not None:
+                            status = leave_failure.get('Item', {}).get('status', 'UNKNOWN')
+                            return {
+                                'success': False,
+                                'retryable': status != 'CANCELLED',
+                                'message': f"Leave request status changed to {status.lower()} while cancelling"
+                            }
+                        
+                        # The cached employee was stale; try again with the current item
+                        current = (e.failed(1) or {}).get('Item')
+                        if current is None:
+                            employee_cache.invalidate(employee_id)
+                            employee = None
+                        else:
+                            employee = employee_cache.put(current, replace=True)
+                        continue
+                    
+                    employee = employee_cache.apply_balance_change(employee, leave_type, duration)
                     return {
                         'success': True,
                         'message': f"Leave request with ID {leave_id} has been cancelled. Restored {duration} days to {leave_type} leave balance.",
                         'leaveId': leave_id,
                         'leaveType': leave_type,
-                        'newBalance': new_balance
+                        'daysRestored': duration,
+                        'newBalance': employee['leaveBalances'][leave_type]
+                    }
+                else:
+                    return {
+                        'success': False,
+                        'retryable': True,
+                        'message': f"Leave balance of employee {employee_id} is being updated by another request. Please retry."
                     }
+            
+            if outbox_items or calendar_items:
+                transact_write(dynamodb, [{'Update': dict(leave_update, TableName=table.name)}] + outbox_items + calendar_items)
+            else:
+                table.update_item(**leave_update)
+        except (dynamodb.exceptions.ConditionalCheckFailedException, TransactionFailed):
+            return {
+                'success': False,
+                'retryable': True,
+                'message': f"Leave request with ID {leave_id} was updated by another request. Please retry."
+            }
         
         return {
             'success': True,
@@ -249,21 +516,14 @@ def get_leave_balance(employee_id):
     """
     try:
         # Get the employee record
-        response = table.get_item(
-            Key={
-                'id': employee_id,
-                'type': 'EMPLOYEE'
-            }
-        )
+        employee = employee_cache.get(employee_id)
         
-        if 'Item' not in response:
+        if employee is None:
             return {
                 'success': False,
                 'message': f"Employee with ID {employee_id} not found"
             }
         
-        employee = response['Item']
-        
         # Extract leave balances
         if 'leaveBalances' in employee:
             return {
@@ -289,13 +549,160 @@ def get_leave_balance(employee_id):
             'message': f"Error retrieving leave balance: {str(e)}"
         }
 
-def get_leave_status(employee_id=None, leave_id=None):
+def get_leave_balances(employee_ids=None, department=None, context=None):
+    """
+    Get leave balances for several employees in one call
+    
+    Args:
+        employee_ids (list, optional): IDs of the employees
+        department (str, optional): Department whose employees to include (used when no IDs are given)
+        context (LambdaContext, optional): Bounds the department lookup by the Lambda's remaining time
+        
+    Returns:
+        dict: Compact table with one row per employee and one column per leave type
+    """
+    try:
+        not_found = []
+        truncated = False
+        
+        if employee_ids:
+            if len(employee_ids) > MAX_BALANCE_ROWS:
+                return {
+                    'success': False,
+                    'message': f"At most {MAX_BALANCE_ROWS} employees can be looked up at once"
+                }
+            
+            # One BatchGetItem round trip per 100 employees
+            found = {
+                employee['id']: employee
+                for employee in batch_get_items(
+                    dynamodb, table.name,
+                    [{'id': employee_id, 'type': 'EMPLOYEE'} for employee_id in employee_ids],
+                    projection=BALANCE_PROJECTION,
+                    attribute_names=BALANCE_ATTRIBUTE_NAMES
+                )
+            }
+            employees = [found[employee_id] for employee_id in employee_ids if employee_id in found]
+            not_found = [employee_id for employee_id in employee_ids if employee_id not in found]
+        elif department:
+            # The department index carries name and balances, so no further reads are needed.
+            # Only EMPLOYEE items belong in it; the filter keeps out any other
+            # item that carries a department attribute
+            paginator = Paginator(
+                table.query,
+                max_items=MAX_BALANCE_ROWS,
+                context=context,
+                IndexName=DEPARTMENT_EMPLOYEE_INDEX,
+                KeyConditionExpression="department = :department",
+                FilterExpression="#type = :employee",
+                ExpressionAttributeNames={
+                    '#type': 'type'
+                },
+                ExpressionAttributeValues={
+                    ':department': department,
+                    ':employee': 'EMPLOYEE'
+                }
+            )
+            employees = list(paginator)
+            truncated = paginator.truncated
+        else:
+            return {
+                'success': False,
+                'message': "Either employee_ids or department must be provided"
+            }
+        
+        # Leave types in the order they first appear
+        leave_types = []
+        for employee in employees:
+            for leave_type in employee.get('leaveBalances', {}):
+                if leave_type not in leave_types:
+                    leave_types.append(leave_type)
+        
+        rows = []
+        for employee in employees:
+            balances = employee.get('leaveBalances', {})
+            rows.append(
+                [employee['id'], employee.get('name', 'Unknown'), employee.get('department', 'N/A')]
+                + [balances.get(leave_type) for leave_type in leave_types]
+            )
+        
+        result = {
+            'success': True,
+            'message': f"Leave balances retrieved for {len(rows)} employees",
+            'columns': ['employeeId', 'employeeName', 'department'] + leave_types,
+            'rows': rows
+        }
+        if not_found:
+            result['notFound'] = not_found
+        if truncated:
+            result['message'] += f" (showing the first {len(rows)})"
+            result['truncated'] = True
+        return result
+    except Exception as e:
+        return {
+            'success': False,
+            'message': f"Error retrieving leave balances: {str(e)}"
+        }
+
+def get_leave_summary(employee_id=None, department=None, year=None):
+    """
+    Leave totals of an employee and/or a department for one year
+    
+    Read from the aggregate items the leave aggregation Lambda keeps up to
+    date from the table's stream, so no leave requests are read.
+    
+    Args:
+        employee_id (int, optional): ID of the employee
+        department (str, optional): Department name
+        year (int, optional): Year the leaves start in; the current year if omitted
+        
+    Returns:
+        dict: Requests per status and approved days per leave type
+    """
+    try:
+        if employee_id is None and not department:
+            return {
+                'success': False,
+                'message': "Either employee_id or department must be provided"
+            }
+        if year is None:
+            year = datetime.now().year
+        
+        keys = []
+        if employee_id is not None:
+            keys.append(employee_stats_key(employee_id, year))
+        if department:
+            keys.append(department_stats_key(department, year))
+        items = {item['type']: item for item in batch_get_items(dynamodb, table.name, keys)}
+        
+        result = {
+            'success': True,
+            'message': f"Leave summary for {year}",
+            'year': year
+        }
+        if employee_id is not None:
+            item = items.get(employee_stats_key(employee_id, year)['type'])
+            result['employee'] = dict(summarize(item), employeeId=employee_id)
+            if item is not None:
+                result['employee']['employeeName'] = item.get('employeeName', 'Unknown')
+        if department:
+            item = items.get(department_stats_key(department, year)['type'])
+            result['department'] = dict(summarize(item), department=department)
+        return result
+    except Exception as e:
+        return {
+            'success': False,
+            'message': f"Error retrieving leave summary: {str(e)}"
+        }
+
+def get_leave_status(employee_id=None, leave_id=None, context=None):
     """
     Get leave status for an employee or a specific leave request
     
     Args:
         employee_id (int, optional): ID of the employee
         leave_id (int, optional): ID of the specific leave request
+        context (LambdaContext, optional): Bounds the lookup by the Lambda's remaining time
         
     Returns:
         dict: Leave status information
@@ -333,12 +740,19 @@ def get_leave_status(employee_id=None, leave_id=None):
             }
         
         elif employee_id is not None:
-            # Query all leave requests for this employee
-            scan_response = table.scan(
-                FilterExpression=Key('type').eq('LEAVE_REQUEST') & Key('employeeId').eq(employee_id)
+            # Query the employee index newest first instead of scanning the table
+            paginator = Paginator(
+                table.query,
+                context=context,
+                IndexName=EMPLOYEE_LEAVE_INDEX,
+                KeyConditionExpression="employeeId = :employeeId",
+                ExpressionAttributeValues={
+                    ':employeeId': employee_id
+                },
+                ScanIndexForward=False
             )
             
-            leaves = scan_response.get('Items', [])
+            leaves = list(paginator)
             
             if not leaves:
                 return {
@@ -348,15 +762,18 @@ def get_leave_status(employee_id=None, leave_id=None):
                     'leaveRequests': []
                 }
             
-            # Sort by applied date (newest first)
-            leaves.sort(key=lambda x: x.get('appliedAt', ''), reverse=True)
-            
-            return {
+            result = {
                 'success': True,
                 'message': f"Found {len(leaves)} leave requests for employee ID {employee_id}",
                 'employeeId': employee_id,
                 'leaveRequests': leaves
             }
+            
+            if paginator.truncated:
+                result['message'] = f"Found {len(leaves)} most recent leave requests for employee ID {employee_id} (more are available)"
+                result['truncated'] = True
+            
+            return result
         
         else:
             return {
@@ -369,6 +786,16 @@ def get_leave_status(employee_id=None, leave_id=None):
             'message': f"Error retrieving leave status: {str(e)}"
         }
 
+# Agent function name to its schema-checked implementation
+ACTIONS = action_table('leave_application', {
+    'apply_leave': apply_leave,
+    'cancel_leave': cancel_leave,
+    'get_leave_balance': get_leave_balance,
+    'get_leave_balances': get_leave_balances,
+    'get_leave_status': get_leave_status,
+    'get_leave_summary': get_leave_summary
+})
+
 def lambda_handler(event, context):
     """
     Lambda handler for leave application/cancellation/balance/status
@@ -388,51 +815,31 @@ def lambda_handler(event, context):
         # Convert parameters to a dictionary for easier access
         param_dict = {param['name']: param['value'] for param in parameters}
         
-        result = None
-        
-        # Process based on the function called
-        if function == 'apply_leave':
-            employee_id = int(param_dict.get('employee_id'))
-            start_date = param_dict.get('start_date')
-            end_date = param_dict.get('end_date')
-            leave_type = param_dict.get('leave_type', 'Annual')  # Default to Annual if not specified
-            result = apply_leave(employee_id, start_date, end_date, leave_type)
-        elif function == 'cancel_leave':
-            leave_id = param_dict.get('leave_id')
-            employee_id = param_dict.get('employee_id')
-            leave_type = param_dict.get('leave_type')
-            start_date = param_dict.get('start_date')
-            
-            if leave_id:
-                leave_id = int(leave_id)
-            if employee_id:
-                employee_id = int(employee_id)
-                
-            result = cancel_leave(leave_id=leave_id, employee_id=employee_id, 
-                                 leave_type=leave_type, start_date=start_date)
-        elif function == 'get_leave_balance':
-            employee_id = int(param_dict.get('employee_id'))
-            result = get_leave_balance(employee_id)
-        elif function == 'get_leave_status':
-            employee_id = param_dict.get('employee_id')
-            leave_id = param_dict.get('leave_id')
-            
-            if employee_id:
-                employee_id = int(employee_id)
-            if leave_id:
-                leave_id = int(leave_id)
-                
-            result = get_leave_status(employee_id, leave_id)
+        # Parameters are checked against the agent schema before any I/O
+        action = ACTIONS.get(function)
+        if action is None:
+            params, result = None, unknown_function(function)
         else:
-            result = {
-                'success': False,
-                'message': f"Unknown function: {function}"
-            }
+            params, result = action.validate(param_dict)
+        
+        if result is None:
+            # A retried mutating call gets the stored result back for a single read
+            idempotency = None
+            if function in IDEMPOTENT_FUNCTIONS:
+                idempotency = idempotency_key(table, event, function, params, IDEMPOTENCY_TTL_SECONDS)
+            replayed = idempotency.lookup() if idempotency is not None else None
+            
+            if replayed is not None:
+                result = replayed
+            else:
+                result = action(params, context=context, idempotency=idempotency)
+        
+        logger.info(json.dumps({'employeeCache': employee_cache.stats()}))
         
         # Format the response for Bedrock agent
         response_body = {
             'TEXT': {
-                'body': json.dumps(result, cls=DecimalEncoder)
+                'body': json.dumps(result)
             }
         }
         
@@ -470,7 +877,7 @@ def lambda_handler(event, context):
                             'body': json.dumps({
                                 'success': False,
                                 'message': f"Error processing request: {str(e)}"
-                            }, cls=DecimalEncoder)
+                            })
                         }
                     }
                 }
@@ -1,47 +1,155 @@
 import json
-import boto3
 import os
 from datetime import datetime
-from boto3.dynamodb.conditions import Key
-from decimal import Decimal
+import logging
+from lms_common.dynamo import DynamoDB
+from lms_common.pagination import Paginator
+from lms_common.transactions import transact_write, transact_groups, TransactionFailed, TransactionGroup, MAX_TRANSACTION_ITEMS
+from lms_common.batch import batch_get_items
+from lms_common.dispatch import action_table, unknown_function
+from lms_common.employee_cache import EmployeeCache, version_condition, DEFAULT_MAX_ENTRIES, DEFAULT_TTL_SECONDS
+from lms_common.data_access import LeaveReader
+from lms_common.idempotency import idempotency_key, DEFAULT_TTL_SECONDS as DEFAULT_IDEMPOTENCY_TTL_SECONDS
+from lms_common.outbox import change_record
+from lms_common.absences import absence_updates, write_absence_updates, team_absences
+from lms_common.business_days import HolidayCalendar, DEFAULT_REGION as DEFAULT_HOLIDAY_REGION
 
-# Custom JSON encoder to handle Decimal objects
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super(DecimalEncoder, self).default(obj)
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
+# Initialize DynamoDB client; the low-level client is created on first use
+dynamodb = DynamoDB()
 table = dynamodb.Table(os.environ.get('TABLE_NAME', 'LeaveManagementTable'))
 
-def approve_leave(leave_id):
+# Global secondary index keyed on employeeId (partition) and appliedAt (sort)
+EMPLOYEE_LEAVE_INDEX = os.environ.get('EMPLOYEE_LEAVE_INDEX', 'EmployeeLeaveIndex')
+
+# Sparse index keyed on pendingStatus (partition) and appliedAt (sort); only
+# PENDING leave requests carry pendingStatus, so the index is the approval queue
+PENDING_LEAVE_INDEX = os.environ.get('PENDING_LEAVE_INDEX', 'PendingLeaveIndex')
+
+# Leave requests accepted by one bulk action
+MAX_BULK_LEAVES = 100
+
+# Passes over leaves that hit contention or changed while a bulk action ran
+MAX_BULK_ROUNDS = 3
+
+# EMPLOYEE items cached across invocations of a warm container
+employee_cache = EmployeeCache(
+    table,
+    max_entries=int(os.environ.get('EMPLOYEE_CACHE_SIZE', DEFAULT_MAX_ENTRIES)),
+    ttl_seconds=float(os.environ.get('EMPLOYEE_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+)
+
+# Leave requests read together with their employee, remembering whose they are
+leave_reader = LeaveReader(dynamodb, table, employee_cache)
+
+# Working days of a leave, from the HOLIDAYS#<REGION> items read once per container
+holiday_calendar = HolidayCalendar(
+    dynamodb,
+    table.name,
+    default_region=os.environ.get('HOLIDAY_REGION', DEFAULT_HOLIDAY_REGION)
+)
+
+# Longest date range get_team_absences answers in one call
+MAX_ABSENCE_RANGE_DAYS = 366
+
+# Attempts at a balance update when the cached employee turns out to be stale
+MAX_VERSION_ATTEMPTS = 3
+
+# Functions whose results are stored so that agent retries replay them
+IDEMPOTENT_FUNCTIONS = {'approve_leave', 'reject_leave'}
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', DEFAULT_IDEMPOTENCY_TTL_SECONDS))
+
+# Outbox mode: every state change also writes a change record, from which the
+# notification Lambda sends emails via the table's stream
+NOTIFICATION_OUTBOX = os.environ.get('NOTIFICATION_OUTBOX', 'false').lower() == 'true'
+
+def approval_failure(error, leave_id, employee_id, leave_type, duration):
+    """
+    Explain why an approval transaction was cancelled
+    
+    Args:
+        error (TransactionFailed): Cancelled transaction (leave update first, balance update second)
+        leave_id (int): ID of the leave request
+        employee_id (int): ID of the employee
+        leave_type (str): Type of leave
+        duration (int): Days to deduct
+        
+    Returns:
+        dict: Failure result for the agent
+    """
+    if error.retryable:
+        return {
+            'success': False,
+            'retryable': True,
+            'message': f"Leave request with ID {leave_id} is being updated by another request. Please retry."
+        }
+    
+    leave_failure = error.failed(0)
+    if leave_failure is not None:
+        status = leave_failure.get('Item', {}).get('status')
+        if status is None:
+            return {
+                'success': False,
+                'message': f"Leave request with ID {leave_id} not found"
+            }
+        return {
+            'success': False,
+            'message': f"Leave request is already {status.lower()}"
+        }
+    
+    balance_failure = error.failed(1)
+    if balance_failure is not None:
+        employee = balance_failure.get('Item')
+        if employee is None:
+            return {
+                'success': False,
+                'message': f"Employee with ID {employee_id} not found"
+            }
+        if leave_type not in employee.get('leaveBalances', {}):
+            return {
+                'success': False,
+                'message': f"Leave type {leave_type} not found in employee's leave balances"
+            }
+        return {
+            'success': False,
+            'message': f"Insufficient leave balance. Available: {employee['leaveBalances'][leave_type]}, Required: {duration}"
+        }
+    
+    return {
+        'success': False,
+        'message': f"Error approving leave: {str(error)}"
+    }
+
+def approve_leave(leave_id, employee_id=None, idempotency=None):
     """
     Approve a leave request and update leave balance
     
     Args:
         leave_id (int): ID of the leave request to approve
+        employee_id (int, optional): Employee the leave belongs to; lets both be read in one request
+        idempotency (IdempotencyKey, optional): Stores the result in the approval transaction
         
     Returns:
         dict: Updated leave request details
     """
     try:
-        # Get the leave request
-        response = table.get_item(
-            Key={
-                'id': leave_id,
-                'type': 'LEAVE_REQUEST'
-            }
-        )
+        # Read the leave and its employee, in one request when the employee is known
+        leave_request, employee = leave_reader.read(leave_id, employee_id)
         
-        if 'Item' not in response:
+        if leave_request is None:
             return {
                 'success': False,
                 'message': f"Leave request with ID {leave_id} not found"
             }
         
-        leave_request = response['Item']
+        if employee_id is not None and leave_request['employeeId'] != employee_id:
+            return {
+                'success': False,
+                'message': f"Leave request {leave_id} belongs to employee {leave_request['employeeId']}, not {employee_id}"
+            }
         
         # Check if leave is already approved or rejected
         if leave_request['status'] != 'PENDING':
@@ -50,82 +158,122 @@ def approve_leave(leave_id):
                 'message': f"Leave request is already {leave_request['status'].lower()}"
             }
         
-        # Get the employee record to update leave balance
         employee_id = leave_request['employeeId']
         leave_type = leave_request['leaveType']
-        duration = leave_request.get('duration', 1)  # Default to 1 day if duration not specified
         
-        employee_response = table.get_item(
-            Key={
-                'id': employee_id,
-                'type': 'EMPLOYEE'
-            }
-        )
-        
-        if 'Item' not in employee_response:
+        if employee is None:
             return {
                 'success': False,
                 'message': f"Employee with ID {employee_id} not found"
             }
         
-        employee = employee_response['Item']
-        
-        # Check if employee has sufficient leave balance
-        if 'leaveBalances' not in employee or leave_type not in employee['leaveBalances']:
-            return {
-                'success': False,
-                'message': f"Leave type {leave_type} not found in employee's leave balances"
-            }
-        
-        current_balance = employee['leaveBalances'][leave_type]
-        
-        if current_balance < duration:
-            return {
-                'success': False,
-                'message': f"Insufficient leave balance. Available: {current_balance}, Required: {duration}"
-            }
-        
-        # Update the leave request status
-        # Import datetime and timezone to create aware datetime objects
+        # Charge the working days as of now, so holidays published since the
+        # leave was applied for are not deducted; cancelling restores this figure
+        duration = holiday_calendar.business_days(leave_request['startDate'], leave_request['endDate'],
+                                                  holiday_calendar.region_of(employee))
+        
+        # Teammates already out on any day of the leave; reported, not blocking
+        department = employee.get('department')
+        conflicts = []
+        if department:
+            conflicts = team_absences(table, department, leave_request['startDate'], leave_request['endDate'],
+                                      exclude_employee_id=employee_id)
+        
+        # Flip the status and deduct the balance in one conditional transaction, so
+        # two concurrent approvals can neither both succeed nor double-deduct. The
+        # balance update is also pinned to the cached employee version; when another
+        # writer got there first the current item comes back and is used instead
         from datetime import datetime, timezone
-        # datetime.now(timezone.utc) creates an aware datetime object in UTC
-        table.update_item(
-            Key={
-                'id': leave_id,
-                'type': 'LEAVE_REQUEST'
-            },
-            UpdateExpression="SET #status = :status, approvedAt = :approvedAt",
-            ExpressionAttributeNames={
-                '#status': 'status'
-            },
-            ExpressionAttributeValues={
-                ':status': 'APPROVED',
-                ':approvedAt': datetime.now(timezone.utc).isoformat()
-            }
-        )
-        
-        # Update the employee's leave balance
-        new_balance = current_balance - duration
-        table.update_item(
-            Key={
-                'id': employee_id,
-                'type': 'EMPLOYEE'
-            },
-            UpdateExpression="SET leaveBalances.#leaveType = :newBalance",
-            ExpressionAttributeNames={
-                '#leaveType': leave_type
-            },
-            ExpressionAttributeValues={
-                ':newBalance': new_balance
+        approved_at = datetime.now(timezone.utc).isoformat()
+        for attempt in range(MAX_VERSION_ATTEMPTS):
+            version_expression, version_values = version_condition(employee)
+            result = {
+                'success': True,
+                'message': f"Leave request with ID {leave_id} has been approved. Deducted {duration} days from {leave_type} leave balance",
+                'leaveId': leave_id,
+                'leaveType': leave_type,
+                'daysDeducted': duration,
+                'newBalance': employee['leaveBalances'].get(leave_type, 0) - duration
             }
-        )
+            if conflicts:
+                result['teamConflicts'] = conflicts
+                result['message'] += ". Also out from the " + department + " department: " + ", ".join(
+                    f"{conflict['employeeName']} ({len(conflict['dates'])} overlapping days)" for conflict in conflicts
+                )
+            transact_items = [
+                {
+                    'Update': {
+                        'TableName': table.name,
+                        'Key': {
+                            'id': leave_id,
+                            'type': 'LEAVE_REQUEST'
+                        },
+                        'UpdateExpression': "SET #status = :approved, approvedAt = :approvedAt, deductedDays = :days REMOVE pendingStatus",
+                        'ConditionExpression': "#status = :pending",
+                        'ExpressionAttributeNames': {
+                            '#status': 'status'
+                        },
+                        'ExpressionAttributeValues': {
+                            ':approved': 'APPROVED',
+                            ':pending': 'PENDING',
+                            ':approvedAt': approved_at,
+                            ':days': duration
+                        },
+                        'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+                    }
+                },
+                {
+                    'Update': {
+                        'TableName': table.name,
+                        'Key': {
+                            'id': employee_id,
+                            'type': 'EMPLOYEE'
+                        },
+                        'UpdateExpression': "SET leaveBalances.#leaveType = leaveBalances.#leaveType - :duration ADD version :one",
+                        'ConditionExpression': f"leaveBalances.#leaveType >= :duration AND {version_expression}",
+                        'ExpressionAttributeNames': {
+                            '#leaveType': leave_type
+                        },
+                        'ExpressionAttributeValues': dict(version_values, **{
+                            ':duration': duration,
+                            ':one': 1
+                        }),
+                        'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+                    }
+                }
+            ]
+            if idempotency is not None:
+                # Store the result with the approval so a retried call replays it
+                transact_items.append(idempotency.put_item(result, leave_id, 'APPROVED'))
+            if NOTIFICATION_OUTBOX:
+                transact_items.append(change_record(table.name, dict(leave_request, status='APPROVED', approvedAt=approved_at, deductedDays=duration)))
+            if department:
+                # Mark the days in the department's absence calendar
+                transact_items.extend(absence_updates(table.name, department, [
+                    (employee_id, employee.get('name'), leave_request['startDate'], leave_request['endDate'])
+                ]))
+            
+            try:
+                transact_write(dynamodb, transact_items)
+            except TransactionFailed as e:
+                if idempotency is not None and e.failed(2) is not None:
+                    # A duplicate of this call approved the leave first
+                    return idempotency.replay()
+                current = (e.failed(1) or {}).get('Item')
+                if e.failed(0) is None and current is not None and current.get('version') != employee.get('version'):
+                    # Only the version was stale; plan again from the current item
+                    employee = employee_cache.put(current, replace=True)
+                    continue
+                employee_cache.invalidate(employee_id)
+                return approval_failure(e, leave_id, employee_id, leave_type, duration)
+            
+            employee_cache.apply_balance_change(employee, leave_type, -duration)
+            return result
         
         return {
-            'success': True,
-            'message': f"Leave request with ID {leave_id} has been approved. Updated {leave_type} leave balance: {new_balance}",
-            'leaveId': leave_id,
-            'leaveType': leave_type,
-            'newBalance': new_balance
+            'success': False,
+            'retryable': True,
+            'message': f"Leave balance of employee {employee_id} is being updated by another request. Please retry."
         }
     except Exception as e:
         return {
@@ -135,13 +283,14 @@ def approve_leave(leave_id):
 
 from datetime import datetime, timezone  # Import timezone to create aware datetime objects
 
-def reject_leave(leave_id, reason=None):
+def reject_leave(leave_id, reason=None, idempotency=None):
     """
     Reject a leave request
     
     Args:
         leave_id (int): ID of the leave request to reject
         reason (str, optional): Reason for rejection
+        idempotency (IdempotencyKey, optional): Stores the result in the rejection transaction
         
     Returns:
         dict: Updated leave request details
@@ -180,62 +329,113 @@ def reject_leave(leave_id, reason=None):
             update_expression += ", rejectionReason = :reason"
             expression_values[':reason'] = reason
         
-        # Update the leave request status
-        table.update_item(
-            Key={
-                'id': leave_id,
-                'type': 'LEAVE_REQUEST'
-            },
-            UpdateExpression=update_expression,
-            ExpressionAttributeNames={
-                '#status': 'status'
-            },
-            ExpressionAttributeValues=expression_values
-        )
+        # Drop the leave out of the pending queue index
+        update_expression += " REMOVE pendingStatus"
         
-        return {
+        result = {
             'success': True,
             'message': f"Leave request with ID {leave_id} has been rejected",
             'leaveId': leave_id,
             'reason': reason if reason else 'No reason provided'
         }
+        
+        # Update the leave request status, unless it changed since it was read
+        leave_update = {
+            'Key': {
+                'id': leave_id,
+                'type': 'LEAVE_REQUEST'
+            },
+            'UpdateExpression': update_expression,
+            'ConditionExpression': "#status = :pending",
+            'ExpressionAttributeNames': {
+                '#status': 'status'
+            },
+            'ExpressionAttributeValues': dict(expression_values, **{':pending': 'PENDING'})
+        }
+        
+        if idempotency is None and not NOTIFICATION_OUTBOX:
+            try:
+                table.update_item(**leave_update)
+            except dynamodb.exceptions.ConditionalCheckFailedException:
+                return {
+                    'success': False,
+                    'retryable': True,
+                    'message': f"Leave request with ID {leave_id} was updated by another request. Please retry."
+                }
+        else:
+            transact_items = [
+                {
+                    'Update': dict(leave_update, TableName=table.name)
+                }
+            ]
+            if idempotency is not None:
+                # Store the result with the rejection so a retried call replays it
+                transact_items.append(idempotency.put_item(result, leave_id, 'REJECTED'))
+            if NOTIFICATION_OUTBOX:
+                rejected = dict(leave_request, status='REJECTED', rejectedAt=expression_values[':rejectedAt'])
+                if reason:
+                    rejected['rejectionReason'] = reason
+                transact_items.append(change_record(table.name, rejected))
+            try:
+                transact_write(dynamodb, transact_items)
+            except TransactionFailed as e:
+                if idempotency is not None and e.failed(1) is not None:
+                    # A duplicate of this call rejected the leave first
+                    return idempotency.replay()
+                return {
+                    'success': False,
+                    'retryable': True,
+                    'message': f"Leave request with ID {leave_id} was updated by another request. Please retry."
+                }
+        
+        return result
     except Exception as e:
         return {
             'success': False,
             'message': f"Error rejecting leave: {str(e)}"
         }
 
-def get_pending_leave_requests(employee_id=None, limit=10):
+def get_pending_leave_requests(employee_id=None, limit=10, context=None):
     """
     Get pending leave requests for review
     
     Args:
         employee_id (int, optional): Filter by employee ID
         limit (int, optional): Maximum number of requests to return
+        context (LambdaContext, optional): Bounds the lookup by the Lambda's remaining time
         
     Returns:
         dict: List of pending leave requests
     """
     try:
-        filter_expression = Key('type').eq('LEAVE_REQUEST') & Key('status').eq('PENDING')
-        
-        # If employee_id is provided, filter by that employee
         if employee_id is not None:
-            scan_response = table.scan(
-                FilterExpression=filter_expression & Key('employeeId').eq(employee_id)
-            )
+            # Read this employee's leaves oldest first and keep the pending ones
+            query_kwargs = {
+                'IndexName': EMPLOYEE_LEAVE_INDEX,
+                'KeyConditionExpression': "employeeId = :employeeId",
+                'FilterExpression': "#status = :pending",
+                'ExpressionAttributeNames': {
+                    '#status': 'status'
+                },
+                'ExpressionAttributeValues': {
+                    ':employeeId': employee_id,
+                    ':pending': 'PENDING'
+                },
+                'ScanIndexForward': True
+            }
         else:
-            scan_response = table.scan(
-                FilterExpression=filter_expression
-            )
-        
-        leaves = scan_response.get('Items', [])
-        
-        # Sort by applied date (oldest first to prioritize them)
-        leaves.sort(key=lambda x: x.get('appliedAt', ''))
+            # The pending queue index only holds PENDING requests, oldest first
+            query_kwargs = {
+                'IndexName': PENDING_LEAVE_INDEX,
+                'KeyConditionExpression': "pendingStatus = :pending",
+                'ExpressionAttributeValues': {
+                    ':pending': 'PENDING'
+                },
+                'ScanIndexForward': True
+            }
         
-        # Limit the number of results
-        leaves = leaves[:limit]
+        # Stop reading as soon as enough requests have been collected
+        leaves = list(Paginator(table.query, max_items=limit, context=context, **query_kwargs))
         
         if not leaves:
             return {
@@ -255,6 +455,431 @@ def get_pending_leave_requests(employee_id=None, limit=10):
             'message': f"Error retrieving pending leave requests: {str(e)}"
         }
 
+def get_team_absences(department, start_date, end_date, context=None):
+    """
+    Who in a department is on approved leave during a date range
+    
+    Answered from the department's absence calendar with a single query.
+    
+    Args:
+        department (str): Department name
+        start_date (str): First day of the range (YYYY-MM-DD)
+        end_date (str): Last day of the range (YYYY-MM-DD)
+        context (LambdaContext, optional): Bounds the lookup by the Lambda's remaining time
+        
+    Returns:
+        dict: Employees out during the range with the dates they are out
+    """
+    try:
+        if end_date < start_date:
+            return {
+                'success': False,
+                'message': "End date cannot be before start date"
+            }
+        days = (datetime.strptime(end_date, '%Y-%m-%d') - datetime.strptime(start_date, '%Y-%m-%d')).days + 1
+        if days > MAX_ABSENCE_RANGE_DAYS:
+            return {
+                'success': False,
+                'message': f"Date range can span at most {MAX_ABSENCE_RANGE_DAYS} days"
+            }
+        
+        absences = team_absences(table, department, start_date, end_date, context=context)
+        if not absences:
+            message = f"Nobody in the {department} department is on approved leave between {start_date} and {end_date}"
+        else:
+            message = f"{len(absences)} employees in the {department} department are on approved leave between {start_date} and {end_date}"
+        return {
+            'success': True,
+            'message': message,
+            'department': department,
+            'startDate': start_date,
+            'endDate': end_date,
+            'absences': absences
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'message': f"Error retrieving team absences: {str(e)}"
+        }
+
+def leave_result(leave_id, success, message, retryable=False):
+    """
+    Outcome of one leave request within a bulk action
+    
+    Args:
+        leave_id (int): ID of the leave request
+        success (bool): Whether the leave was updated
+        message (str): Explanation for the agent
+        retryable (bool): Whether repeating the action may succeed
+        
+    Returns:
+        dict: Per-leave result entry
+    """
+    result = {
+        'leaveId': leave_id,
+        'success': success,
+        'message': message
+    }
+    if retryable:
+        result['retryable'] = True
+    return result
+
+def bulk_result(action, leave_ids, results):
+    """
+    Summarise per-leave results of a bulk action in request order
+    
+    Args:
+        action (str): Past-tense verb, e.g. "approved"
+        leave_ids (list): Requested leave IDs
+        results (dict): Leave ID to per-leave result
+        
+    Returns:
+        dict: Bulk action result
+    """
+    ordered = [results[leave_id] for leave_id in leave_ids]
+    succeeded = sum(1 for result in ordered if result['success'])
+    return {
+        'success': succeeded > 0,
+        'message': f"{succeeded} of {len(leave_ids)} leave requests {action}",
+        action: succeeded,
+        'failed': len(leave_ids) - succeeded,
+        'results': ordered
+    }
+
+def bulk_approve_leaves(leave_ids):
+    """
+    Approve many pending leave requests at once
+    
+    Leaves and employees are read with BatchGetItem. Deductions are summed per
+    employee and leave type, and each employee's leaves are approved together
+    with one balance update, packed into as few transactions as possible.
+    
+    Args:
+        leave_ids (list): IDs of the leave requests to approve
+        
+    Returns:
+        dict: Per-leave results; a failing leave does not stop the others
+    """
+    try:
+        if not leave_ids:
+            return {
+                'success': False,
+                'message': "No leave request IDs provided"
+            }
+        if len(leave_ids) > MAX_BULK_LEAVES:
+            return {
+                'success': False,
+                'message': f"At most {MAX_BULK_LEAVES} leave requests can be approved at once"
+            }
+        
+        results = {}
+        leaves = {
+            leave['id']: leave
+            for leave in batch_get_items(dynamodb, table.name, [{'id': leave_id, 'type': 'LEAVE_REQUEST'} for leave_id in leave_ids])
+        }
+        
+        # Group the pending leaves by employee, oldest first
+        by_employee = {}
+        for leave_id in leave_ids:
+            leave = leaves.get(leave_id)
+            if leave is None:
+                results[leave_id] = leave_result(leave_id, False, f"Leave request with ID {leave_id} not found")
+            elif leave['status'] != 'PENDING':
+                results[leave_id] = leave_result(leave_id, False, f"Leave request is already {leave['status'].lower()}")
+            else:
+                by_employee.setdefault(leave['employeeId'], []).append(leave)
+        
+        employees = {
+            employee['id']: employee
+            for employee in batch_get_items(
+                dynamodb, table.name,
+                [{'id': employee_id, 'type': 'EMPLOYEE'} for employee_id in by_employee],
+                projection='id, #type, #name, department, #region, leaveBalances',
+                attribute_names={'#type': 'type', '#name': 'name', '#region': 'region'}
+            )
+        }
+        
+        approved_at = datetime.now(timezone.utc).isoformat()
+        approved = []
+        leaves_per_group = (MAX_TRANSACTION_ITEMS - 1) // 2 if NOTIFICATION_OUTBOX else MAX_TRANSACTION_ITEMS - 1
+        
+        for round_number in range(MAX_BULK_ROUNDS):
+            groups = []
+            group_leaves = {}
+            
+            for employee_id, employee_leaves in by_employee.items():
+                employee = employees.get(employee_id)
+                if employee is None:
+                    for leave in employee_leaves:
+                        results[leave['id']] = leave_result(leave['id'], False, f"Employee with ID {employee_id} not found")
+                    continue
+                
+                # Accept leaves while the employee's balances cover them
+                balances = dict(employee.get('leaveBalances', {}))
+                accepted = []
+                region = holiday_calendar.region_of(employee)
+                for leave in sorted(employee_leaves, key=lambda x: x.get('appliedAt', '')):
+                    leave_type = leave['leaveType']
+                    duration = holiday_calendar.business_days(leave['startDate'], leave['endDate'], region)
+                    if leave_type not in balances:
+                        results[leave['id']] = leave_result(leave['id'], False, f"Leave type {leave_type} not found in employee's leave balances")
+                    elif balances[leave_type] < duration:
+                        results[leave['id']] = leave_result(leave['id'], False, f"Insufficient leave balance. Available: {balances[leave_type]}, Required: {duration}")
+                    else:
+                        balances[leave_type] -= duration
+                        accepted.append(dict(leave, deductedDays=duration))
+                
+                # One employee update per group, so a group holds at most 99 leaves
+                # (49 in outbox mode, where each leave also has a change record)
+                for start in range(0, len(accepted), leaves_per_group):
+                    part = accepted[start:start + leaves_per_group]
+                    key = (employee_id, start)
+                    group_leaves[key] = part
+                    groups.append(TransactionGroup(key, approval_items(part, employee_id, approved_at), partition=employee_id))
+            
+            outcomes = transact_groups(dynamodb, groups)
+            
+            retry = {}
+            for key, part in group_leaves.items():
+                employee_id = key[0]
+                outcome = outcomes[key]
+                if outcome is None:
+                    for leave in part:
+                        results[leave['id']] = leave_result(leave['id'], True, f"Leave request with ID {leave['id']} has been approved")
+                        approved.append(leave)
+                    continue
+                
+                if outcome.retryable:
+                    retry.setdefault(employee_id, []).extend(part)
+                    continue
+                
+                for index, leave in enumerate(part):
+                    failure = outcome.failed(index)
+                    if failure is None:
+                        retry.setdefault(employee_id, []).append(leave)
+                    else:
+                        status = failure.get('Item', {}).get('status', 'unknown')
+                        results[leave['id']] = leave_result(leave['id'], False, f"Leave request is already {status.lower()}")
+                
+                # The balance changed since it was read; plan again with the current one
+                balance_failure = outcome.failed(len(part))
+                if balance_failure is not None:
+                    employees[employee_id] = balance_failure.get('Item')
+            
+            by_employee = retry
+            if not by_employee:
+                break
+        
+        for employee_leaves in by_employee.values():
+            for leave in employee_leaves:
+                results[leave['id']] = leave_result(leave['id'], False, "Leave request is being updated by another request. Please retry.", retryable=True)
+        
+        # Mark the approved days in the department calendars after the fact: one
+        # department-month item is shared by many employees, so it cannot join
+        # their separate transactions. Set updates are safe to apply again
+        by_department = {}
+        for leave in approved:
+            employee = employees.get(leave['employeeId']) or {}
+            if employee.get('department'):
+                by_department.setdefault(employee['department'], []).append(
+                    (leave['employeeId'], employee.get('name'), leave['startDate'], leave['endDate'])
+                )
+        for department, absences in by_department.items():
+            write_absence_updates(table, absence_updates(table.name, department, absences))
+        
+        # These balances were written without a version pin; drop the cached copies
+        for employee_id in employees:
+            employee_cache.invalidate(employee_id)
+        
+        return bulk_result('approved', leave_ids, results)
+    except Exception as e:
+        return {
+            'success': False,
+            'message': f"Error approving leaves: {str(e)}"
+        }
+
+def approval_items(leaves, employee_id, approved_at):
+    """
+    Transaction items approving one employee's leaves and deducting their total
+    
+    Args:
+        leaves (list): PENDING leave requests of the employee, with the deductedDays to charge
+        employee_id (int): ID of the employee
+        approved_at (str): Approval timestamp
+        
+    Returns:
+        list: TransactItems entries, leave updates first, then the balance update,
+            then in outbox mode one change record per leave
+    """
+    items = []
+    totals = {}
+    for leave in leaves:
+        totals[leave['leaveType']] = totals.get(leave['leaveType'], 0) + leave['deductedDays']
+        items.append({
+            'Update': {
+                'TableName': table.name,
+                'Key': {
+                    'id': leave['id'],
+                    'type': 'LEAVE_REQUEST'
+                },
+                'UpdateExpression': "SET #status = :approved, approvedAt = :approvedAt, deductedDays = :days REMOVE pendingStatus",
+                'ConditionExpression': "#status = :pending",
+                'ExpressionAttributeNames': {
+                    '#status': 'status'
+                },
+                'ExpressionAttributeValues': {
+                    ':approved': 'APPROVED',
+                    ':pending': 'PENDING',
+                    ':approvedAt': approved_at,
+                    ':days': leave['deductedDays']
+                },
+                'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+            }
+        })
+    
+    names = {}
+    values = {}
+    updates = []
+    conditions = []
+    for i, (leave_type, total) in enumerate(totals.items()):
+        names[f'#t{i}'] = leave_type
+        values[f':d{i}'] = total
+        updates.append(f"leaveBalances.#t{i} = leaveBalances.#t{i} - :d{i}")
+        conditions.append(f"leaveBalances.#t{i} >= :d{i}")
+    
+    items.append({
+        'Update': {
+            'TableName': table.name,
+            'Key': {
+                'id': employee_id,
+                'type': 'EMPLOYEE'
+            },
+            'UpdateExpression': "SET " + ", ".join(updates) + " ADD version :one",
+            'ConditionExpression': " AND ".join(conditions),
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': dict(values, **{':one': 1}),
+            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+        }
+    })
+    
+    if NOTIFICATION_OUTBOX:
+        for leave in leaves:
+            items.append(change_record(table.name, dict(leave, status='APPROVED', approvedAt=approved_at)))
+    return items
+
+def bulk_reject_leaves(leave_ids, reason=None):
+    """
+    Reject many pending leave requests at once
+    
+    Args:
+        leave_ids (list): IDs of the leave requests to reject
+        reason (str, optional): Reason for rejection, applied to every leave
+        
+    Returns:
+        dict: Per-leave results; a failing leave does not stop the others
+    """
+    try:
+        if not leave_ids:
+            return {
+                'success': False,
+                'message': "No leave request IDs provided"
+            }
+        if len(leave_ids) > MAX_BULK_LEAVES:
+            return {
+                'success': False,
+                'message': f"At most {MAX_BULK_LEAVES} leave requests can be rejected at once"
+            }
+        
+        update_expression = "SET #status = :rejected, rejectedAt = :rejectedAt"
+        expression_values = {
+            ':rejected': 'REJECTED',
+            ':pending': 'PENDING',
+            ':rejectedAt': datetime.now(timezone.utc).isoformat()
+        }
+        if reason:
+            update_expression += ", rejectionReason = :reason"
+            expression_values[':reason'] = reason
+        update_expression += " REMOVE pendingStatus"
+        
+        # No read is needed: the status condition rejects missing or processed
+        # leaves. Change records carry the leave's details, so outbox mode reads
+        # the leaves once up front
+        outbox_items = {}
+        if NOTIFICATION_OUTBOX:
+            for leave in batch_get_items(dynamodb, table.name, [{'id': leave_id, 'type': 'LEAVE_REQUEST'} for leave_id in leave_ids], consistent_read=True):
+                rejected = dict(leave, status='REJECTED', rejectedAt=expression_values[':rejectedAt'])
+                if reason:
+                    rejected['rejectionReason'] = reason
+                outbox_items[leave['id']] = [change_record(table.name, rejected)]
+        
+        results = {}
+        remaining = list(leave_ids)
+        for round_number in range(MAX_BULK_ROUNDS):
+            groups = [
+                TransactionGroup(leave_id, [{
+                    'Update': {
+                        'TableName': table.name,
+                        'Key': {
+                            'id': leave_id,
+                            'type': 'LEAVE_REQUEST'
+                        },
+                        'UpdateExpression': update_expression,
+                        'ConditionExpression': "#status = :pending",
+                        'ExpressionAttributeNames': {
+                            '#status': 'status'
+                        },
+                        'ExpressionAttributeValues': expression_values,
+                        'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+                    }
+                }] + outbox_items.get(leave_id, []))
+                for leave_id in remaining
+            ]
+            outcomes = transact_groups(dynamodb, groups)
+            
+            retry = []
+            for leave_id in remaining:
+                outcome = outcomes[leave_id]
+                if outcome is None:
+                    results[leave_id] = leave_result(leave_id, True, f"Leave request with ID {leave_id} has been rejected")
+                elif outcome.retryable:
+                    retry.append(leave_id)
+                elif outcome.failed(0) is not None:
+                    status = outcome.failed(0).get('Item', {}).get('status')
+                    if status is None:
+                        results[leave_id] = leave_result(leave_id, False, f"Leave request with ID {leave_id} not found")
+                    else:
+                        results[leave_id] = leave_result(leave_id, False, f"Leave request is already {status.lower()}")
+                else:
+                    # Another item of the group, such as the change record, failed
+                    codes = [reason.get('Code') for reason in outcome.reasons if reason.get('Code') not in (None, 'None')]
+                    results[leave_id] = leave_result(leave_id, False, f"Leave request with ID {leave_id} could not be rejected: {', '.join(codes)}")
+            
+            remaining = retry
+            if not remaining:
+                break
+        
+        for leave_id in remaining:
+            results[leave_id] = leave_result(leave_id, False, "Leave request is being updated by another request. Please retry.", retryable=True)
+        
+        summary = bulk_result('rejected', leave_ids, results)
+        summary['reason'] = reason if reason else 'No reason provided'
+        return summary
+    except Exception as e:
+        return {
+            'success': False,
+            'message': f"Error rejecting leaves: {str(e)}"
+        }
+
+# Agent function name to its schema-checked implementation
+ACTIONS = action_table('leave_approval', {
+    'approve_leave': approve_leave,
+    'reject_leave': reject_leave,
+    'bulk_approve_leaves': bulk_approve_leaves,
+    'bulk_reject_leaves': bulk_reject_leaves,
+    'get_pending_leave_requests': get_pending_leave_requests,
+    'get_team_absences': get_team_absences
+})
+
 def lambda_handler(event, context):
     """
     Lambda handler for leave approval/rejection
@@ -269,36 +894,31 @@ def lambda_handler(event, context):
         # Convert parameters to a dictionary for easier access
         param_dict = {param['name']: param['value'] for param in parameters}
         
-        result = None
-        
-        # Process based on the function called
-        if function == 'approve_leave':
-            leave_id = int(param_dict.get('leave_id'))
-            result = approve_leave(leave_id)
-        elif function == 'reject_leave':
-            leave_id = int(param_dict.get('leave_id'))
-            reason = param_dict.get('reason')
-            result = reject_leave(leave_id, reason)
-        elif function == 'get_pending_leave_requests':
-            employee_id = param_dict.get('employee_id')
-            limit = param_dict.get('limit', 10)
-            
-            if employee_id:
-                employee_id = int(employee_id)
-            if limit:
-                limit = int(limit)
-                
-            result = get_pending_leave_requests(employee_id, limit)
+        # Parameters are checked against the agent schema before any I/O
+        action = ACTIONS.get(function)
+        if action is None:
+            params, result = None, unknown_function(function)
         else:
-            result = {
-                'success': False,
-                'message': f"Unknown function: {function}"
-            }
+            params, result = action.validate(param_dict)
+        
+        if result is None:
+            # A retried mutating call gets the stored result back for a single read
+            idempotency = None
+            if function in IDEMPOTENT_FUNCTIONS:
+                idempotency = idempotency_key(table, event, function, params, IDEMPOTENCY_TTL_SECONDS)
+            replayed = idempotency.lookup() if idempotency is not None else None
+            
+            if replayed is not None:
+                result = replayed
+            else:
+                result = action(params, context=context, idempotency=idempotency)
+        
+        logger.info(json.dumps({'employeeCache': employee_cache.stats()}))
         
         # Format the response for Bedrock agent
         response_body = {
             'TEXT': {
-                'body': json.dumps(result, cls=DecimalEncoder)
+                'body': json.dumps(result)
             }
         }
         
@@ -336,7 +956,7 @@ def lambda_handler(event, context):
                             'body': json.dumps({
                                 'success': False,
                                 'message': f"Error processing request: {str(e)}"
-                            }, cls=DecimalEncoder)
+                            })
                         }
                     }
                 }
@@ -1,88 +1,75 @@
 import json
-import boto3
 import os
 from datetime import datetime
-from boto3.dynamodb.conditions import Key
-from decimal import Decimal
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from lms_common.dynamo import DynamoDB, LazyClient
+from lms_common.batch import batch_get_items
+from lms_common.dispatch import action_table, unknown_function
+from lms_common.employee_cache import EmployeeCache, DEFAULT_MAX_ENTRIES, DEFAULT_TTL_SECONDS
+from lms_common.data_access import LeaveReader
+from lms_common.outbox import change_records
 
 # Set up logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Custom JSON encoder to handle Decimal objects
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super(DecimalEncoder, self).default(obj)
-
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
+# Initialize DynamoDB client; the low-level client is created on first use
+dynamodb = DynamoDB()
 table = dynamodb.Table(os.environ.get('TABLE_NAME', 'LeaveManagementTable'))
 
-# Initialize SNS client
-sns = boto3.client('sns')
+# EMPLOYEE items cached across invocations of a warm container
+employee_cache = EmployeeCache(
+    table,
+    max_entries=int(os.environ.get('EMPLOYEE_CACHE_SIZE', DEFAULT_MAX_ENTRIES)),
+    ttl_seconds=float(os.environ.get('EMPLOYEE_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+)
+
+# Leave requests read together with their employee, remembering whose they are
+leave_reader = LeaveReader(dynamodb, table, employee_cache)
+
+# Initialize SNS client; created on first publish rather than at import
+sns = LazyClient('sns')
+
+# Worker threads for concurrent SNS publishes; botocore clients are thread-safe
+notification_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('NOTIFICATION_WORKERS', '8')))
+
+# PublishBatch accepts at most 10 messages per call
+MAX_PUBLISH_BATCH = 10
+
+# Leave requests accepted by one notify_leave_requests call (two emails each)
+MAX_BULK_NOTIFICATIONS = 50
 
 # Get email addresses from environment variables configured in Lambda
 EMPLOYEE_EMAIL = os.environ.get('EMPLOYEE_EMAIL')
 APPROVER_EMAIL = os.environ.get('APPROVER_EMAIL')
 
-def notify_leave_request(leave_id):
+# Build and log stream notifications without publishing or marking them sent
+NOTIFICATION_DRY_RUN = os.environ.get('NOTIFICATION_DRY_RUN', 'false').lower() == 'true'
+
+def build_notification(leave_request, employee_name):
     """
-    Notify both approver and employee about a leave request
+    Build the subject and messages for a leave request in its current status
     
     Args:
-        leave_id (int): ID of the leave request
+        leave_request (dict): LEAVE_REQUEST item
+        employee_name (str): Name of the employee
         
     Returns:
-        dict: Notification status
+        tuple: (subject, approver_message, employee_message), or None for an unknown status
     """
-    try:
-        # Get the leave request
-        response = table.get_item(
-            Key={
-                'id': leave_id,
-                'type': 'LEAVE_REQUEST'
-            }
-        )
-        
-        if 'Item' not in response:
-            return {
-                'success': False,
-                'message': f"Leave request with ID {leave_id} not found"
-            }
-        
-        leave_request = response['Item']
-        employee_id = leave_request['employeeId']
-        
-        # Get the employee details
-        employee_response = table.get_item(
-            Key={
-                'id': employee_id,
-                'type': 'EMPLOYEE'
-            }
-        )
-        
-        if 'Item' not in employee_response:
-            return {
-                'success': False,
-                'message': f"Employee with ID {employee_id} not found"
-            }
-        
-        employee = employee_response['Item']
-        employee_name = employee.get('name', 'Unknown')
-        
-        # Prepare notification message
-        leave_type = leave_request.get('leaveType', 'Not specified')
-        start_date = leave_request.get('startDate', 'Not specified')
-        end_date = leave_request.get('endDate', 'Not specified')
-        status = leave_request.get('status', 'PENDING')
-        
-        # Create message based on leave status
-        if status == 'PENDING':
-            subject = f"New Leave Request: {employee_name} ({leave_id})"
-            approver_message = f"""
+    leave_id = leave_request['id']
+    employee_id = leave_request['employeeId']
+    
+    leave_type = leave_request.get('leaveType', 'Not specified')
+    start_date = leave_request.get('startDate', 'Not specified')
+    end_date = leave_request.get('endDate', 'Not specified')
+    status = leave_request.get('status', 'PENDING')
+    
+    # Create message based on leave status
+    if status == 'PENDING':
+        subject = f"New Leave Request: {employee_name} ({leave_id})"
+        approver_message = f"""
 New Leave Request Notification:
 
 Employee: {employee_name} (ID: {employee_id})
@@ -92,9 +79,9 @@ Status: PENDING APPROVAL
 Leave ID: {leave_id}
 
 Please review this leave request at your earliest convenience.
-            """
-            
-            employee_message = f"""
+        """
+        
+        employee_message = f"""
 Leave Request Confirmation:
 
 Your leave request has been submitted and is pending approval.
@@ -106,10 +93,10 @@ Status: PENDING APPROVAL
 Leave ID: {leave_id}
 
 You will be notified when your request is approved or rejected.
-            """
-        elif status == 'APPROVED':
-            subject = f"Leave Request Approved: {employee_name} ({leave_id})"
-            approver_message = f"""
+        """
+    elif status == 'APPROVED':
+        subject = f"Leave Request Approved: {employee_name} ({leave_id})"
+        approver_message = f"""
 Leave Request Approved Confirmation:
 
 You have approved the following leave request:
@@ -120,9 +107,9 @@ Period: {start_date} to {end_date}
 Status: APPROVED
 Leave ID: {leave_id}
 Approved At: {leave_request.get('approvedAt', 'Not specified')}
-            """
-            
-            employee_message = f"""
+        """
+        
+        employee_message = f"""
 Leave Request Approved:
 
 Your leave request has been approved.
@@ -133,12 +120,12 @@ Period: {start_date} to {end_date}
 Status: APPROVED
 Leave ID: {leave_id}
 Approved At: {leave_request.get('approvedAt', 'Not specified')}
-            """
-        elif status == 'REJECTED':
-            subject = f"Leave Request Rejected: {employee_name} ({leave_id})"
-            rejection_reason = leave_request.get('rejectionReason', 'No reason provided')
-            
-            approver_message = f"""
+        """
+    elif status == 'REJECTED':
+        subject = f"Leave Request Rejected: {employee_name} ({leave_id})"
+        rejection_reason = leave_request.get('rejectionReason', 'No reason provided')
+        
+        approver_message = f"""
 Leave Request Rejection Confirmation:
 
 You have rejected the following leave request:
@@ -150,9 +137,9 @@ Status: REJECTED
 Leave ID: {leave_id}
 Rejected At: {leave_request.get('rejectedAt', 'Not specified')}
 Reason: {rejection_reason}
-            """
-            
-            employee_message = f"""
+        """
+        
+        employee_message = f"""
 Leave Request Rejected:
 
 Your leave request has been rejected.
@@ -164,11 +151,11 @@ Status: REJECTED
 Leave ID: {leave_id}
 Rejected At: {leave_request.get('rejectedAt', 'Not specified')}
 Reason: {rejection_reason}
-            """
-        elif status == 'CANCELLED':
-            subject = f"Leave Request Cancelled: {employee_name} ({leave_id})"
-            
-            approver_message = f"""
+        """
+    elif status == 'CANCELLED':
+        subject = f"Leave Request Cancelled: {employee_name} ({leave_id})"
+        
+        approver_message = f"""
 Leave Request Cancellation Notification:
 
 The following leave request has been cancelled:
@@ -179,9 +166,9 @@ Period: {start_date} to {end_date}
 Status: CANCELLED
 Leave ID: {leave_id}
 Cancelled At: {leave_request.get('cancelledAt', 'Not specified')}
-            """
-            
-            employee_message = f"""
+        """
+        
+        employee_message = f"""
 Leave Request Cancellation Confirmation:
 
 Your leave request has been cancelled.
@@ -192,12 +179,128 @@ Period: {start_date} to {end_date}
 Status: CANCELLED
 Leave ID: {leave_id}
 Cancelled At: {leave_request.get('cancelledAt', 'Not specified')}
-            """
-        else:
+        """
+    else:
+        return None
+    
+    return subject, approver_message, employee_message
+
+def email_publication(recipient_email, subject, message):
+    """
+    SNS publish parameters for one email, routed by the subscription filter policy
+    
+    Args:
+        recipient_email (str): Email address matched by the subscription filter
+        subject (str): Email subject
+        message (str): Email body
+        
+    Returns:
+        dict: Parameters shared by Publish and PublishBatch entries
+    """
+    return {
+        'Message': json.dumps({
+            'default': 'Leave notification',
+            'email': message
+        }),
+        'Subject': subject,
+        'MessageStructure': 'json',
+        'MessageAttributes': {
+            'email': {
+                'DataType': 'String',
+                'StringValue': recipient_email
+            }
+        }
+    }
+
+def mark_notification_sent(leave_id):
+    """
+    Record when notifications were sent for a leave request
+    
+    The update only applies to an existing leave request, so a replayed
+    stream record or bulk call for a deleted leave does not create an item
+    holding nothing but the notification fields.
+    
+    Args:
+        leave_id (int): ID of the leave request
+        
+    Returns:
+        bool: Whether the leave request was marked; False if it does not exist
+    """
+    try:
+        table.update_item(
+            Key={
+                'id': leave_id,
+                'type': 'LEAVE_REQUEST'
+            },
+            UpdateExpression="SET notificationSent = :notificationSent",
+            ConditionExpression="attribute_exists(id)",
+            ExpressionAttributeValues={
+                ':notificationSent': datetime.now().isoformat()
+            }
+        )
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        logger.warning(f"Leave request {leave_id} no longer exists; not marking its notification as sent")
+        return False
+    return True
+
+def clear_notification_sent(leave_id):
+    """
+    Remove the notificationSent mark after a failed publish
+    
+    Args:
+        leave_id (int): ID of the leave request
+    """
+    try:
+        table.update_item(
+            Key={
+                'id': leave_id,
+                'type': 'LEAVE_REQUEST'
+            },
+            UpdateExpression="REMOVE notificationSent",
+            ConditionExpression="attribute_exists(id)"
+        )
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        # The leave request is gone; there is no mark to undo
+        pass
+
+def notify_leave_request(leave_id, employee_id=None, leave_request=None):
+    """
+    Notify both approver and employee about a leave request
+    
+    Args:
+        leave_id (int): ID of the leave request
+        employee_id (int, optional): Employee the leave belongs to; lets both be read in one request
+        leave_request (dict, optional): Leave request already loaded by the caller
+        
+    Returns:
+        dict: Notification status
+    """
+    try:
+        # Read the leave and its employee, in one request when the employee is known
+        leave_request, employee = leave_reader.read(leave_id, employee_id, leave_request)
+        
+        if leave_request is None:
+            return {
+                'success': False,
+                'message': f"Leave request with ID {leave_id} not found"
+            }
+        
+        if employee is None:
+            return {
+                'success': False,
+                'message': f"Employee with ID {leave_request['employeeId']} not found"
+            }
+        
+        employee_name = employee.get('name', 'Unknown')
+        
+        notification = build_notification(leave_request, employee_name)
+        if notification is None:
             return {
                 'success': False,
-                'message': f"Unknown leave status: {status}"
+                'message': f"Unknown leave status: {leave_request.get('status')}"
             }
+        subject, approver_message, employee_message = notification
+        status = leave_request.get('status', 'PENDING')
         
         # Send notifications via SNS
         # Use the pre-configured SNS topic and send emails directly
@@ -205,51 +308,28 @@ Cancelled At: {leave_request.get('cancelledAt', 'Not specified')}
             # Get the SNS topic ARN from environment variables
             topic_arn = os.environ.get('SNS_TOPIC_ARN')
             
-            # Send to approver using SES (via SNS)
-            approver_response = sns.publish(
-                TopicArn=topic_arn,
-                Message=json.dumps({
-                    'default': 'Leave notification',
-                    'email': approver_message
-                }),
-                Subject=subject,
-                MessageStructure='json',
-                MessageAttributes={
-                    'email': {
-                        'DataType': 'String',
-                        'StringValue': APPROVER_EMAIL
-                    }
-                }
-            )
+            # Publish to the approver and the employee concurrently
+            publishes = [
+                notification_pool.submit(sns.publish, TopicArn=topic_arn, **email_publication(APPROVER_EMAIL, subject, approver_message)),
+                notification_pool.submit(sns.publish, TopicArn=topic_arn, **email_publication(EMPLOYEE_EMAIL, subject, employee_message))
+            ]
             
-            # Send to employee using SES (via SNS)
-            employee_response = sns.publish(
-                TopicArn=topic_arn,
-                Message=json.dumps({
-                    'default': 'Leave notification',
-                    'email': employee_message
-                }),
-                Subject=subject,
-                MessageStructure='json',
-                MessageAttributes={
-                    'email': {
-                        'DataType': 'String',
-                        'StringValue': EMPLOYEE_EMAIL
-                    }
-                }
-            )
+            # Mark the notifications as sent while the publishes are in flight
+            marked = False
+            mark_error = None
+            try:
+                marked = mark_notification_sent(leave_id)
+            except Exception as e:
+                mark_error = e
             
-            # Update the leave request to mark notifications as sent
-            table.update_item(
-                Key={
-                    'id': leave_id,
-                    'type': 'LEAVE_REQUEST'
-                },
-                UpdateExpression="SET notificationSent = :notificationSent",
-                ExpressionAttributeValues={
-                    ':notificationSent': datetime.now().isoformat()
-                }
-            )
+            publish_errors = [publish.exception() for publish in publishes if publish.exception() is not None]
+            if publish_errors:
+                # Undo the optimistic mark so the leave still shows as not notified
+                if marked:
+                    clear_notification_sent(leave_id)
+                raise publish_errors[0]
+            if mark_error is not None:
+                raise mark_error
             
             return {
                 'success': True,
@@ -273,6 +353,113 @@ Cancelled At: {leave_request.get('cancelledAt', 'Not specified')}
             'message': f"Error processing notification: {str(e)}"
         }
 
+def notify_leave_requests(leave_ids):
+    """
+    Notify approver and employees about many leave requests at once
+    
+    Leaves and employees are read with BatchGetItem and the emails are sent
+    with SNS PublishBatch, ten per call, with all batches in flight together.
+    
+    Args:
+        leave_ids (list): IDs of the leave requests
+        
+    Returns:
+        dict: Per-leave notification results
+    """
+    try:
+        if not leave_ids:
+            return {
+                'success': False,
+                'message': "No leave request IDs provided"
+            }
+        if len(leave_ids) > MAX_BULK_NOTIFICATIONS:
+            return {
+                'success': False,
+                'message': f"At most {MAX_BULK_NOTIFICATIONS} leave requests can be notified at once"
+            }
+        
+        leaves = {
+            leave['id']: leave
+            for leave in batch_get_items(dynamodb, table.name, [{'id': leave_id, 'type': 'LEAVE_REQUEST'} for leave_id in leave_ids])
+        }
+        employees = {
+            employee['id']: employee
+            for employee in batch_get_items(
+                dynamodb, table.name,
+                [{'id': leave['employeeId'], 'type': 'EMPLOYEE'} for leave in leaves.values()],
+                projection='id, #type, #name',
+                attribute_names={'#type': 'type', '#name': 'name'}
+            )
+        }
+        
+        failures = {}
+        entries = []
+        for leave_id in leave_ids:
+            leave_request = leaves.get(leave_id)
+            if leave_request is None:
+                failures[leave_id] = f"Leave request with ID {leave_id} not found"
+                continue
+            employee = employees.get(leave_request['employeeId'])
+            if employee is None:
+                failures[leave_id] = f"Employee with ID {leave_request['employeeId']} not found"
+                continue
+            notification = build_notification(leave_request, employee.get('name', 'Unknown'))
+            if notification is None:
+                failures[leave_id] = f"Unknown leave status: {leave_request.get('status')}"
+                continue
+            
+            subject, approver_message, employee_message = notification
+            entries.append(dict(email_publication(APPROVER_EMAIL, subject, approver_message), Id=f"{leave_id}-approver"))
+            entries.append(dict(email_publication(EMPLOYEE_EMAIL, subject, employee_message), Id=f"{leave_id}-employee"))
+        
+        # Send every PublishBatch call concurrently
+        topic_arn = os.environ.get('SNS_TOPIC_ARN')
+        batches = [entries[i:i + MAX_PUBLISH_BATCH] for i in range(0, len(entries), MAX_PUBLISH_BATCH)]
+        publishes = [
+            notification_pool.submit(sns.publish_batch, TopicArn=topic_arn, PublishBatchRequestEntries=batch)
+            for batch in batches
+        ]
+        
+        for publish, batch in zip(publishes, batches):
+            try:
+                response = publish.result()
+            except Exception as e:
+                logger.error(f"Error sending notification batch: {str(e)}")
+                for entry in batch:
+                    failures.setdefault(int(entry['Id'].split('-')[0]), f"Error sending notifications: {str(e)}")
+                continue
+            for failed in response.get('Failed', []):
+                failures.setdefault(int(failed['Id'].split('-')[0]), f"Error sending notifications: {failed.get('Message', failed.get('Code'))}")
+        
+        # Mark the notified leaves concurrently; the table shares one thread-safe client
+        notified = [leave_id for leave_id in leave_ids if leave_id not in failures]
+        marks = [notification_pool.submit(mark_notification_sent, leave_id) for leave_id in notified]
+        for leave_id, mark in zip(notified, marks):
+            if mark.exception() is not None:
+                logger.error(f"Error marking notification sent for {leave_id}: {str(mark.exception())}")
+        
+        results = []
+        for leave_id in leave_ids:
+            if leave_id in failures:
+                results.append({'leaveId': leave_id, 'success': False, 'message': failures[leave_id]})
+            else:
+                results.append({'leaveId': leave_id, 'success': True, 'message': f"Notifications sent for leave request {leave_id}"})
+        
+        return {
+            'success': bool(notified),
+            'message': f"Notifications sent for {len(notified)} of {len(leave_ids)} leave requests",
+            'approverEmail': APPROVER_EMAIL,
+            'employeeEmail': EMPLOYEE_EMAIL,
+            'results': results
+        }
+    
+    except Exception as e:
+        logger.error(f"Error in notify_leave_requests: {str(e)}")
+        return {
+            'success': False,
+            'message': f"Error processing notifications: {str(e)}"
+        }
+
 def get_notification_status(leave_id):
     """
     Get notification status for a leave request
@@ -320,33 +507,21 @@ def get_notification_status(leave_id):
             'message': f"Error retrieving notification status: {str(e)}"
         }
 
-def resend_notification(leave_id):
+def resend_notification(leave_id, employee_id=None):
     """
     Resend notification for a leave request
     
     Args:
         leave_id (int): ID of the leave request
+        employee_id (int, optional): Employee the leave belongs to; lets both be read in one request
         
     Returns:
         dict: Notification status
     """
     try:
-        # First check if the leave request exists
-        response = table.get_item(
-            Key={
-                'id': leave_id,
-                'type': 'LEAVE_REQUEST'
-            }
-        )
-        
-        if 'Item' not in response:
-            return {
-                'success': False,
-                'message': f"Leave request with ID {leave_id} not found"
-            }
-        
-        # Simply call the notify function again
-        result = notify_leave_request(leave_id)
+        # notify_leave_request reports a missing leave itself, so the leave is
+        # read only once
+        result = notify_leave_request(leave_id, employee_id)
         
         if result['success']:
             return {
@@ -365,10 +540,99 @@ def resend_notification(leave_id):
             'message': f"Error resending notification: {str(e)}"
         }
 
+def stream_handler(event, context=None, dry_run=None):
+    """
+    Send notifications for the change records in a DynamoDB stream batch
+    
+    Change records carry the leave's details, so the emails are built without
+    reading the table. All emails of the batch go out with concurrent SNS
+    PublishBatch calls. Records whose emails failed are reported as batch item
+    failures; Lambda retries from the first of them, so a record may be
+    notified twice but is never skipped.
+    
+    Args:
+        event (dict): DynamoDB stream event, as delivered or as recorded
+        context (LambdaContext, optional): Context object from AWS Lambda
+        dry_run (bool, optional): Log the emails instead of sending them;
+            defaults to NOTIFICATION_DRY_RUN
+        
+    Returns:
+        dict: batchItemFailures with the sequence numbers to retry
+    """
+    if dry_run is None:
+        dry_run = NOTIFICATION_DRY_RUN
+    
+    records = change_records(event)
+    entries = []
+    for index, (sequence_number, record) in enumerate(records):
+        leave_request = record['leave']
+        notification = build_notification(leave_request, leave_request.get('employeeName', 'Unknown'))
+        if notification is None:
+            # Retrying cannot fix an unknown status; drop the record
+            logger.error(f"Unknown leave status in change record {record['type']} of leave {record['id']}")
+            continue
+        subject, approver_message, employee_message = notification
+        entries.append(dict(email_publication(APPROVER_EMAIL, subject, approver_message), Id=f"{index}-approver"))
+        entries.append(dict(email_publication(EMPLOYEE_EMAIL, subject, employee_message), Id=f"{index}-employee"))
+    
+    if dry_run:
+        for entry in entries:
+            logger.info(json.dumps({
+                'dryRun': True,
+                'to': entry['MessageAttributes']['email']['StringValue'],
+                'subject': entry['Subject'],
+                'email': json.loads(entry['Message'])['email']
+            }))
+        return {'batchItemFailures': []}
+    
+    # Send every PublishBatch call concurrently
+    topic_arn = os.environ.get('SNS_TOPIC_ARN')
+    batches = [entries[i:i + MAX_PUBLISH_BATCH] for i in range(0, len(entries), MAX_PUBLISH_BATCH)]
+    publishes = [
+        notification_pool.submit(sns.publish_batch, TopicArn=topic_arn, PublishBatchRequestEntries=batch)
+        for batch in batches
+    ]
+    
+    failed = set()
+    for publish, batch in zip(publishes, batches):
+        try:
+            response = publish.result()
+        except Exception as e:
+            logger.error(f"Error sending notification batch: {str(e)}")
+            failed.update(int(entry['Id'].split('-')[0]) for entry in batch)
+            continue
+        failed.update(int(entry['Id'].split('-')[0]) for entry in response.get('Failed', []))
+    
+    # Mark the notified leaves concurrently; a failed mark does not resend emails
+    notified = {records[index][1]['id'] for index in range(len(records)) if index not in failed}
+    marks = [(leave_id, notification_pool.submit(mark_notification_sent, leave_id)) for leave_id in notified]
+    for leave_id, mark in marks:
+        if mark.exception() is not None:
+            logger.error(f"Error marking notification sent for {leave_id}: {str(mark.exception())}")
+    
+    logger.info(f"Stream batch: {len(records)} change records, {len(failed)} failed")
+    return {
+        'batchItemFailures': [
+            {'itemIdentifier': records[index][0]} for index in sorted(failed)
+        ]
+    }
+
+# Agent function name to its schema-checked implementation
+ACTIONS = action_table('leave_notification', {
+    'notify_leave_request': notify_leave_request,
+    'notify_leave_requests': notify_leave_requests,
+    'get_notification_status': get_notification_status,
+    'resend_notification': resend_notification
+})
+
 def lambda_handler(event, context):
     """
     Lambda handler for leave notifications
     """
+    # DynamoDB stream batches of outbox change records
+    if 'Records' in event:
+        return stream_handler(event, context)
+    
     try:
         # Extract information from the event
         agent = event.get('agent')
@@ -379,28 +643,21 @@ def lambda_handler(event, context):
         # Convert parameters to a dictionary for easier access
         param_dict = {param['name']: param['value'] for param in parameters}
         
-        result = None
-        
-        # Process based on the function called
-        if function == 'notify_leave_request':
-            leave_id = int(param_dict.get('leave_id'))
-            result = notify_leave_request(leave_id)
-        elif function == 'get_notification_status':
-            leave_id = int(param_dict.get('leave_id'))
-            result = get_notification_status(leave_id)
-        elif function == 'resend_notification':
-            leave_id = int(param_dict.get('leave_id'))
-            result = resend_notification(leave_id)
+        # Parameters are checked against the agent schema before any I/O
+        action = ACTIONS.get(function)
+        if action is None:
+            result = unknown_function(function)
         else:
-            result = {
-                'success': False,
-                'message': f"Unknown function: {function}"
-            }
+            params, result = action.validate(param_dict)
+            if result is None:
+                result = action(params, context=context)
+        
+        logger.info(json.dumps({'employeeCache': employee_cache.stats()}))
         
         # Format the response for Bedrock agent
         response_body = {
             'TEXT': {
-                'body': json.dumps(result, cls=DecimalEncoder)
+                'body': json.dumps(result)
             }
         }
         
@@ -439,7 +696,7 @@ def lambda_handler(event, context):
                             'body': json.dumps({
                                 'success': False,
                                 'message': f"Error processing request: {str(e)}"
-                            }, cls=DecimalEncoder)
+                            })
                         }
                     }
                 }
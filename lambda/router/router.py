@@ -0,0 +1,76 @@
+import json
+import os
+import sys
+
+# The action group handlers are packaged next to this directory
+LAMBDA_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for handler_dir in ('leave_application', 'leave_approval', 'leave_notification'):
+    handler_path = os.path.join(LAMBDA_ROOT, handler_dir)
+    if handler_path not in sys.path:
+        sys.path.append(handler_path)
+
+import leave_application
+import leave_approval
+import leave_notification
+from lms_common.dispatch import unknown_function
+
+# One cache set for the whole container: a balance change made while approving
+# is seen by the next balance read instead of a separate, staler copy, and a
+# leave applied for is read together with its employee when approved. The
+# DynamoDB and SNS clients are already shared through lms_common.dynamo.
+employee_cache = leave_application.employee_cache
+leave_reader = leave_application.leave_reader
+for module in (leave_approval, leave_notification):
+    module.employee_cache = employee_cache
+    module.leave_reader = leave_reader
+
+# Holiday calendars are read once for the container, not once per action group
+leave_approval.holiday_calendar = leave_application.holiday_calendar
+
+HANDLER_MODULES = (leave_application, leave_approval, leave_notification)
+
+# Function to handler module; function names are unique across action groups,
+# so calls are routed by function alone, whatever the action groups are named
+FUNCTIONS = {
+    function: module for module in HANDLER_MODULES for function in module.ACTIONS
+}
+
+def lambda_handler(event, context):
+    """
+    Lambda handler hosting all three action groups
+
+    The event goes to the handler owning its function; the action group name
+    is not used. An unknown function is reported without calling a handler.
+    Stream batches go to the notification stream handler.
+
+    Args:
+        event (dict): Event data from AWS Lambda
+        context (LambdaContext): Context object from AWS Lambda
+    Returns:
+        dict: Response to be sent back to the caller
+    """
+    # DynamoDB stream batches of outbox change records
+    if 'Records' in event:
+        return leave_notification.stream_handler(event, context)
+    
+    function = event.get('function')
+    module = FUNCTIONS.get(function)
+    if module is not None:
+        return module.lambda_handler(event, context)
+
+    return {
+        'messageVersion': '1.0',
+        'response': {
+            'actionGroup': event.get('actionGroup', ''),
+            'function': function or '',
+            'functionResponse': {
+                'responseBody': {
+                    'TEXT': {
+                        'body': json.dumps(unknown_function(function))
+                    }
+                }
+            }
+        },
+        'sessionAttributes': event.get('sessionAttributes', {}),
+        'promptSessionAttributes': event.get('promptSessionAttributes', {})
+    }
@@ -2,6 +2,7 @@ import * as cdk from 'aws-cdk-lib';
 import { Construct } from 'constructs';
 import * as dynamodb from 'aws-cdk-lib/aws-dynamodb';
 import * as lambda from 'aws-cdk-lib/aws-lambda';
+import * as lambdaEventSources from 'aws-cdk-lib/aws-lambda-event-sources';
 import * as iam from 'aws-cdk-lib/aws-iam';
 import * as sns from 'aws-cdk-lib/aws-sns';
 import * as path from 'path';
@@ -37,60 +38,266 @@ export class LmsCdkStack extends cdk.Stack {
   constructor(scope: Construct, id: string, props?: cdk.StackProps) {
     super(scope, id, props);
 
+    // `cdk deploy -c notificationOutbox=true` records every leave change in the
+    // table and sends the notifications from its stream, so the agent no longer
+    // has to call notify_leave_request after each change
+    const notificationOutboxMode = [true, 'true'].includes(this.node.tryGetContext('notificationOutbox'));
+
     // Create DynamoDB table for leave management
     const leaveTable = new dynamodb.Table(this, 'LeaveManagementTable', {
       partitionKey: { name: 'id', type: dynamodb.AttributeType.NUMBER },
       sortKey: { name: 'type', type: dynamodb.AttributeType.STRING },
       billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
       removalPolicy: cdk.RemovalPolicy.DESTROY, // For development only
+      timeToLiveAttribute: 'expiresAt', // Expires stored results of idempotent actions, change records and aggregate cursors
+      // Old images let the aggregation Lambda work out what each change moved
+      stream: dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
+    });
+
+    // DynamoDB adds at most one global secondary index per table update, so a
+    // table that lacks several of the indexes below is upgraded in stages:
+    // `cdk deploy -c indexStage=1`, then 2, 3 and 4, running
+    // utils/backfill_indexes.py between the stages. Without the flag every
+    // index is declared
+    const indexStage = Number(this.node.tryGetContext('indexStage') ?? Infinity);
+    const leaveTableIndexes: dynamodb.GlobalSecondaryIndexProps[] = [];
+
+    // Index of leave requests per employee, newest first by appliedAt
+    const employeeLeaveIndexName = 'EmployeeLeaveIndex';
+    leaveTableIndexes.push({
+      indexName: employeeLeaveIndexName,
+      partitionKey: { name: 'employeeId', type: dynamodb.AttributeType.NUMBER },
+      sortKey: { name: 'appliedAt', type: dynamodb.AttributeType.STRING },
+      projectionType: dynamodb.ProjectionType.ALL,
+    });
+
+    // Leave requests per employee by endDate, for overlap checks on apply
+    const employeeLeaveEndIndexName = 'EmployeeLeaveEndIndex';
+    leaveTableIndexes.push({
+      indexName: employeeLeaveEndIndexName,
+      partitionKey: { name: 'employeeId', type: dynamodb.AttributeType.NUMBER },
+      sortKey: { name: 'endDate', type: dynamodb.AttributeType.STRING },
+      projectionType: dynamodb.ProjectionType.INCLUDE,
+      nonKeyAttributes: ['startDate', 'status', 'leaveType'],
     });
 
+    // Sparse pending queue: only PENDING leave requests carry pendingStatus
+    const pendingLeaveIndexName = 'PendingLeaveIndex';
+    leaveTableIndexes.push({
+      indexName: pendingLeaveIndexName,
+      partitionKey: { name: 'pendingStatus', type: dynamodb.AttributeType.STRING },
+      sortKey: { name: 'appliedAt', type: dynamodb.AttributeType.STRING },
+      projectionType: dynamodb.ProjectionType.ALL,
+    });
+
+    // Sparse index of EMPLOYEE items per department, carrying names and balances
+    const departmentEmployeeIndexName = 'DepartmentEmployeeIndex';
+    leaveTableIndexes.push({
+      indexName: departmentEmployeeIndexName,
+      partitionKey: { name: 'department', type: dynamodb.AttributeType.STRING },
+      sortKey: { name: 'id', type: dynamodb.AttributeType.NUMBER },
+      projectionType: dynamodb.ProjectionType.INCLUDE,
+      nonKeyAttributes: ['name', 'leaveBalances'],
+    });
+
+    leaveTableIndexes.slice(0, indexStage).forEach(index => leaveTable.addGlobalSecondaryIndex(index));
+
     // Create SNS topic for leave notifications
     const leaveNotificationTopic = new sns.Topic(this, 'LeaveNotificationTopic', {
       displayName: 'Leave Management Notifications',
     });
 
-    // Create Lambda for leave approval/rejection
-    const leaveApprovalLambda = new lambda.Function(this, 'LeaveApprovalLambda', {
-      runtime: lambda.Runtime.PYTHON_3_9,
-      handler: 'leave_approval.lambda_handler',
-      code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/leave_approval')),
-      environment: {
-        TABLE_NAME: leaveTable.tableName,
-      },
+    // Shared Python helpers (pagination, ...) packaged as a Lambda layer
+    const commonLayer = new lambda.LayerVersion(this, 'LmsCommonLayer', {
+      code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/common'), {
+        // lms_common links to bedrock_agent_schemas.json; ship the file itself
+        followSymlinks: cdk.SymlinkFollowMode.ALWAYS,
+      }),
+      compatibleRuntimes: [lambda.Runtime.PYTHON_3_9],
+      description: 'Shared helpers for the Leave Management System Lambda functions',
     });
 
-    // Create Lambda for leave application/cancellation
-    const leaveApplicationLambda = new lambda.Function(this, 'LeaveApplicationLambda', {
-      runtime: lambda.Runtime.PYTHON_3_9,
-      handler: 'leave_application.lambda_handler',
-      code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/leave_application')),
-      environment: {
-        TABLE_NAME: leaveTable.tableName,
-      },
-    });
+    // Time limit of every Lambda. Bulk actions and approvals run several
+    // DynamoDB calls in a row, so the 3 second default is too short; each AWS
+    // call, retries included, gets a fifth of it (AWS_CALL_BUDGET_SECONDS) so
+    // a stuck call fails while the handler can still answer
+    const functionTimeout = cdk.Duration.seconds(30);
+    const awsCallBudgetSeconds = String(functionTimeout.toSeconds() / 5);
+
+    // `cdk deploy -c routerLambda=true` deploys a single Lambda hosting all
+    // three action groups, so one warm container, client pool and cache set
+    // serves a whole conversation. One Lambda per action group is the default.
+    const routerLambdaMode = [true, 'true'].includes(this.node.tryGetContext('routerLambda'));
+
+    // Lambdas the agent invokes, with the ID and description of their ARN output
+    const actionLambdas: { id: string; fn: lambda.Function; description: string }[] = [];
 
-    // Create Lambda for leave notifications
-    const leaveNotificationLambda = new lambda.Function(this, 'LeaveNotificationLambda', {
+    // Lambda sending notifications, which also consumes the outbox stream
+    let notificationLambda: lambda.Function;
+
+    if (routerLambdaMode) {
+      // Create one Lambda for all action groups; the other handlers are packaged with it
+      const leaveRouterLambda = new lambda.Function(this, 'LeaveRouterLambda', {
+        runtime: lambda.Runtime.PYTHON_3_9,
+        handler: 'router.router.lambda_handler',
+        code: lambda.Code.fromAsset(path.join(__dirname, '../lambda'), {
+          exclude: ['common', '**/__pycache__'],
+        }),
+        layers: [commonLayer],
+        timeout: functionTimeout,
+        environment: {
+          TABLE_NAME: leaveTable.tableName,
+          AWS_CALL_BUDGET_SECONDS: awsCallBudgetSeconds,
+          EMPLOYEE_LEAVE_INDEX: employeeLeaveIndexName,
+          PENDING_LEAVE_INDEX: pendingLeaveIndexName,
+          DEPARTMENT_EMPLOYEE_INDEX: departmentEmployeeIndexName,
+          EMPLOYEE_LEAVE_END_INDEX: employeeLeaveEndIndexName,
+          SNS_TOPIC_ARN: leaveNotificationTopic.topicArn,
+          EMPLOYEE_EMAIL: EMPLOYEE_EMAIL,
+          APPROVER_EMAIL: APPROVER_EMAIL,
+          NOTIFICATION_OUTBOX: String(notificationOutboxMode),
+        },
+      });
+
+      leaveNotificationTopic.grantPublish(leaveRouterLambda);
+      notificationLambda = leaveRouterLambda;
+      actionLambdas.push({
+        id: 'LeaveRouterLambda',
+        fn: leaveRouterLambda,
+        description: 'ARN of the Leave Router Lambda function (all action groups)',
+      });
+    } else {
+      // Create Lambda for leave approval/rejection
+      const leaveApprovalLambda = new lambda.Function(this, 'LeaveApprovalLambda', {
+        runtime: lambda.Runtime.PYTHON_3_9,
+        handler: 'leave_approval.lambda_handler',
+        code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/leave_approval')),
+        layers: [commonLayer],
+        timeout: functionTimeout,
+        environment: {
+          TABLE_NAME: leaveTable.tableName,
+          AWS_CALL_BUDGET_SECONDS: awsCallBudgetSeconds,
+          EMPLOYEE_LEAVE_INDEX: employeeLeaveIndexName,
+          PENDING_LEAVE_INDEX: pendingLeaveIndexName,
+          NOTIFICATION_OUTBOX: String(notificationOutboxMode),
+        },
+      });
+
+      // Create Lambda for leave application/cancellation
+      const leaveApplicationLambda = new lambda.Function(this, 'LeaveApplicationLambda', {
+        runtime: lambda.Runtime.PYTHON_3_9,
+        handler: 'leave_application.lambda_handler',
+        code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/leave_application')),
+        layers: [commonLayer],
+        timeout: functionTimeout,
+        environment: {
+          TABLE_NAME: leaveTable.tableName,
+          AWS_CALL_BUDGET_SECONDS: awsCallBudgetSeconds,
+          EMPLOYEE_LEAVE_INDEX: employeeLeaveIndexName,
+          DEPARTMENT_EMPLOYEE_INDEX: departmentEmployeeIndexName,
+          EMPLOYEE_LEAVE_END_INDEX: employeeLeaveEndIndexName,
+          NOTIFICATION_OUTBOX: String(notificationOutboxMode),
+        },
+      });
+
+      // Create Lambda for leave notifications
+      const leaveNotificationLambda = new lambda.Function(this, 'LeaveNotificationLambda', {
+        runtime: lambda.Runtime.PYTHON_3_9,
+        handler: 'leave_notification.lambda_handler',
+        code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/leave_notification')),
+        layers: [commonLayer],
+        timeout: functionTimeout,
+        environment: {
+          TABLE_NAME: leaveTable.tableName,
+          AWS_CALL_BUDGET_SECONDS: awsCallBudgetSeconds,
+          SNS_TOPIC_ARN: leaveNotificationTopic.topicArn,
+          EMPLOYEE_EMAIL: EMPLOYEE_EMAIL,
+          APPROVER_EMAIL: APPROVER_EMAIL,
+        },
+      });
+
+      // Grant SNS publish permissions to notification Lambda
+      leaveNotificationTopic.grantPublish(leaveNotificationLambda);
+      notificationLambda = leaveNotificationLambda;
+
+      actionLambdas.push(
+        {
+          id: 'LeaveApprovalLambda',
+          fn: leaveApprovalLambda,
+          description: 'ARN of the Leave Approval Lambda function',
+        },
+        {
+          id: 'LeaveApplicationLambda',
+          fn: leaveApplicationLambda,
+          description: 'ARN of the Leave Application Lambda function',
+        },
+        {
+          id: 'LeaveNotificationLambda',
+          fn: leaveNotificationLambda,
+          description: 'ARN of the Leave Notification Lambda function',
+        },
+      );
+    }
+
+    // Grant permissions to Lambda functions
+    for (const { fn } of actionLambdas) {
+      leaveTable.grantReadWriteData(fn);
+    }
+
+    if (notificationOutboxMode) {
+      // Feed the change records to the Lambda that sends notifications; failed
+      // records are retried from the first failure without redoing the batch
+      notificationLambda.addEventSource(new lambdaEventSources.DynamoEventSource(leaveTable, {
+        startingPosition: lambda.StartingPosition.LATEST,
+        batchSize: 100,
+        maxBatchingWindow: cdk.Duration.seconds(1),
+        reportBatchItemFailures: true,
+        retryAttempts: 10,
+        filters: [
+          lambda.FilterCriteria.filter({
+            eventName: lambda.FilterRule.isEqual('INSERT'),
+            dynamodb: {
+              NewImage: {
+                type: { S: lambda.FilterRule.beginsWith('OUTBOX#') },
+              },
+            },
+          }),
+        ],
+      }));
+    }
+    
+    // Lambda keeping the per-employee and per-department leave totals that
+    // get_leave_summary reads, from every change of a leave request
+    const leaveAggregationLambda = new lambda.Function(this, 'LeaveAggregationLambda', {
       runtime: lambda.Runtime.PYTHON_3_9,
-      handler: 'leave_notification.lambda_handler',
-      code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/leave_notification')),
-      timeout: cdk.Duration.seconds(15),
+      handler: 'leave_aggregation.lambda_handler',
+      code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/leave_aggregation')),
+      layers: [commonLayer],
+      timeout: functionTimeout,
       environment: {
         TABLE_NAME: leaveTable.tableName,
-        SNS_TOPIC_ARN: leaveNotificationTopic.topicArn,
-        EMPLOYEE_EMAIL: EMPLOYEE_EMAIL,
-        APPROVER_EMAIL: APPROVER_EMAIL,
+        AWS_CALL_BUDGET_SECONDS: awsCallBudgetSeconds,
       },
     });
+    leaveTable.grantReadWriteData(leaveAggregationLambda);
 
-    // Grant permissions to Lambda functions
-    leaveTable.grantReadWriteData(leaveApprovalLambda);
-    leaveTable.grantReadWriteData(leaveApplicationLambda);
-    leaveTable.grantReadWriteData(leaveNotificationLambda);
-    
-    // Grant SNS publish permissions to notification Lambda
-    leaveNotificationTopic.grantPublish(leaveNotificationLambda);
+    // Changes are applied in order; a failed one is retried from where it stopped
+    leaveAggregationLambda.addEventSource(new lambdaEventSources.DynamoEventSource(leaveTable, {
+      startingPosition: lambda.StartingPosition.TRIM_HORIZON,
+      batchSize: 100,
+      maxBatchingWindow: cdk.Duration.seconds(1),
+      reportBatchItemFailures: true,
+      retryAttempts: 10,
+      filters: [
+        lambda.FilterCriteria.filter({
+          dynamodb: {
+            Keys: {
+              type: { S: lambda.FilterRule.isEqual('LEAVE_REQUEST') },
+            },
+          },
+        }),
+      ],
+    }));
     
     // Subscribe the approver and employee emails to the SNS topic
     new sns.Subscription(this, 'ApproverEmailSubscription', {
@@ -119,36 +326,20 @@ export class LmsCdkStack extends cdk.Stack {
     const bedrockPrincipal = new iam.ServicePrincipal('bedrock.amazonaws.com');
     
     // Add resource-based policy to allow Bedrock to invoke the Lambda functions
-    leaveApprovalLambda.addPermission('BedrockInvokePermission', {
-      principal: bedrockPrincipal,
-      action: 'lambda:InvokeFunction',
-    });
-
-    leaveApplicationLambda.addPermission('BedrockInvokePermission', {
-      principal: bedrockPrincipal,
-      action: 'lambda:InvokeFunction',
-    });
-
-    leaveNotificationLambda.addPermission('BedrockInvokePermission', {
-      principal: bedrockPrincipal,
-      action: 'lambda:InvokeFunction',
-    });
+    for (const { fn } of actionLambdas) {
+      fn.addPermission('BedrockInvokePermission', {
+        principal: bedrockPrincipal,
+        action: 'lambda:InvokeFunction',
+      });
+    }
 
     // Output the Lambda ARNs and DynamoDB table name
-    new cdk.CfnOutput(this, 'LeaveApprovalLambdaArn', {
-      value: leaveApprovalLambda.functionArn,
-      description: 'ARN of the Leave Approval Lambda function',
-    });
-
-    new cdk.CfnOutput(this, 'LeaveApplicationLambdaArn', {
-      value: leaveApplicationLambda.functionArn,
-      description: 'ARN of the Leave Application Lambda function',
-    });
-
-    new cdk.CfnOutput(this, 'LeaveNotificationLambdaArn', {
-      value: leaveNotificationLambda.functionArn,
-      description: 'ARN of the Leave Notification Lambda function',
-    });
+    for (const { id, fn, description } of actionLambdas) {
+      new cdk.CfnOutput(this, `${id}Arn`, {
+        value: fn.functionArn,
+        description: description,
+      });
+    }
 
     new cdk.CfnOutput(this, 'LeaveTableName', {
       value: leaveTable.tableName,
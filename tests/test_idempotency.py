@@ -0,0 +1,123 @@
+"""
+Replay rules of lms_common.idempotency
+
+Runs without AWS access against an in-memory table:
+    python -m unittest discover tests
+"""
+import json
+import pathlib
+import sys
+import time
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / 'lambda' / 'common' / 'python'))
+from lms_common.idempotency import IdempotencyKey, TTL_ATTRIBUTE
+
+
+class ConditionFailed(Exception):
+    pass
+
+
+class FakeTable:
+    """The get_item and transactional put parts of a table, keyed on (id, type)"""
+
+    name = 'LeaveManagementTable'
+
+    def __init__(self):
+        self.items = {}
+
+    def get_item(self, Key, **kwargs):
+        item = self.items.get((Key['id'], Key['type']))
+        return {'Item': dict(item)} if item is not None else {}
+
+    def transact(self, puts):
+        """Apply Put entries all or nothing, checking the idempotency record's condition"""
+        for entry in puts:
+            put = entry['Put']
+            existing = self.items.get((put['Item']['id'], put['Item']['type']))
+            values = put.get('ExpressionAttributeValues', {})
+            if 'ConditionExpression' in put and existing is not None:
+                expired = existing.get(TTL_ATTRIBUTE, 0) <= values.get(':now', 0)
+                stale = ':stale' in values and existing.get('result') == values[':stale']
+                if not (expired or stale):
+                    raise ConditionFailed(put['Item']['type'])
+        for entry in puts:
+            item = entry['Put']['Item']
+            self.items[(item['id'], item['type'])] = dict(item)
+
+    def set_status(self, leave_id, status):
+        self.items[(leave_id, 'LEAVE_REQUEST')]['status'] = status
+
+
+PARAMETERS = {'employeeId': '1001', 'startDate': '2025-07-07', 'endDate': '2025-07-11', 'leaveType': 'Annual'}
+
+
+class IdempotencyReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.table = FakeTable()
+
+    def key(self):
+        return IdempotencyKey(self.table, 'session-1', 'apply_leave', PARAMETERS)
+
+    def apply(self, leave_id):
+        """One apply_leave call: replay a stored result, or submit a new leave"""
+        key = self.key()
+        replayed = key.lookup()
+        if replayed is not None:
+            return replayed
+        result = {'success': True, 'leaveId': leave_id, 'status': 'PENDING'}
+        self.table.transact([
+            {'Put': {'Item': {'id': leave_id, 'type': 'LEAVE_REQUEST', 'status': 'PENDING'}}},
+            key.put_item(result, leave_id, 'PENDING')
+        ])
+        return result
+
+    def test_retry_replays_the_stored_result(self):
+        first = self.apply(2000001)
+        self.assertEqual(self.apply(2000002), first)
+        self.assertNotIn((2000002, 'LEAVE_REQUEST'), self.table.items)
+
+    def test_apply_cancel_apply_submits_a_new_leave(self):
+        self.apply(2000001)
+        self.table.set_status(2000001, 'CANCELLED')
+
+        second = self.apply(2000002)
+        self.assertEqual(second['leaveId'], 2000002)
+        self.assertEqual(self.table.items[(2000002, 'LEAVE_REQUEST')]['status'], 'PENDING')
+
+        # The new result is the one replayed from now on
+        self.assertEqual(self.apply(2000003), second)
+
+    def test_rejected_leave_is_not_replayed(self):
+        self.apply(2000001)
+        self.table.set_status(2000001, 'REJECTED')
+        self.assertEqual(self.apply(2000002)['leaveId'], 2000002)
+
+    def test_approved_leave_is_still_replayed(self):
+        first = self.apply(2000001)
+        self.table.set_status(2000001, 'APPROVED')
+        self.assertEqual(self.apply(2000002), first)
+
+    def test_stale_result_only_overwrites_itself(self):
+        self.apply(2000001)
+        self.table.set_status(2000001, 'CANCELLED')
+        key = self.key()
+        self.assertIsNone(key.lookup())
+
+        # A concurrent call stored a fresh result in the meantime
+        self.apply(2000002)
+        with self.assertRaises(ConditionFailed):
+            self.table.transact([key.put_item({'success': True, 'leaveId': 2000003}, 2000003, 'PENDING')])
+        self.assertEqual(key.replay()['leaveId'], 2000002)
+
+    def test_expired_result_is_not_replayed(self):
+        self.apply(2000001)
+        record = next(item for item in self.table.items.values() if item['type'].startswith('IDEMPOTENCY#'))
+        record[TTL_ATTRIBUTE] = int(time.time()) - 1
+        self.assertIsNone(self.key().lookup())
+        self.assertEqual(json.loads(record['result'])['leaveId'], 2000001)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,304 @@
+import boto3
+import os
+import argparse
+from boto3.dynamodb.conditions import Attr
+from seed_data import get_table_name
+from table_scan import DEFAULT_REGION
+from lms_common.pagination import Paginator
+from lms_common.ids import LEAVE_ID_COUNTER_KEY, LEAVE_ID_BASE
+from lms_common.absences import absence_updates, write_absence_updates
+from lms_common.aggregates import (
+    leave_contribution, employee_stats_key, department_stats_key, LEAVE_DEPARTMENT_ATTRIBUTE, STATS_DEPARTMENT_ATTRIBUTE
+)
+
+# Placeholder used when a legacy leave request has no timestamp at all
+EPOCH_TIMESTAMP = '1970-01-01T00:00:00+00:00'
+
+def employee_leave_index_updates(item):
+    """
+    Attributes needed for a leave request to appear in EmployeeLeaveIndex
+
+    Args:
+        item (dict): LEAVE_REQUEST item
+
+    Returns:
+        dict: Attribute name to value for every attribute that has to be set
+    """
+    updates = {}
+
+    # The index is keyed on a numeric employeeId; older items may hold it as a string
+    employee_id = item.get('employeeId')
+    if isinstance(employee_id, str) and employee_id.isdigit():
+        updates['employeeId'] = int(employee_id)
+
+    # Fall back to the earliest known timestamp for items without appliedAt
+    if not item.get('appliedAt'):
+        timestamps = [item[name] for name in ('approvedAt', 'rejectedAt', 'cancelledAt', 'notificationSent') if item.get(name)]
+        updates['appliedAt'] = min(timestamps) if timestamps else EPOCH_TIMESTAMP
+
+    return updates
+
+def pending_leave_index_updates(item):
+    """
+    Attributes needed to keep PendingLeaveIndex limited to PENDING requests
+
+    Args:
+        item (dict): LEAVE_REQUEST item
+
+    Returns:
+        dict: Attribute name to value; a value of None removes the attribute
+    """
+    if item.get('status') == 'PENDING':
+        if item.get('pendingStatus') != 'PENDING':
+            return {'pendingStatus': 'PENDING'}
+    elif 'pendingStatus' in item:
+        return {'pendingStatus': None}
+    return {}
+
+# Each backfill returns the attributes a LEAVE_REQUEST item is missing for one index
+BACKFILLS = [
+    employee_leave_index_updates,
+    pending_leave_index_updates,
+]
+
+def backfill_indexes(table_name, region=DEFAULT_REGION, dry_run=False):
+    """
+    Add index key attributes to existing LEAVE_REQUEST items
+
+    Args:
+        table_name (str): Name of the DynamoDB table
+        region (str): AWS region
+        dry_run (bool): Only report the items that would be updated
+
+    Returns:
+        int: Number of items updated (or that would be updated)
+    """
+    print(f"Backfilling index attributes in table: {table_name} in region: {region}")
+
+    dynamodb = boto3.resource('dynamodb', region_name=region)
+    table = dynamodb.Table(table_name)
+
+    leaves = Paginator(
+        table.scan,
+        FilterExpression=Attr('type').eq('LEAVE_REQUEST')
+    )
+
+    scanned = 0
+    updated = 0
+    max_leave_id = 0
+    for item in leaves:
+        scanned += 1
+        max_leave_id = max(max_leave_id, item['id'])
+
+        updates = {}
+        for backfill in BACKFILLS:
+            updates.update(backfill(item))
+
+        if not updates:
+            continue
+
+        updated += 1
+        if dry_run:
+            print(f"Would update leave request {item['id']}: {updates}")
+            continue
+
+        names = {}
+        values = {}
+        set_actions = []
+        remove_actions = []
+        for i, (name, value) in enumerate(updates.items()):
+            names[f"#a{i}"] = name
+            if value is None:
+                remove_actions.append(f"#a{i}")
+            else:
+                values[f":v{i}"] = value
+                set_actions.append(f"#a{i} = :v{i}")
+
+        update_expression = ""
+        if set_actions:
+            update_expression += "SET " + ", ".join(set_actions)
+        if remove_actions:
+            update_expression += " REMOVE " + ", ".join(remove_actions)
+
+        update_kwargs = {
+            'Key': {
+                'id': item['id'],
+                'type': 'LEAVE_REQUEST'
+            },
+            'UpdateExpression': update_expression.strip(),
+            'ExpressionAttributeNames': names
+        }
+        if values:
+            update_kwargs['ExpressionAttributeValues'] = values
+        table.update_item(**update_kwargs)
+
+    action = "would be updated" if dry_run else "updated"
+    print(f"Scanned {scanned} leave requests, {updated} {action}")
+    advance_leave_id_counter(table, max_leave_id, dry_run)
+    return updated
+
+def advance_leave_id_counter(table, max_leave_id, dry_run=False):
+    """
+    Move the leave ID counter past an existing leave ID in its range
+
+    apply_leave hands out IDs from LEAVE_ID_BASE on. An older leave whose ID
+    reached that range would otherwise be handed out again.
+
+    Args:
+        table: DynamoDB Table holding the counter item
+        max_leave_id (int): Largest ID of the existing leave requests
+        dry_run (bool): Only report the counter value that would be set
+
+    Returns:
+        bool: Whether the counter was (or would be) moved
+    """
+    if max_leave_id < LEAVE_ID_BASE:
+        return False
+
+    leased = int(max_leave_id) - LEAVE_ID_BASE + 1
+    if dry_run:
+        print(f"Would move the leave ID counter to at least {leased} leased IDs")
+        return True
+    try:
+        table.update_item(
+            Key=LEAVE_ID_COUNTER_KEY,
+            UpdateExpression="SET #leased = :leased",
+            ConditionExpression="attribute_not_exists(#leased) OR #leased < :leased",
+            ExpressionAttributeNames={'#leased': 'leased'},
+            ExpressionAttributeValues={':leased': leased}
+        )
+    except table.meta.client.exceptions.ConditionalCheckFailedException:
+        # The counter is already past the existing leaves
+        return False
+    print(f"Moved the leave ID counter past leave request {max_leave_id}")
+    return True
+
+def backfill_absences(table_name, region=DEFAULT_REGION, dry_run=False):
+    """
+    Mark existing APPROVED leave requests in the department absence calendars
+
+    The calendar updates are set additions, so running this again over leaves
+    already in the calendar changes nothing.
+
+    Args:
+        table_name (str): Name of the DynamoDB table
+        region (str): AWS region
+        dry_run (bool): Only report the calendar items that would be updated
+
+    Returns:
+        int: Number of calendar item updates applied (or that would be applied)
+    """
+    print(f"Backfilling absence calendars in table: {table_name} in region: {region}")
+
+    dynamodb = boto3.resource('dynamodb', region_name=region)
+    table = dynamodb.Table(table_name)
+
+    departments = {
+        item['id']: item['department']
+        for item in Paginator(
+            table.scan,
+            FilterExpression=Attr('type').eq('EMPLOYEE') & Attr('department').exists(),
+            ProjectionExpression='id, department'
+        )
+    }
+
+    by_department = {}
+    for item in Paginator(
+        table.scan,
+        FilterExpression=Attr('type').eq('LEAVE_REQUEST') & Attr('status').eq('APPROVED')
+    ):
+        department = departments.get(item['employeeId'])
+        if department:
+            by_department.setdefault(department, []).append(
+                (item['employeeId'], item.get('employeeName'), item['startDate'], item['endDate'])
+            )
+
+    updated = 0
+    for department, absences in by_department.items():
+        items = absence_updates(table_name, department, absences)
+        updated += len(items)
+        if dry_run:
+            print(f"Would update {len(items)} calendar months of {department} for {len(absences)} approved leaves")
+        else:
+            write_absence_updates(table, items)
+
+    action = "would be updated" if dry_run else "updated"
+    print(f"{updated} calendar months {action} across {len(by_department)} departments")
+    return updated
+
+def backfill_aggregates(table_name, region=DEFAULT_REGION, dry_run=False):
+    """
+    Rebuild the EMPLOYEE_STATS and DEPARTMENT_STATS items from all leave requests
+
+    The items are overwritten with totals counted from a scan, so run this
+    while no leaves are changing; the aggregation Lambda adds later changes.
+
+    Args:
+        table_name (str): Name of the DynamoDB table
+        region (str): AWS region
+        dry_run (bool): Only report the aggregate items that would be written
+
+    Returns:
+        int: Number of aggregate items written (or that would be written)
+    """
+    print(f"Rebuilding leave aggregates in table: {table_name} in region: {region}")
+
+    dynamodb = boto3.resource('dynamodb', region_name=region)
+    table = dynamodb.Table(table_name)
+
+    departments = {
+        item['id']: item['department']
+        for item in Paginator(
+            table.scan,
+            FilterExpression=Attr('type').eq('EMPLOYEE') & Attr('department').exists(),
+            ProjectionExpression='id, department'
+        )
+    }
+
+    aggregates = {}
+    for item in Paginator(
+        table.scan,
+        FilterExpression=Attr('type').eq('LEAVE_REQUEST')
+    ):
+        employee_id = item['employeeId']
+        # Leaves count for the department stored on them; older ones for the employee's
+        department = item.get(LEAVE_DEPARTMENT_ATTRIBUTE) or departments.get(employee_id)
+        for year, contribution in leave_contribution(item).items():
+            key = employee_stats_key(employee_id, year)
+            aggregate = aggregates.setdefault((key['id'], key['type']), dict(
+                key, employeeId=employee_id, employeeName=item.get('employeeName', 'Unknown'), year=year
+            ))
+            for name, value in contribution.items():
+                aggregate[name] = aggregate.get(name, 0) + value
+            if department:
+                key = department_stats_key(department, year)
+                aggregate = aggregates.setdefault((key['id'], key['type']), dict(key, **{STATS_DEPARTMENT_ATTRIBUTE: department}, year=year))
+                for name, value in contribution.items():
+                    aggregate[name] = aggregate.get(name, 0) + value
+
+    if dry_run:
+        for aggregate in aggregates.values():
+            print(f"Would write {aggregate['type']} of {aggregate['id']}")
+    else:
+        with table.batch_writer() as writer:
+            for aggregate in aggregates.values():
+                writer.put_item(Item=aggregate)
+
+    action = "would be written" if dry_run else "written"
+    print(f"{len(aggregates)} aggregate items {action}")
+    return len(aggregates)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill attributes used by the table's secondary indexes")
+    parser.add_argument('--dry-run', action='store_true', help="Report the items that would change without writing")
+    parser.add_argument('--absences', action='store_true', help="Also add approved leaves to the department absence calendars")
+    parser.add_argument('--aggregates', action='store_true', help="Also rebuild the per-employee and per-department leave totals")
+    args = parser.parse_args()
+
+    table_name = get_table_name()
+    region = os.environ.get('AWS_REGION', DEFAULT_REGION)
+    backfill_indexes(table_name, region, dry_run=args.dry_run)
+    if args.absences:
+        backfill_absences(table_name, region, dry_run=args.dry_run)
+    if args.aggregates:
+        backfill_aggregates(table_name, region, dry_run=args.dry_run)
@@ -6,6 +6,15 @@ from boto3.dynamodb.conditions import Key, Attr
 from tabulate import tabulate
 from dotenv import load_dotenv
 import pathlib
+import sys
+
+# Share the helpers packaged in the Lambda layer with the utility scripts
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / 'lambda' / 'common' / 'python'))
+from lms_common.pagination import Paginator
+from lms_common.leave_policy import LeavePolicy
+from lms_common.aggregates import employee_stats_key, department_stats_key, summarize
+from report_engine import scan_sorted, projection, DEFAULT_SEGMENTS, DEFAULT_WORKERS
+from table_scan import DEFAULT_REGION
 
 # Load environment variables from .env file
 env_path = pathlib.Path(__file__).parent / '.env'
@@ -15,7 +24,27 @@ load_dotenv(dotenv_path=env_path)
 EMPLOYEE_EMAIL = os.environ.get('EMPLOYEE_EMAIL', 'example@example.com')
 APPROVER_EMAIL = os.environ.get('APPROVER_EMAIL', 'example@example.com')
 
-def query_employee_leaves(table_name, employee_id, region='us-east-1'):
+# Global secondary index keyed on employeeId (partition) and appliedAt (sort)
+EMPLOYEE_LEAVE_INDEX = os.environ.get('EMPLOYEE_LEAVE_INDEX', 'EmployeeLeaveIndex')
+
+# Sparse index of PENDING leave requests keyed on pendingStatus and appliedAt
+PENDING_LEAVE_INDEX = os.environ.get('PENDING_LEAVE_INDEX', 'PendingLeaveIndex')
+
+def shown(rows, total, order):
+    """Note on how many of the matching rows a report shows, e.g. ', showing the 10 most recent'"""
+    return f", showing the {len(rows)} {order}" if len(rows) < total else ""
+
+def ask_limit():
+    """
+    Ask how many rows a report shows
+    
+    Returns:
+        int: Number of rows, or None for all of them
+    """
+    answer = input("How many rows to show (press Enter for all): ").strip()
+    return int(answer) if answer.isdigit() and int(answer) > 0 else None
+
+def query_employee_leaves(table_name, employee_id, region=DEFAULT_REGION):
     """
     Query all leave requests for a specific employee
     
@@ -56,20 +85,18 @@ def query_employee_leaves(table_name, employee_id, region='us-east-1'):
     
     print("\nLeave Requests:")
     
-    # Query all leave requests for this employee
-    scan_response = table.scan(
-        FilterExpression=Key('type').eq('LEAVE_REQUEST') & Key('employeeId').eq(employee_id)
-    )
-    
-    leaves = scan_response.get('Items', [])
+    # Query the employee index newest first instead of scanning the table
+    leaves = list(Paginator(
+        table.query,
+        IndexName=EMPLOYEE_LEAVE_INDEX,
+        KeyConditionExpression=Key('employeeId').eq(employee_id),
+        ScanIndexForward=False
+    ))
     
     if not leaves:
         print("No leave requests found")
         return
     
-    # Sort by applied date
-    leaves.sort(key=lambda x: x.get('appliedAt', ''), reverse=True)
-    
     # Prepare data for tabular display
     table_data = []
     for leave in leaves:
@@ -96,7 +123,7 @@ def query_employee_leaves(table_name, employee_id, region='us-east-1'):
     headers = ["Leave ID", "Status", "Type", "Period", "Applied At", "Notification"]
     print(tabulate(table_data, headers=headers, tablefmt="grid"))
 
-def query_pending_leaves(table_name, region='us-east-1'):
+def query_pending_leaves(table_name, region=DEFAULT_REGION):
     """
     Query all pending leave requests
     
@@ -107,20 +134,18 @@ def query_pending_leaves(table_name, region='us-east-1'):
     dynamodb = boto3.resource('dynamodb', region_name=region)
     table = dynamodb.Table(table_name)
     
-    # Scan the table for pending leave requests
-    scan_response = table.scan(
-        FilterExpression=Key('type').eq('LEAVE_REQUEST') & Key('status').eq('PENDING')
-    )
-    
-    leaves = scan_response.get('Items', [])
+    # Read the pending queue index oldest first instead of scanning the table
+    leaves = list(Paginator(
+        table.query,
+        IndexName=PENDING_LEAVE_INDEX,
+        KeyConditionExpression=Key('pendingStatus').eq('PENDING'),
+        ScanIndexForward=True
+    ))
     
     if not leaves:
         print("No pending leave requests found")
         return
     
-    # Sort by applied date
-    leaves.sort(key=lambda x: x.get('appliedAt', ''))
-    
     print(f"Found {len(leaves)} pending leave requests:")
     
     # Prepare data for tabular display
@@ -139,7 +164,7 @@ def query_pending_leaves(table_name, region='us-east-1'):
     headers = ["Leave ID", "Employee", "Employee ID", "Type", "Period", "Applied At"]
     print(tabulate(table_data, headers=headers, tablefmt="grid"))
 
-def list_employees(table_name, region='us-east-1'):
+def list_employees(table_name, region=DEFAULT_REGION):
     """
     List all employees
     
@@ -151,11 +176,10 @@ def list_employees(table_name, region='us-east-1'):
     table = dynamodb.Table(table_name)
     
     # Scan the table for employees
-    scan_response = table.scan(
+    employees = list(Paginator(
+        table.scan,
         FilterExpression=Key('type').eq('EMPLOYEE')
-    )
-    
-    employees = scan_response.get('Items', [])
+    ))
     
     if not employees:
         print("No employees found")
@@ -172,32 +196,29 @@ def list_employees(table_name, region='us-east-1'):
     
     return employees
 
-def get_leave_types(table_name=None, region=None):
+# Leave policy catalogs, one per table and region, reused across menu choices
+_leave_policies = {}
+
+def get_leave_types(table_name, region=DEFAULT_REGION):
     """
-    Get all leave types available in the system based on OCTANK INC Leave Policy
+    Get all leave types defined by the LEAVE_TYPE items in the table
     
     Args:
-        table_name (str, optional): Name of the DynamoDB table (not used, kept for compatibility)
-        region (str, optional): AWS region (not used, kept for compatibility)
+        table_name (str): Name of the DynamoDB table
+        region (str): AWS region
         
     Returns:
-        list: List of leave types defined in OCTANK INC Leave Policy
+        list: Names of the leave types, in catalog order
     """
-    # Static list of leave types based on OCTANK INC Leave Policy
-    leave_types = [
-        "Annual",
-        "Sick",
-        "Maternity",
-        "Paternity",
-        "Casual",
-        "Bereavement",
-        "Marriage",
-        "WFH"
-    ]
-    
-    return leave_types
+    policy = _leave_policies.get((table_name, region))
+    if policy is None:
+        dynamodb = boto3.resource('dynamodb', region_name=region)
+        policy = LeavePolicy(dynamodb, table_name)
+        _leave_policies[(table_name, region)] = policy
+    
+    return policy.names()
 
-def query_leave_balance(table_name, employee_id=None, employee_name=None, leave_type=None, region='us-east-1'):
+def query_leave_balance(table_name, employee_id=None, employee_name=None, leave_type=None, region=DEFAULT_REGION):
     """
     Query leave balance for a specific employee by ID or name, optionally filtered by leave type
     
@@ -212,11 +233,10 @@ def query_leave_balance(table_name, employee_id=None, employee_name=None, leave_
     table = dynamodb.Table(table_name)
     
     # Scan for employees
-    scan_response = table.scan(
+    employees = list(Paginator(
+        table.scan,
         FilterExpression=Key('type').eq('EMPLOYEE')
-    )
-    
-    employees = scan_response.get('Items', [])
+    ))
     
     if not employees:
         print("No employees found")
@@ -258,35 +278,36 @@ def query_leave_balance(table_name, employee_id=None, employee_name=None, leave_
         else:
             print(f"Leave Balance: {employee.get('leaveBalance', 0)} days")
 
-def get_all_leaves(table_name, region='us-east-1'):
+def get_all_leaves(table_name, region=DEFAULT_REGION, limit=None, segments=DEFAULT_SEGMENTS, workers=DEFAULT_WORKERS):
     """
-    Get all leave requests in the system
+    Get all leave requests in the system, most recently applied first
     
     Args:
         table_name (str): Name of the DynamoDB table
         region (str): AWS region
+        limit (int, optional): Show only this many of the most recent requests
+        segments (int): Segments of the parallel scan
+        workers (int): Threads scanning segments at a time
         
     Returns:
         list: List of leave request items
     """
-    dynamodb = boto3.resource('dynamodb', region_name=region)
-    table = dynamodb.Table(table_name)
-    
-    # Query all leave requests
-    scan_response = table.scan(
-        FilterExpression=Key('type').eq('LEAVE_REQUEST')
+    leaves, total = scan_sorted(
+        table_name, region,
+        key=lambda x: x.get('appliedAt', ''),
+        reverse=True,
+        limit=limit,
+        segments=segments,
+        workers=workers,
+        FilterExpression=Key('type').eq('LEAVE_REQUEST'),
+        **projection('id', 'employeeName', 'status', 'leaveType', 'startDate', 'endDate', 'appliedAt')
     )
     
-    leaves = scan_response.get('Items', [])
-    
     if not leaves:
         print("No leave requests found")
         return []
     
-    # Sort by applied date
-    leaves.sort(key=lambda x: x.get('appliedAt', ''), reverse=True)
-    
-    print(f"Found {len(leaves)} leave requests:")
+    print(f"Found {total} leave requests{shown(leaves, total, 'most recent')}:")
     
     # Prepare data for tabular display
     table_data = []
@@ -306,7 +327,7 @@ def get_all_leaves(table_name, region='us-east-1'):
     
     return leaves
 
-def get_leaves_by_type(table_name, leave_type, region='us-east-1'):
+def get_leaves_by_type(table_name, leave_type, region=DEFAULT_REGION):
     """
     Get leave requests filtered by leave type
     
@@ -322,11 +343,10 @@ def get_leaves_by_type(table_name, leave_type, region='us-east-1'):
     table = dynamodb.Table(table_name)
     
     # Query leave requests by type
-    scan_response = table.scan(
+    leaves = list(Paginator(
+        table.scan,
         FilterExpression=Key('type').eq('LEAVE_REQUEST') & Attr('leaveType').eq(leave_type)
-    )
-    
-    leaves = scan_response.get('Items', [])
+    ))
     
     if not leaves:
         print(f"No leave requests found for type: {leave_type}")
@@ -354,35 +374,37 @@ def get_leaves_by_type(table_name, leave_type, region='us-east-1'):
     
     return leaves
 
-def get_approved_leaves(table_name, region='us-east-1'):
+def get_approved_leaves(table_name, region=DEFAULT_REGION, limit=None, segments=DEFAULT_SEGMENTS, workers=DEFAULT_WORKERS):
     """
-    Get all approved leave requests
+    Get all approved leave requests, most recently approved first
     
     Args:
         table_name (str): Name of the DynamoDB table
         region (str): AWS region
+        limit (int, optional): Show only this many of the most recent approvals
+        segments (int): Segments of the parallel scan
+        workers (int): Threads scanning segments at a time
         
     Returns:
         list: List of approved leave request items
     """
-    dynamodb = boto3.resource('dynamodb', region_name=region)
-    table = dynamodb.Table(table_name)
-    
-    # Query approved leave requests
-    scan_response = table.scan(
-        FilterExpression=Key('type').eq('LEAVE_REQUEST') & Key('status').eq('APPROVED')
+    # Sort by approved date if available, otherwise by applied date
+    leaves, total = scan_sorted(
+        table_name, region,
+        key=lambda x: x.get('approvedAt', x.get('appliedAt', '')),
+        reverse=True,
+        limit=limit,
+        segments=segments,
+        workers=workers,
+        FilterExpression=Key('type').eq('LEAVE_REQUEST') & Key('status').eq('APPROVED'),
+        **projection('id', 'employeeName', 'leaveType', 'startDate', 'endDate', 'appliedAt', 'approvedAt')
     )
     
-    leaves = scan_response.get('Items', [])
-    
     if not leaves:
         print("No approved leave requests found")
         return []
     
-    # Sort by approved date if available, otherwise by applied date
-    leaves.sort(key=lambda x: x.get('approvedAt', x.get('appliedAt', '')), reverse=True)
-    
-    print(f"Found {len(leaves)} approved leave requests:")
+    print(f"Found {total} approved leave requests{shown(leaves, total, 'most recent')}:")
     
     # Prepare data for tabular display
     table_data = []
@@ -402,32 +424,33 @@ def get_approved_leaves(table_name, region='us-east-1'):
     
     return leaves
 
-def get_notification_status(table_name, region='us-east-1'):
+def get_notification_status(table_name, region=DEFAULT_REGION, limit=None, segments=DEFAULT_SEGMENTS, workers=DEFAULT_WORKERS):
     """
-    Get notification status for all leave requests
+    Get notification status for all leave requests, not yet notified first
     
     Args:
         table_name (str): Name of the DynamoDB table
         region (str): AWS region
+        limit (int, optional): Show only this many requests
+        segments (int): Segments of the parallel scan
+        workers (int): Threads scanning segments at a time
     """
-    dynamodb = boto3.resource('dynamodb', region_name=region)
-    table = dynamodb.Table(table_name)
-    
-    # Scan the table for leave requests
-    scan_response = table.scan(
-        FilterExpression=Key('type').eq('LEAVE_REQUEST')
+    # Sort by notification status (not sent first), then by leave ID
+    leaves, total = scan_sorted(
+        table_name, region,
+        key=lambda x: ("notificationSent" in x, x['id']),
+        limit=limit,
+        segments=segments,
+        workers=workers,
+        FilterExpression=Key('type').eq('LEAVE_REQUEST'),
+        **projection('id', 'employeeName', 'status', 'leaveType', 'startDate', 'endDate', 'notificationSent')
     )
     
-    leaves = scan_response.get('Items', [])
-    
     if not leaves:
         print("No leave requests found")
         return
     
-    # Sort by notification status (not sent first)
-    leaves.sort(key=lambda x: "notificationSent" in x)
-    
-    print(f"Found {len(leaves)} leave requests:")
+    print(f"Found {total} leave requests{shown(leaves, total, 'first')}:")
     
     # Prepare data for tabular display
     table_data = []
@@ -449,7 +472,46 @@ def get_notification_status(table_name, region='us-east-1'):
     headers = ["Leave ID", "Employee", "Status", "Type", "Period", "Notification", "Sent At"]
     print(tabulate(table_data, headers=headers, tablefmt="grid"))
 
-def interactive_menu(table_name, region='us-east-1'):
+def get_leave_summary(table_name, employee_id=None, department=None, year=None, region=DEFAULT_REGION):
+    """
+    Show the yearly leave totals of an employee or a department
+    
+    Reads the one aggregate item kept by the leave aggregation Lambda
+    instead of scanning the leave requests.
+    
+    Args:
+        table_name (str): Name of the DynamoDB table
+        employee_id (int, optional): ID of the employee
+        department (str, optional): Department name, used when no employee ID is given
+        year (int, optional): Year the leaves start in; the current year if omitted
+        region (str): AWS region
+        
+    Returns:
+        dict: Summary with statusCounts and daysUsed, or None if nothing was recorded
+    """
+    dynamodb = boto3.resource('dynamodb', region_name=region)
+    table = dynamodb.Table(table_name)
+    
+    year = year or datetime.now().year
+    if employee_id is not None:
+        key = employee_stats_key(employee_id, year)
+        label = f"employee {employee_id}"
+    else:
+        key = department_stats_key(department, year)
+        label = f"department {department}"
+    
+    item = table.get_item(Key=key).get('Item')
+    if item is None:
+        print(f"No leave totals recorded for {label} in {year}")
+        return None
+    
+    summary = summarize(item)
+    print(f"Leave totals for {label} in {year}:")
+    print(tabulate(sorted(summary['statusCounts'].items()), headers=["Status", "Requests"], tablefmt="grid"))
+    print(tabulate(sorted(summary['daysUsed'].items()), headers=["Leave Type", "Approved Days"], tablefmt="grid"))
+    return summary
+
+def interactive_menu(table_name, region=DEFAULT_REGION):
     """
     Interactive menu for querying leave requests
     
@@ -466,9 +528,10 @@ def interactive_menu(table_name, region='us-east-1'):
         print("5. Get leaves by type")
         print("6. Get approved leaves")
         print("7. Get notification status")
-        print("8. Exit")
+        print("8. Get leave summary of an employee or department")
+        print("9. Exit")
         
-        choice = input("\nEnter your choice (1-8): ")
+        choice = input("\nEnter your choice (1-9): ")
         
         if choice == '1':
             employees = list_employees(table_name, region)
@@ -546,7 +609,7 @@ def interactive_menu(table_name, region='us-east-1'):
             else:
                 print("Invalid choice")
         elif choice == '4':
-            get_all_leaves(table_name, region)
+            get_all_leaves(table_name, region, limit=ask_limit())
         elif choice == '5':
             # Get all leave types from the system
             leave_types = get_leave_types(table_name, region)
@@ -569,10 +632,23 @@ def interactive_menu(table_name, region='us-east-1'):
             except ValueError:
                 print("Please enter a valid number")
         elif choice == '6':
-            get_approved_leaves(table_name, region)
+            get_approved_leaves(table_name, region, limit=ask_limit())
         elif choice == '7':
-            get_notification_status(table_name, region)
+            get_notification_status(table_name, region, limit=ask_limit())
         elif choice == '8':
+            target = input("Enter employee ID or department name: ").strip()
+            year_input = input("Enter year (or press Enter for the current year): ").strip()
+            try:
+                year = int(year_input) if year_input else None
+                if target.isdigit():
+                    get_leave_summary(table_name, employee_id=int(target), year=year, region=region)
+                elif target:
+                    get_leave_summary(table_name, department=target, year=year, region=region)
+                else:
+                    print("Please enter an employee ID or a department name")
+            except ValueError:
+                print("Please enter a valid year")
+        elif choice == '9':
             print("Exiting...")
             break
         else:
@@ -586,7 +662,7 @@ def get_table_name():
             return os.environ['TABLE_NAME']
         
         # Otherwise, look up the table name from CloudFormation outputs
-        region = os.environ.get('AWS_REGION', 'us-west-2')
+        region = os.environ.get('AWS_REGION', DEFAULT_REGION)
         cfn = boto3.client('cloudformation', region_name=region)
         stacks = cfn.list_stacks(StackStatusFilter=['CREATE_COMPLETE', 'UPDATE_COMPLETE'])
         
@@ -619,7 +695,7 @@ def get_table_name():
 
 if __name__ == "__main__":
     table_name = get_table_name()
-    region = os.environ.get('AWS_REGION', 'us-west-2')
+    region = os.environ.get('AWS_REGION', DEFAULT_REGION)
     
     print(f"Connecting to table: {table_name} in region: {region}")
     interactive_menu(table_name, region)
\ No newline at end of file
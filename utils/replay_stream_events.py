@@ -0,0 +1,44 @@
+import argparse
+import json
+import logging
+import os
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+# Run the notification Lambda's stream handler in-process, as Lambda would
+sys.path.insert(0, str(ROOT / 'lambda' / 'common' / 'python'))
+sys.path.insert(0, str(ROOT / 'lambda' / 'leave_notification'))
+
+def replay(event_path, publish=False):
+    """
+    Feed a recorded DynamoDB stream event to the notification stream handler
+
+    Without `publish` the handler only builds and logs the emails, so no AWS
+    access is needed; with it the emails are sent to SNS_TOPIC_ARN and the
+    leaves in TABLE_NAME are marked as notified.
+
+    Args:
+        event_path (str): JSON file holding the stream event
+        publish (bool): Send the emails instead of a dry run
+
+    Returns:
+        dict: The handler's batchItemFailures response
+    """
+    with open(event_path) as event_file:
+        event = json.load(event_file)
+
+    os.environ.setdefault('AWS_REGION', 'us-west-2')
+    import leave_notification
+    return leave_notification.stream_handler(event, None, dry_run=not publish)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded DynamoDB stream event through the notification stream handler")
+    parser.add_argument('event', nargs='?', default=str(ROOT / 'utils' / 'events' / 'outbox_stream_event.json'),
+                        help="Stream event JSON file (default: utils/events/outbox_stream_event.json)")
+    parser.add_argument('--publish', action='store_true', help="Send the emails via SNS instead of logging them")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    print(json.dumps(replay(args.event, publish=args.publish), indent=2))
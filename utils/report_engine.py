@@ -0,0 +1,70 @@
+import heapq
+import os
+from itertools import islice
+from table_scan import parallel_scan, DEFAULT_REGION
+
+# Segments a report scan is split into, and threads scanning them at a time
+DEFAULT_SEGMENTS = int(os.environ.get('REPORT_SEGMENTS', '16'))
+DEFAULT_WORKERS = int(os.environ.get('REPORT_WORKERS', '8'))
+
+def projection(*attributes):
+    """
+    Scan parameters reading only the given attributes
+
+    Every attribute goes through a placeholder, so reserved words such as
+    `status` and `name` need no special care.
+
+    Args:
+        *attributes (str): Attribute names
+
+    Returns:
+        dict: ProjectionExpression and ExpressionAttributeNames
+    """
+    names = {f"#p{i}": attribute for i, attribute in enumerate(attributes)}
+    return {
+        'ProjectionExpression': ", ".join(names),
+        'ExpressionAttributeNames': names
+    }
+
+def scan_sorted(table_name, region=DEFAULT_REGION, key=None, reverse=False, limit=None,
+                segments=DEFAULT_SEGMENTS, workers=DEFAULT_WORKERS, **scan_kwargs):
+    """
+    Items of a parallel segmented scan in sorted order
+
+    Each segment is scanned on its own thread and sorted as it streams in;
+    with a `limit` a segment only keeps its first `limit` items in a heap.
+    The sorted segments are then merged lazily, so only the rows that are
+    returned are ever put in order across segments.
+
+    Args:
+        table_name (str): Name of the DynamoDB table
+        region (str): AWS region
+        key (callable, optional): Sort key of an item
+        reverse (bool): Sort descending
+        limit (int, optional): Return only the first `limit` items
+        segments (int): TotalSegments of the scan
+        workers (int): Threads scanning segments at a time
+        **scan_kwargs: Scan parameters such as FilterExpression and a projection()
+
+    Returns:
+        tuple: (sorted items, number of items the scan matched)
+    """
+    def sort_segment(table, items):
+        counted = [0]
+
+        def count(items):
+            for item in items:
+                counted[0] += 1
+                yield item
+
+        if limit is None:
+            run = sorted(count(items), key=key, reverse=reverse)
+        elif reverse:
+            run = heapq.nlargest(limit, count(items), key=key)
+        else:
+            run = heapq.nsmallest(limit, count(items), key=key)
+        return counted[0], run
+
+    results = parallel_scan(table_name, region, workers, sort_segment, segments=segments, combine=list, **scan_kwargs)
+    merged = heapq.merge(*(run for _, run in results), key=key, reverse=reverse)
+    return list(islice(merged, limit)), sum(total for total, _ in results)
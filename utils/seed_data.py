@@ -1,10 +1,24 @@
 import boto3
 import json
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from collections import Counter
 import random
 from dotenv import load_dotenv
 import pathlib
+import sys
+import argparse
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Share the helpers packaged in the Lambda layer with the utility scripts
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / 'lambda' / 'common' / 'python'))
+from lms_common.ids import LEAVE_ID_COUNTER_KEY, LEAVE_ID_BASE
+from lms_common.leave_policy import LEAVE_TYPE_ID_BASE
+from lms_common.business_days import holidays_type
+from lms_common.aggregates import LEAVE_DEPARTMENT_ATTRIBUTE
+from table_scan import worker_table, parallel_scan, DEFAULT_REGION
 
 # Load environment variables from .env file
 env_path = pathlib.Path(__file__).parent / '.env'
@@ -14,6 +28,9 @@ load_dotenv(dotenv_path=env_path)
 EMPLOYEE_EMAIL = os.environ.get('EMPLOYEE_EMAIL', 'employee@example.com')
 APPROVER_EMAIL = os.environ.get('APPROVER_EMAIL', 'approver@example.com')
 
+# Worker threads used for writes and for the segments of a parallel scan
+DEFAULT_WORKERS = int(os.environ.get('SEED_WORKERS', '8'))
+
 # Leave types as per OCTANK INC Leave Policy 2025
 LEAVE_TYPES = [
     {"type": "Annual", "balance": 20},
@@ -26,6 +43,16 @@ LEAVE_TYPES = [
     {"type": "WFH", "balance": 24}              # 2 days per month * 12 months
 ]
 
+# Public holidays per region and year, charged as no working day
+HOLIDAYS = {
+    "US": {
+        2025: ["2025-01-01", "2025-01-20", "2025-02-17", "2025-05-26", "2025-06-19", "2025-07-04",
+               "2025-09-01", "2025-10-13", "2025-11-11", "2025-11-27", "2025-12-25"],
+        2026: ["2026-01-01", "2026-01-19", "2026-02-16", "2026-05-25", "2026-06-19", "2026-07-03",
+               "2026-09-07", "2026-10-12", "2026-11-11", "2026-11-26", "2026-12-25"]
+    }
+}
+
 # Sample employee data with email addresses
 SAMPLE_EMPLOYEES = [
     {"id": 1001, "name": "John Doe", "email": EMPLOYEE_EMAIL, "department": "Engineering"},
@@ -35,70 +62,189 @@ SAMPLE_EMPLOYEES = [
     {"id": 1005, "name": "Robert Wilson", "email": EMPLOYEE_EMAIL, "department": "Engineering"}
 ]
 
-# Sample leave requests
-def generate_leave_requests(num_requests=10):
+# Departments of the synthetic dataset; any beyond these are numbered
+DEPARTMENTS = ["Engineering", "HR", "Finance", "Marketing", "Sales", "Operations", "Legal", "Support"]
+
+FIRST_NAMES = ["John", "Jane", "Michael", "Emily", "Robert", "Priya", "Wei", "Carlos", "Fatima", "Olga",
+               "David", "Aisha", "Kenji", "Sofia", "Liam", "Noah", "Mia", "Arjun", "Chen", "Grace"]
+LAST_NAMES = ["Doe", "Smith", "Johnson", "Davis", "Wilson", "Patel", "Zhang", "Garcia", "Khan", "Ivanova",
+              "Brown", "Okafor", "Tanaka", "Rossi", "Murphy", "Nguyen", "Muller", "Sharma", "Lee", "Martin"]
+
+# Relative frequency of each leave type and the days a single request asks for (shortest, longest)
+LEAVE_TYPE_PROFILES = {
+    "Annual": (40, 1, 10),
+    "Sick": (20, 1, 3),
+    "Maternity": (1, 60, 130),
+    "Paternity": (2, 5, 20),
+    "Casual": (15, 1, 2),
+    "Bereavement": (2, 1, 5),
+    "Marriage": (1, 3, 5),
+    "WFH": (19, 1, 1)
+}
+
+# Relative frequency of each leave request status
+STATUS_WEIGHTS = {"APPROVED": 60, "PENDING": 15, "REJECTED": 10, "CANCELLED": 15}
+
+REJECTION_REASONS = ["Insufficient leave balance", "Critical project deadline", "Team member already on leave"]
+
+# Generated leave request IDs are consecutive from here, a block per employee
+SEED_LEAVE_ID_START = 10001
+
+# Leave dates are laid out from this day so a seed always produces the same data
+DEFAULT_START_DATE = "2025-01-01"
+
+def department_names(num_departments):
+    """Names of the first num_departments departments"""
+    return [DEPARTMENTS[i] if i < len(DEPARTMENTS) else f"Department {i + 1}" for i in range(num_departments)]
+
+def generate_employees(num_employees=None, num_departments=len(DEPARTMENTS), seed=0):
+    """
+    Yield employee records, or the SAMPLE_EMPLOYEES when num_employees is None
+
+    Args:
+        num_employees (int, optional): Number of synthetic employees, with IDs from 1001
+        num_departments (int): Number of departments to spread them over
+        seed (int): Seed of the random choices
+
+    Yields:
+        dict: Employee with id, name, email and department
+    """
+    if num_employees is None:
+        for employee in SAMPLE_EMPLOYEES:
+            yield employee.copy()
+        return
+
+    # Larger departments first, roughly like a real organisation
+    departments = department_names(num_departments)
+    weights = [1.0 / (rank + 1) for rank in range(num_departments)]
+
+    for i in range(num_employees):
+        employee_id = 1001 + i
+        rng = random.Random(f"{seed}:employee:{employee_id}")
+        yield {
+            "id": employee_id,
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "email": EMPLOYEE_EMAIL,
+            "department": rng.choices(departments, weights=weights)[0]
+        }
+
+def generate_employee_records(employee, first_leave_id, requests_per_employee, seed=0, start_date=None):
+    """
+    Yield an employee item followed by that employee's leave requests
+
+    Each request asks for at most what is left of its leave type after the
+    employee's approved and pending requests, and approved days are deducted
+    from the stored balance the way approve_leave does. Requests never overlap.
+
+    Args:
+        employee (dict): Employee record from generate_employees
+        first_leave_id (int): ID of the employee's first leave request
+        requests_per_employee (int): Leave requests to generate at most
+        seed (int): Seed of the random choices
+        start_date (datetime, optional): Day the first leave may start after
+
+    Yields:
+        dict: EMPLOYEE item, then LEAVE_REQUEST items
+    """
+    rng = random.Random(f"{seed}:leaves:{employee['id']}")
+    day = start_date or datetime.strptime(DEFAULT_START_DATE, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+    balances = {leave_type["type"]: leave_type["balance"] for leave_type in LEAVE_TYPES}
+    available = dict(balances)
+    statuses = list(STATUS_WEIGHTS)
+    status_weights = list(STATUS_WEIGHTS.values())
+
+    # Spread the requests over roughly a year
+    spacing = max(1, 365 // max(1, requests_per_employee))
+
     leave_requests = []
-    statuses = ["PENDING", "APPROVED", "REJECTED", "CANCELLED"]
-    
-    for i in range(num_requests):
-        employee = random.choice(SAMPLE_EMPLOYEES)
-        employee_id = employee["id"]
-        
-        # Generate random dates
-        # Import timezone from datetime to create aware datetime objects
-        from datetime import timezone
-        start_date = datetime.now(timezone.utc) + timedelta(days=random.randint(1, 30))
-        end_date = start_date + timedelta(days=random.randint(1, 7))
-        
-        # Format dates as strings
-        start_date_str = start_date.strftime("%Y-%m-%d")
-        end_date_str = end_date.strftime("%Y-%m-%d")
-        
-        # Calculate duration in days
-        duration = (end_date - start_date).days + 1
-        
-        # Generate a unique leave ID
-        leave_id = int(f"{employee_id}{i+1}")
-        
-        # Randomly select a status and leave type
-        status = random.choice(statuses)
-        leave_type_obj = random.choice(LEAVE_TYPES)
-        leave_type = leave_type_obj["type"]
-        
+    for k in range(requests_per_employee):
+        leave_types = [name for name in LEAVE_TYPE_PROFILES if available.get(name, 0) > 0]
+        if not leave_types:
+            break
+        leave_type = rng.choices(leave_types, weights=[LEAVE_TYPE_PROFILES[name][0] for name in leave_types])[0]
+        _, shortest, longest = LEAVE_TYPE_PROFILES[leave_type]
+        duration = min(rng.randint(shortest, longest), available[leave_type])
+
+        start = day + timedelta(days=rng.randint(1, spacing))
+        end = start + timedelta(days=duration - 1)
+        day = end
+
+        status = rng.choices(statuses, weights=status_weights)[0]
+        if status in ("APPROVED", "PENDING"):
+            available[leave_type] -= duration
+        if status == "APPROVED":
+            balances[leave_type] -= duration
+
+        applied_at = start - timedelta(days=rng.randint(1, 30), minutes=rng.randint(0, 600))
+        decided_at = applied_at + timedelta(hours=rng.randint(1, 72))
+
         leave_request = {
-            "id": leave_id,
+            "id": first_leave_id + k,
             "type": "LEAVE_REQUEST",
-            "employeeId": employee_id,
+            "employeeId": employee["id"],
             "employeeName": employee["name"],
             "employeeEmail": employee["email"],
-            "startDate": start_date_str,
-            "endDate": end_date_str,
+            LEAVE_DEPARTMENT_ATTRIBUTE: employee["department"],
+            "startDate": start.strftime("%Y-%m-%d"),
+            "endDate": end.strftime("%Y-%m-%d"),
             "leaveType": leave_type,
             "duration": duration,
             "status": status,
-            "appliedAt": (datetime.now(timezone.utc) - timedelta(days=random.randint(1, 10))).isoformat()
+            "appliedAt": applied_at.isoformat()
         }
         
         # Add additional fields based on status
-        if status == "APPROVED":
-            leave_request["approvedAt"] = (datetime.now(timezone.utc) - timedelta(days=random.randint(1, 5))).isoformat()
+        if status == "PENDING":
+            # Sparse key for the pending queue index
+            leave_request["pendingStatus"] = "PENDING"
+        elif status == "APPROVED":
+            leave_request["approvedAt"] = decided_at.isoformat()
             leave_request["approverEmail"] = APPROVER_EMAIL
             # Add notification status for some approved leaves
-            if random.choice([True, False]):
-                leave_request["notificationSent"] = (datetime.now(timezone.utc) - timedelta(days=random.randint(1, 3))).isoformat()
+            if rng.random() < 0.5:
+                leave_request["notificationSent"] = (decided_at + timedelta(minutes=rng.randint(1, 60))).isoformat()
         elif status == "REJECTED":
-            leave_request["rejectedAt"] = (datetime.now(timezone.utc) - timedelta(days=random.randint(1, 5))).isoformat()
-            leave_request["rejectionReason"] = random.choice(["Insufficient leave balance", "Critical project deadline", "Team member already on leave"])
+            leave_request["rejectedAt"] = decided_at.isoformat()
+            leave_request["rejectionReason"] = rng.choice(REJECTION_REASONS)
             leave_request["approverEmail"] = APPROVER_EMAIL
             # Add notification status for some rejected leaves
-            if random.choice([True, False]):
-                leave_request["notificationSent"] = (datetime.now(timezone.utc) - timedelta(days=random.randint(1, 3))).isoformat()
+            if rng.random() < 0.5:
+                leave_request["notificationSent"] = (decided_at + timedelta(minutes=rng.randint(1, 60))).isoformat()
         elif status == "CANCELLED":
-            leave_request["cancelledAt"] = (datetime.now(timezone.utc) - timedelta(days=random.randint(1, 3))).isoformat()
+            leave_request["cancelledAt"] = decided_at.isoformat()
         
         leave_requests.append(leave_request)
-    
-    return leave_requests
+
+    employee_item = employee.copy()
+    employee_item["type"] = "EMPLOYEE"
+    employee_item["leaveBalances"] = balances
+    yield employee_item
+    yield from leave_requests
+
+def generate_dataset(num_employees=None, requests_per_employee=2, num_departments=len(DEPARTMENTS),
+                     seed=0, start_date=DEFAULT_START_DATE):
+    """
+    Yield every employee and leave request item, one employee at a time
+
+    The same arguments always produce the same items, and only one employee's
+    requests are held in memory at once.
+
+    Args:
+        num_employees (int, optional): Synthetic employees; the SAMPLE_EMPLOYEES when None
+        requests_per_employee (int): Leave requests per employee at most
+        num_departments (int): Number of departments
+        seed (int): Seed of the random choices
+        start_date (str): Day the leaves are laid out from (YYYY-MM-DD)
+
+    Yields:
+        dict: EMPLOYEE and LEAVE_REQUEST items
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    employees = generate_employees(num_employees, num_departments, seed)
+    for index, employee in enumerate(employees):
+        first_leave_id = SEED_LEAVE_ID_START + index * requests_per_employee
+        yield from generate_employee_records(employee, first_leave_id, requests_per_employee, seed, start)
 
 def get_table_name():
     """Get the DynamoDB table name from CloudFormation outputs"""
@@ -108,7 +254,7 @@ def get_table_name():
             return os.environ['TABLE_NAME']
         
         # Otherwise, look up the table name from CloudFormation outputs
-        region = os.environ.get('AWS_REGION', 'us-west-2')
+        region = os.environ.get('AWS_REGION', DEFAULT_REGION)
         cfn = boto3.client('cloudformation', region_name=region)
         stacks = cfn.list_stacks(StackStatusFilter=['CREATE_COMPLETE', 'UPDATE_COMPLETE'])
         
@@ -139,74 +285,209 @@ def get_table_name():
         print(f"Error getting table name: {str(e)}")
         return 'LeaveManagementTable'  # Default fallback
 
-def delete_all_data(table_name, region='us-west-2'):
+def delete_all_data(table_name, region=DEFAULT_REGION, workers=DEFAULT_WORKERS):
     """Delete all data from the DynamoDB table"""
-    print(f"Deleting all data from table: {table_name} in region: {region}")
-    
-    dynamodb = boto3.resource('dynamodb', region_name=region)
-    table = dynamodb.Table(table_name)
-    
-    # Scan all items in the table
-    response = table.scan()
-    items = response.get('Items', [])
-    
-    # Delete each item
-    count = 0
-    for item in items:
-        table.delete_item(
-            Key={
-                'id': item['id'],
-                'type': item['type']
-            }
-        )
-        count += 1
-    
+    print(f"Deleting all data from table: {table_name} in region: {region} with {workers} workers")
+
+    def delete_segment(table, items):
+        # batch_writer groups the deletes into 25-item batches and resends unprocessed ones
+        count = 0
+        with table.batch_writer() as batch:
+            for item in items:
+                batch.delete_item(
+                    Key={
+                        'id': item['id'],
+                        'type': item['type']
+                    }
+                )
+                count += 1
+        return count
+
+    # Every segment is scanned keys only, deleting as it goes
+    count = parallel_scan(
+        table_name, region, workers, delete_segment,
+        ProjectionExpression='id, #type',
+        ExpressionAttributeNames={'#type': 'type'}
+    )
+
     print(f"Deleted {count} items from the table")
     return count
 
-def seed_data():
-    """Seed the DynamoDB table with sample data"""
+def write_items(table_name, items, region=DEFAULT_REGION, workers=DEFAULT_WORKERS):
+    """
+    Write items with batch_writer on a pool of worker threads
+
+    Items are handed to the workers through a bounded queue, so a generator of
+    any size is written without being held in memory.
+
+    Args:
+        table_name (str): Name of the DynamoDB table
+        items (iterable): Items to put
+        region (str): AWS region
+        workers (int): Number of writer threads
+
+    Returns:
+        int: Number of items written
+    """
+    pending = queue.Queue(maxsize=workers * 100)
+    done = object()
+    errors = []
+    lock = threading.Lock()
+
+    def writer():
+        count = 0
+        table = worker_table(table_name, region)
+        try:
+            with table.batch_writer() as batch:
+                while True:
+                    item = pending.get()
+                    if item is done:
+                        break
+                    batch.put_item(Item=item)
+                    count += 1
+        except Exception as e:
+            with lock:
+                errors.append(e)
+            # Keep draining so the producer never blocks on a full queue
+            while pending.get() is not done:
+                pass
+        return count
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        writers = [pool.submit(writer) for _ in range(workers)]
+        for item in items:
+            pending.put(item)
+        for _ in range(workers):
+            pending.put(done)
+        count = sum(w.result() for w in writers)
+
+    if errors:
+        raise errors[0]
+    return count
+
+def leave_type_items():
+    """Leave type items, numbered from 5000, each naming its type in leaveType"""
+    for i, leave_type in enumerate(LEAVE_TYPES):
+        yield {
+            "id": LEAVE_TYPE_ID_BASE + i,
+            "type": "LEAVE_TYPE",
+            "leaveType": leave_type["type"],
+            "balance": leave_type["balance"]
+        }
+
+def holiday_items():
+    """Holiday calendar items, one per region and year, keyed on the year"""
+    for region, years in HOLIDAYS.items():
+        for year, dates in years.items():
+            yield {
+                "id": year,
+                "type": holidays_type(region),
+                "dates": dates
+            }
+
+def counter_items(num_employees, requests_per_employee):
+    """
+    Leave ID counter item, when the generated IDs reach the range it hands out
+
+    Starting the counter past the last generated ID keeps apply_leave from
+    colliding with the seeded leave requests.
+    """
+    last_leave_id = SEED_LEAVE_ID_START + num_employees * requests_per_employee - 1
+    if last_leave_id >= LEAVE_ID_BASE:
+        yield dict(LEAVE_ID_COUNTER_KEY, leased=last_leave_id - LEAVE_ID_BASE + 1)
+
+def dataset_items(num_employees=None, requests_per_employee=2, num_departments=len(DEPARTMENTS),
+                  seed=0, start_date=DEFAULT_START_DATE):
+    """Yield every item to seed: leave types, holidays, employees with their leaves, and the ID counter"""
+    yield from leave_type_items()
+    yield from holiday_items()
+    yield from generate_dataset(num_employees, requests_per_employee, num_departments, seed, start_date)
+    employee_count = len(SAMPLE_EMPLOYEES) if num_employees is None else num_employees
+    yield from counter_items(employee_count, requests_per_employee)
+
+def write_jsonl(items, path):
+    """
+    Write items to a JSON Lines file, one item per line
+
+    Args:
+        items (iterable): Items to write
+        path (str): Output file, or '-' for standard output
+
+    Returns:
+        int: Number of items written
+    """
+    count = 0
+    output = sys.stdout if path == '-' else open(path, 'w')
+    try:
+        for item in items:
+            output.write(json.dumps(item) + "\n")
+            count += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return count
+
+def count_types(items, counts):
+    """Pass items through while counting them by type"""
+    for item in items:
+        counts[item["type"]] += 1
+        yield item
+
+def seed_data(workers=DEFAULT_WORKERS, num_employees=None, requests_per_employee=2,
+              num_departments=len(DEPARTMENTS), seed=0, start_date=DEFAULT_START_DATE, jsonl_path=None):
+    """
+    Seed the DynamoDB table, or a JSON Lines file, with a generated dataset
+
+    Args:
+        workers (int): Writer threads and parallel scan segments
+        num_employees (int, optional): Synthetic employees; the five sample employees when None
+        requests_per_employee (int): Leave requests per employee at most
+        num_departments (int): Number of departments
+        seed (int): Seed of the random choices
+        start_date (str): Day the leaves are laid out from (YYYY-MM-DD)
+        jsonl_path (str, optional): Write the items to this file instead of the table
+    """
+    counts = Counter()
+    items = count_types(
+        dataset_items(num_employees, requests_per_employee, num_departments, seed, start_date),
+        counts
+    )
+
+    if jsonl_path:
+        write_jsonl(items, jsonl_path)
+        print(f"Wrote {counts['EMPLOYEE']} employees, {counts['LEAVE_TYPE']} leave types, and {counts['LEAVE_REQUEST']} leave requests to {jsonl_path}", file=sys.stderr)
+        return
+
     # Get the table name from CloudFormation outputs
     table_name = get_table_name()
-    region = os.environ.get('AWS_REGION', 'us-west-2')
+    region = os.environ.get('AWS_REGION', DEFAULT_REGION)
     
     # Delete existing data
-    delete_all_data(table_name, region)
-    
-    print(f"Seeding data to table: {table_name} in region: {region}")
-    
-    dynamodb = boto3.resource('dynamodb', region_name=region)
-    table = dynamodb.Table(table_name)
-    
-    # Add employees with leave balances
-    for employee in SAMPLE_EMPLOYEES:
-        employee_item = employee.copy()
-        employee_item["type"] = "EMPLOYEE"
-        
-        # Add leave balances for each leave type
-        employee_item["leaveBalances"] = {}
-        for leave_type in LEAVE_TYPES:
-            employee_item["leaveBalances"][leave_type["type"]] = leave_type["balance"]
-        
-        print(f"Adding employee: {employee_item['name']}")
-        table.put_item(Item=employee_item)
+    delete_all_data(table_name, region, workers)
     
-    # Add leave types
-    for i, leave_type in enumerate(LEAVE_TYPES):
-        leave_type_item = leave_type.copy()
-        leave_type_item["id"] = 5000 + i
-        leave_type_item["type"] = "LEAVE_TYPE"
-        
-        print(f"Adding leave type: {leave_type_item['type']}")
-        table.put_item(Item=leave_type_item)
+    print(f"Seeding data to table: {table_name} in region: {region} with {workers} workers")
     
-    # Add leave requests
-    leave_requests = generate_leave_requests()
-    for leave_request in leave_requests:
-        print(f"Adding leave request: {leave_request['id']} for {leave_request['employeeName']}")
-        table.put_item(Item=leave_request)
+    write_items(table_name, items, region, workers)
     
-    print(f"Successfully seeded {len(SAMPLE_EMPLOYEES)} employees, {len(LEAVE_TYPES)} leave types, and {len(leave_requests)} leave requests")
+    print(f"Successfully seeded {counts['EMPLOYEE']} employees, {counts['LEAVE_TYPE']} leave types, and {counts['LEAVE_REQUEST']} leave requests")
 
 if __name__ == "__main__":
-    seed_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Reseed the leave management table with sample data")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Writer threads and parallel scan segments (default: %(default)s)")
+    parser.add_argument('--employees', type=int, help="Generate this many synthetic employees instead of the five samples")
+    parser.add_argument('--requests-per-employee', type=int, default=2, help="Leave requests generated per employee (default: %(default)s)")
+    parser.add_argument('--departments', type=int, default=len(DEPARTMENTS), help="Departments the employees are spread over (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed always yields the same data (default: %(default)s)")
+    parser.add_argument('--start-date', default=DEFAULT_START_DATE, help="Day the leaves are laid out from (default: %(default)s)")
+    parser.add_argument('--jsonl', metavar='PATH', help="Write the items to a JSON Lines file ('-' for stdout) instead of the table")
+    args = parser.parse_args()
+
+    seed_data(
+        workers=args.workers,
+        num_employees=args.employees,
+        requests_per_employee=args.requests_per_employee,
+        num_departments=args.departments,
+        seed=args.seed,
+        start_date=args.start_date,
+        jsonl_path=args.jsonl
+    )
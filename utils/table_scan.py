@@ -0,0 +1,63 @@
+import boto3
+import pathlib
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Share the helpers packaged in the Lambda layer with the utility scripts
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / 'lambda' / 'common' / 'python'))
+from lms_common.pagination import Paginator
+
+# Threads scanning segments when the caller does not choose
+DEFAULT_WORKERS = 8
+
+# Region of the table when neither the caller nor AWS_REGION names one; shared
+# by the seeding, backfill and report scripts so they all reach the same table
+DEFAULT_REGION = 'us-west-2'
+
+# Table resources of the worker threads, one per thread, table and region
+_worker_tables = threading.local()
+
+def worker_table(table_name, region):
+    """
+    Table resource for one worker thread
+
+    boto3 resources are not thread-safe, so every worker builds its own from a
+    separate session, once per thread; later segments on the same thread
+    reuse it.
+    """
+    tables = getattr(_worker_tables, 'tables', None)
+    if tables is None:
+        tables = _worker_tables.tables = {}
+    key = (table_name, region)
+    if key not in tables:
+        tables[key] = boto3.session.Session().resource('dynamodb', region_name=region).Table(table_name)
+    return tables[key]
+
+def parallel_scan(table_name, region=DEFAULT_REGION, workers=DEFAULT_WORKERS, handle_segment=None,
+                  segments=None, combine=sum, **kwargs):
+    """
+    Scan the table in segments, `workers` of them at a time
+
+    Args:
+        table_name (str): Name of the DynamoDB table
+        region (str): AWS region
+        workers (int): Number of threads scanning segments
+        handle_segment (callable): Called as handle_segment(table, items) per segment,
+            where items iterates that segment page by page; returns a count
+        segments (int, optional): TotalSegments of the scan; one per worker if omitted
+        combine (callable): Reduces the per-segment results, in segment order
+        **kwargs: Scan parameters such as ProjectionExpression
+
+    Returns:
+        The per-segment results combined; by default the sum of the counts
+    """
+    segments = segments or workers
+
+    def scan_segment(segment):
+        table = worker_table(table_name, region)
+        items = Paginator(table.scan, Segment=segment, TotalSegments=segments, **kwargs)
+        return handle_segment(table, items)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return combine(pool.map(scan_segment, range(segments)))